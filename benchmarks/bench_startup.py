@@ -0,0 +1,107 @@
+"""
+Cold-start benchmark for the stdio server.
+
+Spawns `python -m seatable_mcp.server` repeatedly and reports how long a
+fresh process takes to import, to answer `initialize` and to answer the first
+`tools/list`:
+
+    python benchmarks/bench_startup.py --iterations 20
+
+Every MCP client session starts a new server process, so these numbers are
+paid once per session before the first tool call.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_tools import summarize, format_table  # noqa: E402
+
+PROTOCOL_VERSION = "2024-11-05"
+
+
+def _request(proc, message: dict):
+    proc.stdin.write((json.dumps(message) + "\n").encode())
+    proc.stdin.flush()
+
+
+def _response(proc, request_id: int) -> dict:
+    while True:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError("server exited before answering request %d" % request_id)
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            return message
+
+
+def time_startup(env: dict = None) -> dict:
+    """
+    Start one server process and return seconds until `initialize` and
+    `tools/list` are answered, plus the number of tools listed.
+    """
+    env = dict(os.environ if env is None else env)
+    env.setdefault("SEATABLE_API_TOKEN", "startup-benchmark")
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "seatable_mcp.server"], env=env,
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        _request(proc, {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+            "protocolVersion": PROTOCOL_VERSION, "capabilities": {},
+            "clientInfo": {"name": "bench_startup", "version": "0"}}})
+        _response(proc, 1)
+        initialized = time.perf_counter() - started
+
+        _request(proc, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+        _request(proc, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        tools = _response(proc, 2)["result"]["tools"]
+        listed = time.perf_counter() - started
+    finally:
+        proc.stdin.close()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return {"initialize": initialized, "tools_list": listed, "tools": len(tools)}
+
+
+def time_import() -> float:
+    """
+    Seconds a fresh interpreter spends importing the server module.
+    """
+    code = "import time; t = time.perf_counter(); import seatable_mcp.server; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, "-c", code], check=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+    return float(output.decode().strip().splitlines()[-1])
+
+
+def run_startup_benchmarks(iterations: int = 10) -> list:
+    """
+    Return one summary dict each for process import, initialize and tools/list.
+    """
+    imports = [time_import() for _ in range(iterations)]
+    runs = [time_startup() for _ in range(iterations)]
+    results = [summarize("import", imports, sum(imports), 0)]
+    for phase in ("initialize", "tools_list"):
+        samples = [run[phase] for run in runs]
+        results.append(summarize(phase, samples, sum(samples), 0))
+    for result in results:
+        result["tools"] = runs[0]["tools"]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=10, help="server processes started per measurement")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run_startup_benchmarks(args.iterations)
+    print(json.dumps(results, indent=2) if args.json else format_table(results))
+
+
+if __name__ == "__main__":
+    main()
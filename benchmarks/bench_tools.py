@@ -0,0 +1,235 @@
+"""
+Latency / throughput benchmarks for the SeaTable MCP tools.
+
+Runs the tools against a local MockSeaTable and reports p50/p95/p99 latency,
+calls per second and peak Python memory per scenario:
+
+    python benchmarks/bench_tools.py --rows 10000 --latency 0.005 --iterations 200
+
+Scenarios call the tool functions in-process, except `stdio_round_trip`,
+which spawns `python -m seatable_mcp.server` and calls list_rows through a
+real MCP client session over stdio, and `http_shared_clients`, which starts
+one server with `--transport streamable-http` and calls list_rows from
+several concurrent client sessions.
+"""
+import os
+import sys
+import json
+import math
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+import tracemalloc
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mock_seatable import MockSeaTable  # noqa: E402
+
+API_TOKEN = "benchmark-token"
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    # Nearest-rank percentile
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(name: str, latencies: list, elapsed: float, peak_bytes: int) -> dict:
+    return {
+        "scenario": name,
+        "calls": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "calls_per_sec": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "peak_mem_kb": round(peak_bytes / 1024, 1),
+    }
+
+
+def measure(name: str, call, iterations: int, concurrency: int = 1) -> dict:
+    """
+    Call `call()` `iterations` times from `concurrency` threads.
+    """
+    latencies = []
+
+    def timed(_):
+        started = time.perf_counter()
+        result = call()
+        latencies.append(time.perf_counter() - started)
+        if isinstance(result, str) and result.startswith("Error"):
+            raise RuntimeError("%s failed: %s" % (name, result))
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(timed, range(iterations)))
+    else:
+        for i in range(iterations):
+            timed(i)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return summarize(name, latencies, elapsed, peak)
+
+
+def bench_stdio(mock_url: str, iterations: int, limit: int) -> dict:
+    """
+    Full MCP round-trip: client -> stdio -> server process -> mock SeaTable.
+    """
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    env = dict(os.environ, SEATABLE_SERVER_URL=mock_url, SEATABLE_API_TOKEN=API_TOKEN)
+    params = StdioServerParameters(command=sys.executable, args=["-m", "seatable_mcp.server"], env=env)
+
+    async def run():
+        latencies = []
+        async with stdio_client(params) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                tracemalloc.start()
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    t0 = time.perf_counter()
+                    result = await session.call_tool("list_rows", {"table_name": "Table1", "limit": limit})
+                    latencies.append(time.perf_counter() - t0)
+                    if result.isError:
+                        raise RuntimeError("stdio list_rows failed: %s" % result.content)
+                elapsed = time.perf_counter() - started
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+        return summarize("stdio_round_trip", latencies, elapsed, peak)
+
+    return asyncio.run(run())
+
+
+@contextmanager
+def http_server(mock_url: str):
+    """
+    Run `python -m seatable_mcp.server --transport streamable-http` against the
+    mock and yield its MCP endpoint URL.
+    """
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, SEATABLE_SERVER_URL=mock_url, SEATABLE_API_TOKEN=API_TOKEN)
+    proc = subprocess.Popen([sys.executable, "-m", "seatable_mcp.server", "--transport", "streamable-http",
+                             "--port", str(port)], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                if proc.poll() is not None or time.time() > deadline:
+                    raise RuntimeError("HTTP server did not start")
+                time.sleep(0.05)
+        yield "http://127.0.0.1:%d/mcp" % port
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def bench_http(mock_url: str, iterations: int, limit: int, clients: int = 4) -> dict:
+    """
+    Several MCP clients sharing one server process over streamable HTTP, and
+    with it the base pool, the caches and the connections to SeaTable.
+    """
+    from mcp import ClientSession
+    from mcp.client.streamable_http import streamable_http_client
+
+    async def client(url: str, calls: int, latencies: list):
+        async with streamable_http_client(url) as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                for _ in range(calls):
+                    t0 = time.perf_counter()
+                    result = await session.call_tool("list_rows", {"table_name": "Table1", "limit": limit})
+                    latencies.append(time.perf_counter() - t0)
+                    if result.isError:
+                        raise RuntimeError("HTTP list_rows failed: %s" % result.content)
+
+    async def run(url: str):
+        latencies = []
+        tracemalloc.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(client(url, max(1, iterations // clients), latencies) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return summarize("http_shared_clients", latencies, elapsed, peak)
+
+    with http_server(mock_url) as url:
+        return asyncio.run(run(url))
+
+
+def run_benchmarks(rows: int = 1000, latency: float = 0.0, iterations: int = 100, concurrency: int = 1,
+                   limit: int = 100, stdio: bool = True, http: bool = True) -> list:
+    """
+    Start a mock server, run every scenario and return one summary dict each.
+    """
+    with MockSeaTable(rows=rows, latency=latency) as mock:
+        os.environ["SEATABLE_SERVER_URL"] = mock.url
+        os.environ["SEATABLE_API_TOKEN"] = API_TOKEN
+        import seatable_mcp.server as server
+
+        server._check_base_cache.clear()
+        server._metadata_cache.clear()
+        server._sql_cache.clear()
+
+        results = [
+            measure("list_rows", lambda: server.list_rows("Table1", limit=limit), iterations, concurrency),
+            measure("list_rows_json", lambda: server.list_rows("Table1", limit=limit, output_format="json"), iterations, concurrency),
+            measure("add_row", lambda: server.add_row("Table1", {"Name": "bench", "Amount": 1}), iterations, concurrency),
+            measure("run_sql", lambda: server.run_sql("SELECT * FROM Table1 LIMIT %d" % limit, use_cache=False), iterations, concurrency),
+            measure("run_sql_cached", lambda: server.run_sql("SELECT * FROM Table1 LIMIT %d" % limit), iterations, concurrency),
+            measure("get_base_info", lambda: server.get_base_info(), iterations, concurrency),
+        ]
+        if stdio:
+            results.append(bench_stdio(mock.url, iterations, limit))
+        if http:
+            results.append(bench_http(mock.url, iterations, limit, max(2, concurrency)))
+        return results
+
+
+def format_table(results: list) -> str:
+    headers = ["scenario", "calls", "p50_ms", "p95_ms", "p99_ms", "calls_per_sec", "peak_mem_kb"]
+    widths = [max(len(h), *(len(str(r[h])) for r in results)) for h in headers]
+    lines = ["  ".join(h.ljust(w) for h, w in zip(headers, widths))]
+    lines.append("  ".join("-" * w for w in widths))
+    for r in results:
+        lines.append("  ".join(str(r[h]).ljust(w) for h, w in zip(headers, widths)))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000, help="rows in the mock table")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of simulated latency per HTTP request")
+    parser.add_argument("--iterations", type=int, default=100, help="calls per scenario")
+    parser.add_argument("--concurrency", type=int, default=1, help="threads calling each tool")
+    parser.add_argument("--limit", type=int, default=100, help="rows per list_rows / run_sql call")
+    parser.add_argument("--no-stdio", action="store_true", help="skip the MCP stdio round-trip scenario")
+    parser.add_argument("--no-http", action="store_true", help="skip the shared HTTP server scenario")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run_benchmarks(rows=args.rows, latency=args.latency, iterations=args.iterations,
+                             concurrency=args.concurrency, limit=args.limit, stdio=not args.no_stdio,
+                             http=not args.no_http)
+    print(json.dumps(results, indent=2) if args.json else format_table(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+"""
+A local stand-in for the SeaTable REST / API-gateway endpoints used by the
+MCP server, for benchmarks and end-to-end tests.
+
+    with MockSeaTable(rows=10000, latency=0.01) as mock:
+        os.environ["SEATABLE_SERVER_URL"] = mock.url
+        ...
+
+Every request sleeps `latency` seconds before answering, to model the
+network round-trip to a real server. With `socket=True` a socket.io server
+on a second port stands in for the dtable-server event stream: row writes
+are broadcast as update-dtable operations, and emit_change() sends
+arbitrary ones.
+"""
+import re
+import json
+import time
+import uuid
+import base64
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler, make_server
+from urllib.parse import urlparse, parse_qs
+
+DTABLE_UUID = "0a1b2c3d-4e5f-6789-abcd-ef0123456789"
+COLUMNS = [
+    {"key": "Name", "name": "Name", "type": "text", "data": None},
+    {"key": "Amount", "name": "Amount", "type": "number", "data": None},
+    {"key": "Team", "name": "Team", "type": "text", "data": None},
+]
+SYSTEM_COLUMNS = [
+    {"key": "_id", "name": "_id", "type": "text", "data": None},
+    {"key": "_ctime", "name": "_ctime", "type": "ctime", "data": None},
+    {"key": "_mtime", "name": "_mtime", "type": "mtime", "data": None},
+]
+
+
+def _timestamp(offset_seconds: int = 0) -> str:
+    moment = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=offset_seconds)
+    return moment.isoformat(timespec="milliseconds")
+
+
+def _jwt(lifetime: int = 3 * 24 * 3600) -> str:
+    def part(obj):
+        return base64.urlsafe_b64encode(json.dumps(obj).encode()).decode().rstrip("=")
+    return ".".join([part({"alg": "none"}), part({"exp": int(time.time()) + lifetime}), "sig"])
+
+
+class MockSeaTable:
+    """
+    In-memory SeaTable base served over HTTP on 127.0.0.1.
+
+    Args:
+        rows: Number of rows generated in table "Table1".
+        latency: Seconds every request waits before it is answered.
+        socket: Also serve the socket.io change-event stream.
+    """
+
+    def __init__(self, rows: int = 1000, latency: float = 0.0, port: int = 0, socket: bool = False):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.request_count = 0
+        # TCP connections accepted and access tokens issued
+        self.connection_count = 0
+        self.auth_count = 0
+        self.tables = {"Table1": [self._make_row(i) for i in range(rows)]}
+        self.views = {"Table1": [{"_id": "0000", "name": "Default View", "type": "table"}]}
+        # Uploaded attachments: relative path -> content
+        self.assets = {}
+        # Request headers of the last file upload
+        self.upload_headers = None
+        self._clock = rows
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+        self.sio = None
+        self._socket_server = None
+        if socket:
+            self._init_socket()
+
+    @property
+    def url(self) -> str:
+        return "http://127.0.0.1:%d" % self._server.server_address[1]
+
+    @property
+    def socket_url(self) -> str:
+        return "http://127.0.0.1:%d" % self._socket_server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        if self._socket_server is not None:
+            threading.Thread(target=self._socket_server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._socket_server is not None:
+            self._socket_server.shutdown()
+            self._socket_server.server_close()
+
+    def _init_socket(self):
+        import socketio
+
+        class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+            daemon_threads = True
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        self.sio = socketio.Server(async_mode="threading")
+        self.sio.on("join-room", lambda sid, dtable_uuid, *args: self.sio.enter_room(sid, dtable_uuid))
+        app = socketio.WSGIApp(self.sio, socketio_path="api-gateway/socket.io")
+        self._socket_server = make_server("127.0.0.1", 0, app, server_class=ThreadingWSGIServer,
+                                          handler_class=QuietHandler)
+
+    def emit_change(self, operation: dict):
+        """
+        Broadcast an update-dtable operation to the clients that joined the base.
+        """
+        if self.sio is not None:
+            self.sio.emit("update-dtable", json.dumps(operation), room=DTABLE_UUID)
+
+    def table_id(self, table_name: str) -> str:
+        return "t%03d" % list(self.tables).index(table_name)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @staticmethod
+    def _make_row(i: int) -> dict:
+        return {
+            "_id": "row%07d" % i,
+            "_ctime": _timestamp(i),
+            "_mtime": _timestamp(i),
+            "_creator": "bench@example.com",
+            "Name": "Row %d" % i,
+            "Amount": i % 100,
+            "Team": "ABCD"[i % 4],
+        }
+
+    def _tick(self) -> str:
+        self._clock += 1
+        return _timestamp(self._clock)
+
+    def metadata(self) -> dict:
+        return {"tables": [
+            {"_id": "t%03d" % i, "name": name, "columns": COLUMNS, "views": self.views.get(name, [])}
+            for i, name in enumerate(self.tables)
+        ]}
+
+    # Request handling
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with mock.lock:
+                    mock.connection_count += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status: int, payload):
+                raw = isinstance(payload, bytes)
+                body = payload if raw else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/octet-stream" if raw else "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                data = self.rfile.read(length) if length else b""
+                if (self.headers.get("Content-Type") or "").startswith("multipart/form-data"):
+                    mock.upload_headers = dict(self.headers)
+                    return {"multipart": data, "content_type": self.headers["Content-Type"]}
+                return json.loads(data or b"{}") if data else {}
+
+            def _dispatch(self, method: str):
+                with mock.lock:
+                    mock.request_count += 1
+                if mock.latency:
+                    time.sleep(mock.latency)
+                parsed = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                body = self._body() if method in ("POST", "PUT", "DELETE") else {}
+                try:
+                    status, payload = mock.handle(method, parsed.path, params, body)
+                except KeyError as e:
+                    status, payload = 404, {"error_msg": "Not found: %s" % e}
+                self._reply(status, payload)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_PUT(self):
+                self._dispatch("PUT")
+
+            def do_DELETE(self):
+                self._dispatch("DELETE")
+
+        return Handler
+
+    def handle(self, method: str, path: str, params: dict, body: dict):
+        if path == "/api/v2.1/dtable/app-access-token/":
+            with self.lock:
+                self.auth_count += 1
+            return 200, {
+                "access_token": _jwt(),
+                "dtable_uuid": DTABLE_UUID,
+                "dtable_server": (self.socket_url if self.sio else self.url) + "/dtable-server/",
+                "dtable_db": self.url + "/dtable-db/",
+                "workspace_id": 1,
+                "dtable_name": "Benchmark",
+                "use_api_gateway": True,
+            }
+
+        if path == "/api/v2.1/dtable/app-upload-link/":
+            return 200, {"upload_link": self.url + "/seafhttp/upload-api/mock",
+                         "parent_path": "/asset/" + DTABLE_UUID,
+                         "img_relative_path": "images/2024-01",
+                         "file_relative_path": "files/2024-01"}
+        if path == "/seafhttp/upload-api/mock":
+            return self._upload(body)
+        if path == "/api/v2.1/dtable/app-download-link/":
+            if params["path"] not in self.assets:
+                raise KeyError(params["path"])
+            return 200, {"download_link": self.url + "/seafhttp/files/" + params["path"]}
+        if path.startswith("/seafhttp/files/"):
+            return 200, self.assets[path[len("/seafhttp/files/"):]]
+
+        prefix = "/api-gateway/api/v2/dtables/%s/" % DTABLE_UUID
+        if not path.startswith(prefix):
+            raise KeyError(path)
+        resource = path[len(prefix):].strip("/")
+
+        with self.lock:
+            if resource == "metadata":
+                return 200, {"metadata": self.metadata()}
+            if resource == "columns":
+                if params["table_name"] not in self.tables:
+                    raise KeyError(params["table_name"])
+                return 200, {"columns": COLUMNS}
+            if resource == "views":
+                return 200, {"views": self.views.get(params["table_name"], [])}
+            if resource == "rows":
+                status, payload, changes = self._rows(method, params, body)
+                for change in changes:
+                    self.emit_change(change)
+                return status, payload
+            if resource == "sql":
+                return self._sql(body["sql"])
+        raise KeyError(path)
+
+    def _rows(self, method: str, params: dict, body: dict):
+        """
+        Returns (status, payload, update-dtable operations to broadcast).
+        """
+        if method == "GET":
+            rows = self.tables[params["table_name"]]
+            start = int(params.get("start") or 0)
+            limit = int(params.get("limit") or 1000)
+            return 200, {"rows": rows[start:start + limit]}, []
+
+        rows = self.tables[body["table_name"]]
+        table_id = self.table_id(body["table_name"])
+        if method == "POST":
+            added = []
+            for data in body["rows"]:
+                now = self._tick()
+                row = {"_id": uuid.uuid4().hex[:22], "_ctime": now, "_mtime": now, **data}
+                rows.append(row)
+                added.append(row)
+            return 200, {"first_row": added[0] if added else None,
+                         "inserted_row_count": len(added),
+                         "row_ids": [{"_id": row["_id"]} for row in added]}, \
+                [{"op_type": "insert_rows", "table_id": table_id, "row_data": [dict(row) for row in added]}]
+        if method == "PUT":
+            by_id = {row["_id"]: row for row in rows}
+            changes = []
+            for update in body["updates"]:
+                row = by_id.get(update["row_id"])
+                if row is not None:
+                    row.update(update["row"])
+                    row["_mtime"] = self._tick()
+                    changes.append({"op_type": "modify_row", "table_id": table_id, "row_id": row["_id"],
+                                    "updated": dict(update["row"], _mtime=row["_mtime"])})
+            return 200, {"success": True}, changes
+        if method == "DELETE":
+            doomed = set(body["row_ids"])
+            rows[:] = [row for row in rows if row["_id"] not in doomed]
+            return 200, {"deleted_rows": len(doomed)}, \
+                [{"op_type": "delete_rows", "table_id": table_id, "row_ids": sorted(doomed)}]
+        raise KeyError(method)
+
+    def _upload(self, body: dict):
+        boundary = body["content_type"].split("boundary=", 1)[1].encode()
+        fields, content, name = {}, b"", None
+        for part in body["multipart"].split(b"--" + boundary)[1:-1]:
+            headers, _, value = part[2:-2].partition(b"\r\n\r\n")
+            field = re.search(rb'name="([^"]*)"', headers).group(1).decode()
+            filename = re.search(rb'filename="([^"]*)"', headers)
+            if filename:
+                name, content = filename.group(1).decode(), value
+            else:
+                fields[field] = value.decode()
+        with self.lock:
+            self.assets[fields["relative_path"] + "/" + name] = content
+        return 200, [{"name": name, "size": len(content)}]
+
+    def _sql(self, sql: str):
+        """
+        A tiny subset of SeaTable SQL: SELECT <columns|*|COUNT(*)> FROM <table>
+        with optional WHERE <column> (=|>=|>) <literal>, LIMIT and OFFSET.
+        """
+        match = re.match(
+            r"\s*SELECT\s+(?P<columns>.+?)\s+FROM\s+`?(?P<table>[^`\s]+)`?"
+            r"(?:\s+WHERE\s+`?(?P<column>\w+)`?\s*(?P<op>>=|>|=)\s*(?P<value>'[^']*'|[\d.]+))?"
+            r"(?:\s+ORDER BY\s+\w+)?"
+            r"(?:\s+LIMIT\s+(?P<limit>\d+))?(?:\s+OFFSET\s+(?P<offset>\d+))?\s*;?\s*$",
+            sql, re.IGNORECASE)
+        if not match:
+            return 200, {"success": False, "error_message": "unsupported query: %s" % sql}
+
+        rows = self.tables[match.group("table")]
+        if match.group("column"):
+            column, op, value = match.group("column"), match.group("op"), match.group("value")
+            value = value[1:-1] if value.startswith("'") else float(value)
+            compare = {"=": lambda a: a == value, ">=": lambda a: a >= value, ">": lambda a: a > value}[op]
+            rows = [row for row in rows if row.get(column) is not None and compare(row[column])]
+
+        offset = int(match.group("offset") or 0)
+        limit = min(int(match.group("limit") or 100), 10000)
+        rows = rows[offset:offset + limit]
+
+        columns = match.group("columns").strip()
+        all_columns = SYSTEM_COLUMNS + COLUMNS
+        if columns.upper() == "COUNT(*)":
+            return 200, {"success": True, "metadata": [{"key": "COUNT(*)", "name": "COUNT(*)", "type": "number"}],
+                         "results": [{"COUNT(*)": len(rows)}]}
+        if columns != "*":
+            names = [c.strip().strip("`") for c in columns.split(",")]
+            all_columns = [c for c in all_columns if c["name"] in names]
+        keys = [c["key"] for c in all_columns]
+        return 200, {"success": True, "metadata": all_columns,
+                     "results": [{k: row.get(k) for k in keys} for row in rows]}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a mock SeaTable base.")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    mock = MockSeaTable(rows=args.rows, latency=args.latency, port=args.port).start()
+    print("Mock SeaTable serving %d rows at %s" % (args.rows, mock.url))
+    try:
+        mock._thread.join()
+    except KeyboardInterrupt:
+        mock.stop()
@@ -1,34 +1,1184 @@
 import os
 import sys
 import json
+import re
+import logging
+import base64
+import csv
+import time
+import random
+import atexit
+import hashlib
+import importlib
+import uuid
+import array
+import shutil
+import tempfile
+import email.utils
+import asyncio
+import weakref
+import functools
+import threading
+import contextvars
+import argparse
+import http.cookiejar
+from datetime import datetime
+from urllib.parse import quote, unquote
+from contextlib import contextmanager
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from mcp.server.fastmcp import FastMCP
-from seatable_api import Base, context
-from seatable_api.constants import ColumnTypes
+from mcp.server.fastmcp.exceptions import ToolError
+
+# seatable_api (and requests with it) is imported by the first call that
+# needs it rather than at startup. name -> (module, attribute or None for the module)
+_LAZY_IMPORTS = {
+    "Base": ("seatable_api", "Base"),
+    "ColumnTypes": ("seatable_api.constants", "ColumnTypes"),
+    "AuthExpiredError": ("seatable_api.exception", "AuthExpiredError"),
+    "BaseUnauthError": ("seatable_api.exception", "BaseUnauthError"),
+    "requests": ("requests", None),
+    "SIO": ("seatable_api.socket_io", "SIO"),
+}
+
+def _lazy(name: str):
+    """
+    Return a lazily imported name, importing it on first use. A value already
+    bound in the module (e.g. patched in tests) takes precedence.
+    """
+    value = globals().get(name)
+    if value is None:
+        module_name, attribute = _LAZY_IMPORTS[name]
+        module = importlib.import_module(module_name)
+        value = module if attribute is None else getattr(module, attribute)
+        if module_name.startswith("seatable_api"):
+            _pool_connections()
+        # seatable_api points the root logger at stdout on import, which would
+        # interleave log lines with the MCP messages of the stdio transport
+        for handler in logging.getLogger().handlers:
+            if isinstance(handler, logging.StreamHandler) and handler.stream is sys.stdout:
+                handler.setStream(sys.stderr)
+        globals()[name] = value
+    return value
+
+# Size of the keep-alive connection pool to SeaTable shared by all bases and clients
+HTTP_POOL_SIZE = int(os.environ.get("SEATABLE_HTTP_POOL_SIZE", "32"))
+_http = None
+_http_lock = threading.Lock()
+
+def _http_session():
+    """
+    Return the process-wide requests session. Its connections (and their TLS
+    handshakes) are reused by every base, client session and worker thread.
+    """
+    global _http
+    with _http_lock:
+        if _http is None:
+            requests = _lazy("requests")
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            # Bases authenticate by header; cookies set for one must not reach another
+            session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+            _http = session
+    return _http
+
+class _HTTPStatusError(ConnectionError):
+    """
+    ConnectionError(status_code, text), as seatable-api raises for HTTP
+    errors, that also carries the response (and so its headers).
+    """
+
+    def __init__(self, response):
+        super().__init__(response.status_code, response.text)
+        self.response = response
+
+# The last error response seatable_api received on this thread. seatable-api
+# raises ConnectionError(status_code, text) without it; call_base attaches it
+_failed_response = threading.local()
+
+def _checked(response):
+    if response.status_code >= 400:
+        _failed_response.value = response
+    return response
+
+class _PooledRequests:
+    """
+    Stands in for the requests module inside seatable_api, which calls
+    requests.get/post/... and so would open a new connection per request.
+    """
+
+    def __getattr__(self, name: str):
+        return getattr(_lazy("requests"), name)
+
+    def request(self, method: str, url: str, **kwargs):
+        return _checked(_http_session().request(method, url, **kwargs))
+
+    def get(self, url: str, params=None, **kwargs):
+        return _checked(_http_session().get(url, params=params, **kwargs))
+
+    def post(self, url: str, data=None, json=None, **kwargs):
+        return _checked(_http_session().post(url, data=data, json=json, **kwargs))
+
+    def put(self, url: str, data=None, **kwargs):
+        return _checked(_http_session().put(url, data=data, **kwargs))
+
+    def delete(self, url: str, **kwargs):
+        return _checked(_http_session().delete(url, **kwargs))
+
+def _pool_connections():
+    for module_name in ("seatable_api.main", "seatable_api.api_gateway"):
+        module = importlib.import_module(module_name)
+        if not isinstance(module.requests, _PooledRequests):
+            module.requests = _PooledRequests()
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        return _lazy(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class _DeferredFastMCP(FastMCP):
+    """
+    FastMCP that builds its tool registry on the first tools/list or
+    tools/call instead of at import. Deriving the argument models of every
+    tool is a large part of startup, and `initialize` does not need them.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._deferred_tools = []
+        self._deferred_lock = threading.Lock()
+        # Client session -> semaphore bounding its concurrent tool calls
+        self._client_slots = weakref.WeakKeyDictionary()
+        # Names of tools hidden from and refused to clients (see main)
+        self.withheld = set()
+
+    def defer_tool(self, fn, name: str, description: str):
+        with self._deferred_lock:
+            self._deferred_tools.append((fn, name, description))
+
+    def register_deferred_tools(self):
+        if not self._deferred_tools:
+            return
+        with self._deferred_lock:
+            for fn, name, description in self._deferred_tools:
+                self.add_tool(fn, name=name, description=description)
+            self._deferred_tools = []
+
+    async def list_tools(self):
+        self.register_deferred_tools()
+        return [t for t in await super().list_tools() if t.name not in self.withheld]
+
+    async def call_tool(self, name, arguments):
+        self.register_deferred_tools()
+        if name in self.withheld:
+            raise ToolError(f"Unknown tool: {name}")
+        async with self._client_slot():
+            return await super().call_tool(name, arguments)
+
+    def _client_slot(self) -> asyncio.Semaphore:
+        """
+        Return the semaphore of the calling client session. Over HTTP many
+        clients share the I/O pool and the per-base limits, so each one may
+        only have SEATABLE_PER_CLIENT_CONCURRENCY calls in flight.
+        """
+        try:
+            session = self._mcp_server.request_context.session
+        except LookupError:
+            session = self
+        if session not in self._client_slots:
+            self._client_slots[session] = asyncio.Semaphore(max(1, PER_CLIENT_CONCURRENCY))
+        return self._client_slots[session]
 
 # Initialize FastMCP
-mcp = FastMCP("seatable")
+mcp = _DeferredFastMCP("seatable")
 server_url = "https://table.nju.edu.cn"
 
-# Global variable to hold the SeaTable base connections
+# SeaTable rejects batch row requests with more than 1000 rows
+MAX_BATCH_SIZE = 1000
+
+# SeaTable returns at most 1000 rows per list_rows page
+MAX_PAGE_SIZE = 1000
+
+# Default encoding of tool results: repr, json, columnar or ndjson
+DEFAULT_OUTPUT_FORMAT = os.environ.get("SEATABLE_OUTPUT_FORMAT", "repr")
+OUTPUT_FORMATS = ("repr", "json", "columnar", "ndjson")
+# Row fields maintained by SeaTable itself, dropped with drop_system_fields=True
+SYSTEM_FIELDS = frozenset(("_ctime", "_mtime", "_creator", "_last_modifier", "_participants",
+                           "_locked", "_locked_by", "_archived"))
+
+# Upper bound on pages fetched ahead of the client in paginated list_rows
+MAX_PREFETCHED_PAGES = 8
+# Seconds a prefetched page may be served after it was requested
+PREFETCH_TTL = float(os.environ.get("SEATABLE_PREFETCH_TTL", "10"))
+_prefetch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="seatable-prefetch")
+# Key: (api_token, table_name, view_name, start, limit) -> (expires_at, future)
+_prefetched_pages = OrderedDict()
+_prefetch_lock = threading.Lock()
+
+def _drop_prefetched(api_token: str, table_name: str = None):
+    """
+    Discard the prefetched pages of a table, or of the whole base if table_name is None.
+    """
+    with _prefetch_lock:
+        for key in [k for k in _prefetched_pages if k[0] == api_token and (table_name is None or k[1] == table_name)]:
+            _prefetched_pages.pop(key)[1].cancel()
+
+class _TTLCache:
+    """
+    A thread-safe LRU cache whose entries expire after `ttl` seconds.
+    Keys are tuples starting with the API token of the base they belong to.
+    """
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # Invalidation counters: api_token (any invalidation of the base),
+        # (api_token, None) (the whole base) and (api_token, lowercased table)
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def _stamp(self, key) -> tuple:
+        """
+        Return the invalidation counters an entry for key depends on. Called
+        with the lock held.
+        """
+        token = key[0]
+        if len(key) < 3:
+            return (self._epoch, self._generations.get(token, 0))
+        tables = sorted(key[2]) if isinstance(key[2], frozenset) else [str(key[2]).lower()]
+        return (self._epoch, self._generations.get((token, None), 0),
+                *(self._generations.get((token, table), 0) for table in tables))
+
+    def get(self, key, loader):
+        """
+        Return the cached value for key, calling loader() to fill it on a miss.
+        The loaded value is not stored if the entry was invalidated while
+        loader() ran, since it may predate the write that invalidated it.
+        """
+        stamp = None
+        if self.ttl > 0 and self.maxsize > 0:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self.misses += 1
+                stamp = self._stamp(key)
+        else:
+            with self._lock:
+                self.misses += 1
+
+        value = loader()
+        if stamp is not None:
+            with self._lock:
+                if self._stamp(key) != stamp:
+                    return value
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, api_token: str, table_name: str = None):
+        """
+        Drop the base-level entries of a base and, if table_name is given, the
+        entries of that table. Without table_name everything of the base goes.
+        The third key element is either a table name or a frozenset of the
+        (lowercased) table names an entry depends on.
+        """
+        with self._lock:
+            for counter in (api_token, (api_token, table_name.lower() if table_name else None)):
+                self._generations[counter] = self._generations.get(counter, 0) + 1
+            for key in list(self._entries):
+                if key[0] != api_token:
+                    continue
+                if table_name is None or len(key) < 3 or key[2] == table_name or (
+                        isinstance(key[2], frozenset) and table_name.lower() in key[2]):
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries),
+                    "maxsize": self.maxsize, "ttl": self.ttl}
+
+class _BasePool:
+    """
+    A thread-safe LRU pool of authenticated Base instances.
+
+    Authentication is single-flight per token: concurrent first calls wait for
+    one base.auth() instead of each running their own. A Base whose access
+    token is about to expire is re-authenticated before it is handed out.
+
+    If listener_factory is set, each pooled base gets a background change
+    listener, listener_factory(api_token, base), which is told about
+    re-authentication via .refresh(base) and stopped via .stop() when the base
+    leaves the pool.
+    """
+
+    def __init__(self, maxsize: int, refresh_margin: float, listener_factory=None):
+        self.maxsize = maxsize
+        self.refresh_margin = refresh_margin
+        self.listener_factory = listener_factory
+        self._entries = OrderedDict()
+        # Map: api_token -> time.monotonic() of the last successful auth
+        self._authed_at = {}
+        self._auth_locks = {}
+        self._listeners = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, api_token):
+        with self._lock:
+            return api_token in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _auth_lock(self, api_token: str) -> threading.Lock:
+        with self._lock:
+            return self._auth_locks.setdefault(api_token, threading.Lock())
+
+    def _expiring(self, base) -> bool:
+        expires_at = _token_expiry(base)
+        return expires_at is not None and expires_at - time.time() < self.refresh_margin
+
+    def _store(self, api_token: str, base):
+        stopped = []
+        with self._lock:
+            self._entries[api_token] = base
+            self._entries.move_to_end(api_token)
+            self._authed_at[api_token] = time.monotonic()
+            while len(self._entries) > self.maxsize:
+                evicted, _ = self._entries.popitem(last=False)
+                self._authed_at.pop(evicted, None)
+                stopped.append(self._listeners.pop(evicted, None))
+                lock = self._auth_locks.get(evicted)
+                if lock is not None and not lock.locked():
+                    del self._auth_locks[evicted]
+            listener = self._listeners.get(api_token)
+            start = self.listener_factory is not None and listener is None
+        # Listeners connect and disconnect in the background, outside the lock
+        self._stop_listeners(stopped)
+        if start:
+            listener = self.listener_factory(api_token, base)
+            with self._lock:
+                self._listeners[api_token] = listener
+        elif listener is not None:
+            listener.refresh(base)
+
+    @staticmethod
+    def _stop_listeners(listeners: list):
+        for listener in listeners:
+            if listener is not None:
+                listener.stop()
+
+    def listener(self, api_token: str):
+        with self._lock:
+            return self._listeners.get(api_token)
+
+    def listeners(self) -> list:
+        with self._lock:
+            return list(self._listeners.values())
+
+    def get(self, api_token: str, connect):
+        """
+        Return the pooled Base for api_token, calling connect() to create and
+        authenticate one if there is none.
+        """
+        with self._lock:
+            base = self._entries.get(api_token)
+            if base is not None:
+                self._entries.move_to_end(api_token)
+        if base is not None and not self._expiring(base):
+            return base
+
+        with self._auth_lock(api_token):
+            with self._lock:
+                base = self._entries.get(api_token)
+            if base is not None and not self._expiring(base):
+                return base
+            if base is None:
+                base = connect()
+            else:
+                base.auth()
+            self._store(api_token, base)
+            return base
+
+    def reauth(self, api_token: str, base, since: float):
+        """
+        Re-authenticate base after a call started at `since` (time.monotonic())
+        was rejected, unless another thread already did so in the meantime.
+        """
+        with self._auth_lock(api_token):
+            with self._lock:
+                current = self._entries.get(api_token)
+                authed_at = self._authed_at.get(api_token, 0)
+            if current is not base or authed_at > since:
+                # Replaced or refreshed by another call; the retry picks it up
+                return
+            base.auth()
+            self._store(api_token, base)
+
+    def invalidate(self, api_token: str):
+        with self._lock:
+            self._entries.pop(api_token, None)
+            self._authed_at.pop(api_token, None)
+            listener = self._listeners.pop(api_token, None)
+        self._stop_listeners([listener])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._authed_at.clear()
+            listeners = list(self._listeners.values())
+            self._listeners.clear()
+        self._stop_listeners(listeners)
+
+def _token_expiry(base) -> float:
+    """
+    Return the expiry time (epoch seconds) of a Base's access token, read from
+    the JWT `exp` claim when possible, else from the client-side jwt_exp.
+    """
+    jwt_token = getattr(base, "jwt_token", None)
+    if isinstance(jwt_token, str) and jwt_token.count(".") == 2:
+        try:
+            payload = jwt_token.split(".")[1]
+            payload += "=" * (-len(payload) % 4)
+            exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+            if isinstance(exp, (int, float)):
+                return float(exp)
+        except Exception:
+            pass
+    jwt_exp = getattr(base, "jwt_exp", None)
+    if isinstance(jwt_exp, datetime):
+        return jwt_exp.timestamp()
+    return None
+
+# Global pool of authenticated SeaTable base connections
 # Map: api_token -> Base instance
-_check_base_cache = {}
+_check_base_cache = _BasePool(
+    maxsize=int(os.environ.get("SEATABLE_BASE_POOL_SIZE", "64")),
+    refresh_margin=float(os.environ.get("SEATABLE_TOKEN_REFRESH_MARGIN", "300")),
+)
+
+# Metadata (base info, columns, views) cache
+# Key: (api_token, kind, table_name, ...)
+_metadata_cache = _TTLCache(
+    ttl=float(os.environ.get("SEATABLE_METADATA_CACHE_TTL", "60")),
+    maxsize=int(os.environ.get("SEATABLE_METADATA_CACHE_SIZE", "256")),
+)
+
+# run_sql result cache
+# Key: (api_token, "sql", frozenset of referenced tables, normalized query, page_size)
+_sql_cache = _TTLCache(
+    ttl=float(os.environ.get("SEATABLE_SQL_CACHE_TTL", "30")),
+    maxsize=int(os.environ.get("SEATABLE_SQL_CACHE_SIZE", "128")),
+)
+
+def _schema_changed(api_token: str, table_name: str = None):
+    """
+    Invalidate cached metadata and query results after a schema change of a
+    table, or of the whole base if table_name is None.
+    """
+    _metadata_cache.invalidate(api_token, table_name)
+    _sql_cache.invalidate(api_token, table_name)
+    _row_index.invalidate(api_token, table_name)
+    _drop_prefetched(api_token, table_name)
+
+# Seconds a table snapshot may lag before a read triggers an incremental sync
+SNAPSHOT_MAX_STALENESS = float(os.environ.get("SEATABLE_SNAPSHOT_MAX_STALENESS", "30"))
+
+class _TableSnapshot:
+    """
+    In-memory read replica of one table: rows by _id plus the highest _mtime
+    seen, used as the watermark for incremental syncs.
+    """
+
+    def __init__(self, api_token: str, table_name: str):
+        self.api_token = api_token
+        self.table_name = table_name
+        self.rows = {}
+        self.watermark = None
+        self.synced_at = None
+        # Set by writes through this server; forces a sync on the next read
+        self.dirty = False
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def _track(rows: dict, watermark: str, row: dict) -> str:
+        """
+        Add a row to rows and return the watermark advanced to its _mtime.
+        """
+        rows[row["_id"]] = row
+        mtime = row.get("_mtime")
+        if mtime and (watermark is None or str(mtime) > watermark):
+            watermark = str(mtime)
+        return watermark
+
+    def sync(self, full: bool = False):
+        """
+        Seed the snapshot with a full paginated pull, or fetch only the rows
+        modified since the watermark and drop the rows whose _id is no longer
+        in the table.
+        """
+        with self.lock:
+            if full or self.watermark is None:
+                # Built aside and swapped in only once every page has arrived, so
+                # a failed pull leaves the previous snapshot in place
+                rows, watermark, start = {}, None, 0
+                while True:
+                    page = _fetch_page(self.api_token, self.table_name, None, start, MAX_PAGE_SIZE)
+                    for row in page:
+                        watermark = self._track(rows, watermark, row)
+                    if len(page) < MAX_PAGE_SIZE:
+                        break
+                    start += MAX_PAGE_SIZE
+                self.rows, self.watermark = rows, watermark
+            else:
+                # >= rather than >: rows sharing the watermark timestamp may be new
+                where = "_mtime >= '%s'" % self.watermark.replace("'", "''")
+                offset = 0
+                while True:
+                    sql = "SELECT * FROM `%s` WHERE %s ORDER BY _mtime LIMIT %d OFFSET %d" % (
+                        self.table_name, where, MAX_PAGE_SIZE, offset)
+                    page = call_base(self.api_token, lambda b: b.query(sql), idempotent=True) or []
+                    for row in page:
+                        self.watermark = self._track(self.rows, self.watermark, row)
+                    if len(page) < MAX_PAGE_SIZE:
+                        break
+                    offset += MAX_PAGE_SIZE
+                # _mtime does not reveal rows deleted by other clients: compare the ids
+                ids, offset = set(), 0
+                while True:
+                    sql = "SELECT _id FROM `%s` ORDER BY _id LIMIT %d OFFSET %d" % (self.table_name, MAX_PAGE_SIZE, offset)
+                    page = call_base(self.api_token, lambda b: b.query(sql), idempotent=True) or []
+                    ids.update(row["_id"] for row in page if isinstance(row, dict) and row.get("_id"))
+                    if len(page) < MAX_PAGE_SIZE:
+                        break
+                    offset += MAX_PAGE_SIZE
+                for row_id in [row_id for row_id in self.rows if row_id not in ids]:
+                    del self.rows[row_id]
+            self.synced_at = time.monotonic()
+            self.dirty = False
+
+    def fresh_rows(self) -> dict:
+        """
+        Return a copy of the rows, syncing first if the snapshot is older than
+        the staleness bound or was written to through this server. While a
+        change listener is connected the snapshot is kept current by its events
+        and does not expire. The copy is taken under the lock, so callers can
+        iterate it while writes patch the snapshot.
+        """
+        with self.lock:
+            stale = self.synced_at is None or (time.monotonic() - self.synced_at > SNAPSHOT_MAX_STALENESS
+                                               and not _listening(self.api_token))
+            if self.dirty or stale:
+                self.sync()
+            return dict(self.rows)
+
+# Map: (api_token, table_name) -> _TableSnapshot, for tables with an enabled snapshot
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+def _get_snapshot(api_token: str, table_name: str) -> _TableSnapshot:
+    with _snapshots_lock:
+        return _snapshots.get((api_token, table_name))
+
+def _after_row_write(api_token: str, table_name: str, rows: list = None, deleted_ids: list = None, inserted: bool = False):
+    """
+    Propagate a successful row write to the local read state of the table.
+    rows are full or partial rows carrying an _id (inserted=True for new rows
+    returned by the server); rows without one (e.g. from batch appends) are
+    picked up by the next incremental sync or row lookup.
+    """
+    _sql_cache.invalidate(api_token, table_name)
+    _drop_prefetched(api_token, table_name)
+    _row_index.patch(api_token, table_name, rows, deleted_ids, inserted)
+    _patch_snapshot(api_token, table_name, rows, deleted_ids, dirty=True)
+
+def _patch_snapshot(api_token: str, table_name: str, rows: list = None, deleted_ids: list = None, dirty: bool = False):
+    """
+    Merge changed rows into and drop deleted rows from the snapshot of a table,
+    if it has one. dirty=True makes the next read sync with the server.
+    """
+    snapshot = _get_snapshot(api_token, table_name)
+    if snapshot is None:
+        return
+    with snapshot.lock:
+        for row in rows or []:
+            if isinstance(row, dict) and row.get("_id"):
+                snapshot.rows[row["_id"]] = {**snapshot.rows.get(row["_id"], {}), **row}
+        for row_id in deleted_ids or []:
+            snapshot.rows.pop(row_id, None)
+        snapshot.dirty = snapshot.dirty or dirty
+
+def _mark_snapshots_dirty(api_token: str, table_name: str = None):
+    with _snapshots_lock:
+        snapshots = [snap for (token, name), snap in _snapshots.items()
+                     if token == api_token and (table_name is None or name == table_name)]
+    for snapshot in snapshots:
+        snapshot.dirty = True
+
+class _RowIndex:
+    """
+    Hash index of rows by (api_token, table_name, _id), filled from list_rows
+    pages and row lookups and patched by writes through this server. Entries
+    expire after `ttl` seconds unless a change listener keeps the base
+    current; the least recently used rows are evicted beyond `maxsize`.
+    """
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _store(self, key, row: dict, now: float):
+        self._rows[key] = (now + self.ttl, row)
+        self._rows.move_to_end(key)
+
+    def _evict(self):
+        while len(self._rows) > self.maxsize:
+            self._rows.popitem(last=False)
+
+    def add(self, api_token: str, table_name: str, rows: list):
+        """
+        Index complete rows as read from the table (not from a view).
+        """
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            for row in rows or []:
+                if isinstance(row, dict) and row.get("_id"):
+                    self._store((api_token, table_name, row["_id"]), row, now)
+            self._evict()
+
+    def lookup(self, api_token: str, table_name: str, row_ids: list):
+        """
+        Return ({row_id: row} of the indexed rows, [row_ids not indexed]).
+        """
+        found, missing = {}, []
+        now = time.monotonic()
+        expires = not _listening(api_token)
+        with self._lock:
+            for row_id in row_ids:
+                key = (api_token, table_name, row_id)
+                entry = self._rows.get(key)
+                if entry is not None and (entry[0] > now or not expires):
+                    self._rows.move_to_end(key)
+                    found[row_id] = entry[1]
+                else:
+                    missing.append(row_id)
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def patch(self, api_token: str, table_name: str, rows: list = None, deleted_ids: list = None, inserted: bool = False):
+        """
+        Merge changed fields into indexed rows and drop deleted ones. Partial
+        rows of unindexed ids are skipped; new rows are indexed if inserted.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for row in rows or []:
+                if not isinstance(row, dict) or not row.get("_id"):
+                    continue
+                key = (api_token, table_name, row["_id"])
+                entry = self._rows.get(key)
+                if entry is not None:
+                    self._rows[key] = (entry[0], {**entry[1], **row})
+                elif inserted and self.ttl > 0 and self.maxsize > 0:
+                    self._store(key, row, now)
+            for row_id in deleted_ids or []:
+                self._rows.pop((api_token, table_name, row_id), None)
+            self._evict()
+
+    def invalidate(self, api_token: str, table_name: str = None):
+        with self._lock:
+            for key in list(self._rows):
+                if key[0] == api_token and (table_name is None or key[1].lower() == table_name.lower()):
+                    del self._rows[key]
+
+    def clear(self):
+        with self._lock:
+            self._rows.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._rows),
+                    "maxsize": self.maxsize, "ttl": self.ttl}
+
+_row_index = _RowIndex(
+    ttl=float(os.environ.get("SEATABLE_ROW_INDEX_TTL", "60")),
+    maxsize=int(os.environ.get("SEATABLE_ROW_INDEX_SIZE", "100000")),
+)
+
+# Set SEATABLE_CHANGE_LISTENER=1 to subscribe to each pooled base's change
+# events, so cached query results and snapshots follow remote edits without polling
+CHANGE_LISTENER = os.environ.get("SEATABLE_CHANGE_LISTENER", "").lower() in ("1", "true", "yes")
+# Row operations carried by SeaTable's update-dtable events
+_INSERT_ROW_OPS = ("insert_row", "insert_rows", "append_row", "append_rows")
+_MODIFY_ROW_OPS = ("modify_row", "modify_rows")
+_DELETE_ROW_OPS = ("delete_row", "delete_rows")
+
+class _ChangeListener:
+    """
+    Background socket.io subscription to one base's update-dtable events.
+
+    Connects on a daemon thread and reconnects with backoff. Events missed
+    while disconnected cannot be replayed, so every (re)connect invalidates the
+    base's query results and marks its snapshots for an incremental sync.
+    """
+
+    def __init__(self, api_token: str, base):
+        self.api_token = api_token
+        self.base = base
+        self.connected = threading.Event()
+        self.events = 0
+        self._stopped = threading.Event()
+        self._sio = None
+        self._thread = threading.Thread(target=self._run, name="seatable-changes", daemon=True)
+        self._thread.start()
+
+    def refresh(self, base):
+        """
+        Use the re-authenticated base (and its new access token) for the next (re)connect.
+        """
+        self.base = base
+
+    def stop(self):
+        self._stopped.set()
+        self.connected.clear()
+        sio = self._sio
+        if sio is not None:
+            try:
+                sio.disconnect()
+            except Exception:
+                pass
+
+    def _run(self):
+        delay = 1.0
+        while not self._stopped.is_set():
+            sio = _lazy("SIO")(reconnection=False, request_timeout=getattr(self.base, "timeout", 30))
+            sio.on("connect", self._on_connect)
+            sio.on("disconnect", self._on_disconnect)
+            sio.on("io-disconnect", self._on_disconnect)
+            sio.on("update-dtable", self._on_update)
+            try:
+                self._sio = sio
+                sio.connect(self.base.dtable_server_url + "?dtable_uuid=" + self.base.dtable_uuid)
+                delay = 1.0
+                sio.wait()
+            except Exception as e:
+                print(f"Change listener connection failed: {e}", file=sys.stderr)
+            self._on_disconnect()
+            if self._stopped.wait(delay):
+                break
+            delay = min(delay * 2, 60.0)
+
+    def _on_connect(self):
+        self._sio.emit("join-room", (self.base.dtable_uuid, self.base.jwt_token))
+        _schema_changed(self.api_token)
+        _mark_snapshots_dirty(self.api_token)
+        self.connected.set()
+
+    def _on_disconnect(self, *args):
+        if self.connected.is_set():
+            self.connected.clear()
+            _mark_snapshots_dirty(self.api_token)
+
+    def _on_update(self, data, *args):
+        try:
+            operation = json.loads(data) if isinstance(data, (str, bytes)) else data
+            _apply_change(self.api_token, operation)
+            self.events += 1
+        except Exception as e:
+            print(f"Change listener could not apply event: {e}", file=sys.stderr)
+            _schema_changed(self.api_token)
+            _mark_snapshots_dirty(self.api_token)
+
+def _listening(api_token: str) -> bool:
+    listener = _check_base_cache.listener(api_token)
+    return listener is not None and listener.connected.is_set()
+
+def _table_of(api_token: str, table_id: str):
+    """
+    Return (table name, column key -> name) of a table id from the cached metadata.
+    """
+    metadata = _metadata_cache.get((api_token, "metadata"), lambda: call_base(api_token, lambda b: b.get_metadata(), idempotent=True))
+    for table in metadata.get("tables", []):
+        if table.get("_id") == table_id:
+            return table["name"], {c["key"]: c["name"] for c in table.get("columns", [])}
+    return None, {}
+
+def _apply_change(api_token: str, operation: dict):
+    """
+    Bring cached state up to date with one update-dtable operation: row
+    operations patch snapshots in place, anything else invalidates.
+    """
+    op_type = operation.get("op_type", "")
+    table_name, names = _table_of(api_token, operation.get("table_id"))
+    if table_name is None or op_type not in _INSERT_ROW_OPS + _MODIFY_ROW_OPS + _DELETE_ROW_OPS:
+        # Schema, view or unknown operations; row content may have changed too
+        _schema_changed(api_token, None if "table" in op_type or table_name is None else table_name)
+        if "row" in op_type or "column" in op_type or "table" in op_type or table_name is None:
+            _mark_snapshots_dirty(api_token, None if table_name is None else table_name)
+        return
+
+    def by_name(row: dict, row_id: str = None) -> dict:
+        row = {names.get(key, key): value for key, value in row.items()}
+        if row_id and "_id" not in row:
+            row["_id"] = row_id
+        return row
+
+    rows, deleted_ids = [], []
+    if op_type in _INSERT_ROW_OPS:
+        data = operation.get("row_data") or operation.get("rows") or []
+        for row in data if isinstance(data, list) else [data]:
+            rows.append(by_name(row, operation.get("row_id") if not isinstance(data, list) else None))
+    elif op_type == "modify_row":
+        rows.append(by_name(operation.get("updated") or {}, operation.get("row_id")))
+    elif op_type == "modify_rows":
+        rows.extend(by_name(updated, row_id) for row_id, updated in (operation.get("updated") or {}).items())
+    else:
+        deleted_ids = operation.get("row_ids") or [operation.get("row_id")]
+
+    _sql_cache.invalidate(api_token, table_name)
+    complete = all(row.get("_id") for row in rows)
+    if complete:
+        _row_index.patch(api_token, table_name, rows, deleted_ids, inserted=op_type in _INSERT_ROW_OPS)
+    else:
+        _row_index.invalidate(api_token, table_name)
+    _patch_snapshot(api_token, table_name, rows, deleted_ids, dirty=not complete)
+
+if CHANGE_LISTENER:
+    _check_base_cache.listener_factory = _ChangeListener
+
+# Latency histogram bucket bounds in seconds (Prometheus style, plus +Inf)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class _Histogram:
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def to_dict(self) -> dict:
+        return {"count": self.count, "sum": round(self.sum, 6),
+                "buckets": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], self.buckets))}
+
+class _ToolMetrics:
+    """
+    Per (tool, base) call counters, error counts, payload bytes and latency
+    histograms for each phase of a call:
+
+        queue      waiting for the per-base limit and a pool thread
+        auth       getting the pooled Base (including any authentication)
+        rate_limit waiting for the per-base rate limiter
+        api        SeaTable HTTP calls
+        retry_wait backing off between retries
+        serialize  encoding the result
+        total      the whole tool call, excluding queue
+
+    MCP transport time is what a client measures beyond queue + total.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def record(self, call: dict):
+        key = (call["tool"], call["base"])
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"calls": 0, "errors": 0, "bytes": 0, "phases": {}}
+            series["calls"] += 1
+            series["errors"] += 1 if call["error"] else 0
+            series["bytes"] += call["bytes"]
+            for phase, seconds in call["phases"].items():
+                series["phases"].setdefault(phase, _Histogram()).observe(seconds)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [{
+                "tool": tool_name,
+                "base": base,
+                "calls": series["calls"],
+                "errors": series["errors"],
+                "error_rate": round(series["errors"] / series["calls"], 4) if series["calls"] else 0.0,
+                "bytes": series["bytes"],
+                "phases": {phase: h.to_dict() for phase, h in series["phases"].items()},
+            } for (tool_name, base), series in sorted(self._series.items(), key=lambda item: (item[0][0], str(item[0][1])))]
+
+    def prometheus(self) -> str:
+        """
+        Render the metrics in the Prometheus text exposition format.
+        """
+        def labels(**values):
+            return ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in values.items())
+
+        lines = [
+            "# TYPE seatable_mcp_tool_calls_total counter",
+            "# TYPE seatable_mcp_tool_errors_total counter",
+            "# TYPE seatable_mcp_tool_response_bytes_total counter",
+            "# TYPE seatable_mcp_tool_phase_seconds histogram",
+        ]
+        for entry in self.snapshot():
+            base_labels = labels(tool=entry["tool"], base=entry["base"] or "")
+            lines.append("seatable_mcp_tool_calls_total{%s} %d" % (base_labels, entry["calls"]))
+            lines.append("seatable_mcp_tool_errors_total{%s} %d" % (base_labels, entry["errors"]))
+            lines.append("seatable_mcp_tool_response_bytes_total{%s} %d" % (base_labels, entry["bytes"]))
+            for phase, h in entry["phases"].items():
+                phase_labels = base_labels + "," + labels(phase=phase)
+                cumulative = 0
+                for bound, count in h["buckets"].items():
+                    cumulative += count
+                    lines.append('seatable_mcp_tool_phase_seconds_bucket{%s,le="%s"} %d' % (phase_labels, bound, cumulative))
+                lines.append("seatable_mcp_tool_phase_seconds_sum{%s} %s" % (phase_labels, h["sum"]))
+                lines.append("seatable_mcp_tool_phase_seconds_count{%s} %d" % (phase_labels, h["count"]))
+        return "\n".join(lines) + "\n"
+
+_tool_metrics = _ToolMetrics()
+# The record of the tool call running in the current thread, if any
+_current_call = contextvars.ContextVar("seatable_current_call", default=None)
+# Callables invoked with every finished call record, see add_trace_hook
+_trace_hooks = []
+
+def add_trace_hook(hook):
+    """
+    Register hook(record) to be called after every tool call. The record is a
+    dict with tool, base, started_at (epoch seconds), phases (seconds per
+    phase), bytes and error. Hooks run on the I/O thread and must not raise.
+    """
+    _trace_hooks.append(hook)
+
+@contextmanager
+def _phase(name: str):
+    """
+    Add the time spent in the block to `name` of the current tool call.
+    """
+    call = _current_call.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if call is not None:
+            call["phases"][name] = call["phases"].get(name, 0.0) + time.perf_counter() - started
+
+def _base_label(api_token: str) -> str:
+    """
+    Name a base for metrics without exposing its token: the configured base
+    name if there is one, else a short hash of the token.
+    """
+    if not api_token:
+        return None
+    for name, token in _config_cache.get()[1].items():
+        if token == api_token:
+            return name
+    return "token:" + hashlib.sha256(api_token.encode()).hexdigest()[:8]
+
+def _instrumented(fn, uses_base: bool):
+    """
+    Wrap a tool function so each outermost call is timed and recorded.
+    """
+    @functools.wraps(fn)
+    def run(*args, _queued: float = 0.0, **kwargs):
+        if _current_call.get() is not None:
+            # Nested tool call, accounted to the caller
+            return fn(*args, **kwargs)
+        base = None
+        if uses_base:
+            try:
+                base = _base_label(resolve_token(kwargs.get("api_token")))
+            except ValueError:
+                pass
+        call = {"tool": fn.__name__, "base": base, "started_at": time.time(), "phases": {}, "bytes": 0, "error": False}
+        if _queued:
+            call["phases"]["queue"] = _queued
+        token = _current_call.set(call)
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+            call["error"] = isinstance(result, str) and result.startswith("Error")
+            call["bytes"] = len(result.encode("utf-8")) if isinstance(result, str) else 0
+            return result
+        except BaseException:
+            call["error"] = True
+            raise
+        finally:
+            call["phases"]["total"] = time.perf_counter() - started
+            _current_call.reset(token)
+            _tool_metrics.record(call)
+            for hook in list(_trace_hooks):
+                try:
+                    hook(call)
+                except Exception as e:
+                    print(f"Trace hook failed: {e}", file=sys.stderr)
+    return run
+
+# Blocking SeaTable calls run on this pool so the MCP event loop stays free
+MAX_WORKERS = int(os.environ.get("SEATABLE_MAX_WORKERS", "8"))
+# Maximum number of tool calls in flight against a single base
+PER_BASE_CONCURRENCY = int(os.environ.get("SEATABLE_PER_BASE_CONCURRENCY", "4"))
+# Maximum concurrent tool calls of one client session (matters with the HTTP transports)
+PER_CLIENT_CONCURRENCY = int(os.environ.get("SEATABLE_PER_CLIENT_CONCURRENCY", "8"))
+_io_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="seatable-io")
+# Map: event loop -> {api_token: asyncio.Semaphore}
+_base_semaphores = weakref.WeakKeyDictionary()
+# Work a tool fans out to several bases runs here, not on _io_executor, which
+# the calling tool already occupies; bounded like it
+_fanout_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="seatable-fanout")
+# Map: api_token -> threading.Semaphore applying PER_BASE_CONCURRENCY to fanned-out work
+_base_thread_slots = {}
+_base_thread_slots_lock = threading.Lock()
+
+def _base_thread_slot(api_token: str) -> threading.Semaphore:
+    with _base_thread_slots_lock:
+        if api_token not in _base_thread_slots:
+            _base_thread_slots[api_token] = threading.Semaphore(max(1, PER_BASE_CONCURRENCY))
+        return _base_thread_slots[api_token]
+
+def _base_semaphore(api_token: str) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphores = _base_semaphores.setdefault(loop, {})
+    if api_token not in semaphores:
+        semaphores[api_token] = asyncio.Semaphore(max(1, PER_BASE_CONCURRENCY))
+    return semaphores[api_token]
+
+def tool(uses_base: bool = True):
+    """
+    Register a blocking tool function with MCP as an async tool.
+
+    The registered coroutine runs the function on the shared I/O thread pool,
+    holding the per-base semaphore of the base it targets, so calls against
+    different bases (or independent reads on one base) overlap instead of
+    blocking the event loop. Every call is timed per phase (see _ToolMetrics).
+    The returned function stays synchronous and can be called directly.
+    """
+    def decorator(fn):
+        timed = _instrumented(fn, uses_base)
+
+        @functools.wraps(fn)
+        async def run_tool(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            submitted = time.perf_counter()
+
+            def call():
+                return timed(*args, _queued=time.perf_counter() - submitted, **kwargs)
+            call = functools.partial(contextvars.copy_context().run, call)
+            api_token = None
+            if uses_base:
+                try:
+                    api_token = resolve_token(kwargs.get("api_token"))
+                except ValueError:
+                    # Let the tool itself report the missing token
+                    pass
+            if api_token is None:
+                return await loop.run_in_executor(_io_executor, call)
+            async with _base_semaphore(api_token):
+                return await loop.run_in_executor(_io_executor, call)
+
+        mcp.defer_tool(run_tool, name=fn.__name__, description=fn.__doc__)
+        return timed
+    return decorator
+
+class _ConfigCache:
+    """
+    Parsed configuration file, reloaded only when the file changes.
+
+    The file is identified by path, inode, size and mtime. A reload parses into
+    fresh objects and swaps them in with a single assignment, so readers never
+    see a partially loaded mapping; if the new content cannot be parsed (e.g. it
+    is still being written) the previous mapping stays in effect.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (config_path, file signature, entries list, base_name -> api_token)
+        self._state = (None, None, [], {})
+
+    def get(self):
+        """
+        Return (entries, base_name -> api_token) for the current config file.
+        """
+        config_path = os.environ.get("SEATABLE_CONFIG_PATH", "seatable_config.json")
+        if not os.path.exists(config_path):
+            return [], {}
+        try:
+            st = os.stat(config_path)
+            signature = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        except OSError:
+            # Cannot tell whether the file changed, so always read it
+            signature = None
+
+        state = self._state
+        if signature is not None and state[0] == config_path and state[1] == signature:
+            return state[2], state[3]
+
+        with self._lock:
+            state = self._state
+            if signature is not None and state[0] == config_path and state[1] == signature:
+                return state[2], state[3]
+            try:
+                with open(config_path, 'r') as f:
+                    entries = json.load(f)
+                tokens = {}
+                for entry in entries:
+                    tokens.setdefault(entry.get('base_name'), entry.get('api_token'))
+            except Exception as e:
+                print(f"Error loading config file {config_path}: {e}", file=sys.stderr)
+                if state[0] != config_path:
+                    return [], {}
+                # Keep serving the last good mapping; retry once the file changes again
+                self._state = (config_path, signature, state[2], state[3])
+                return state[2], state[3]
+            self._state = (config_path, signature, entries, tokens)
+            return entries, tokens
+
+_config_cache = _ConfigCache()
 
 def load_config():
     """
     Load configuration from JSON file path specified in SEATABLE_CONFIG_PATH
     or default to 'seatable_config.json' in current directory.
+    The parsed file is cached until its mtime or inode changes.
     """
-    config_path = os.environ.get("SEATABLE_CONFIG_PATH", "seatable_config.json")
-    if os.path.exists(config_path):
-        try:
-            with open(config_path, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Error loading config file {config_path}: {e}", file=sys.stderr)
-            return []
-    return []
+    return _config_cache.get()[0]
 
-@mcp.tool()
+@tool(uses_base=False)
 def get_all_bases() -> str:
     """
     List all configured bases and their corresponding API tokens.
@@ -41,185 +1191,1881 @@ def get_all_bases() -> str:
     # Filter to only return relevant keys if needed, but config matches our need
     return json.dumps(config)
 
-@mcp.tool()
+@tool(uses_base=False)
 def get_api_token(base_name: str) -> str:
     """
     Get the API token for a given base name from the configuration.
     
     Args:
-        base_name: The name of the base as defined in seatable_config.json
+        base_name: The name of the base as defined in seatable_config.json
+    """
+    # 1. Try to find in JSON config
+    token = get_token_for_base(base_name)
+    if token:
+        return token
+
+    # If not found, check if it matches the legacy env var fallback indirectly?
+    # Actually, user wants "query the base api token accoding to the name in the config file"
+    # So if not in config, we should error out with available bases.
+    
+    available_bases = [name for name in _config_cache.get()[1] if name]
+    msg = f"Base '{base_name}' not found in configuration."
+    if available_bases:
+        msg += f" Available bases: {', '.join(available_bases)}"
+    else:
+        msg += " No bases configured."
+    raise ValueError(msg)
+
+def get_token_for_base(base_name: str) -> str:
+    """
+    Find the API token for a given base name from config.
+    """
+    return _config_cache.get()[1].get(base_name)
+
+# Whether tools called without api_token use SEATABLE_API_TOKEN; main turns
+# it off when remote clients are accepted
+ENV_TOKEN_FALLBACK = True
+
+def resolve_token(api_token: str = None) -> str:
+    """
+    Return the API token to use for a call.
+    If api_token is provided, uses it directly.
+    If not, falls back to SEATABLE_API_TOKEN environment variable
+    (unless the server accepts remote HTTP clients).
+    """
+    if not api_token and ENV_TOKEN_FALLBACK:
+        # Fallback to single environment variable
+        api_token = os.environ.get("SEATABLE_API_TOKEN")
+
+    if not api_token:
+        if not ENV_TOKEN_FALLBACK:
+            raise ValueError("No API token provided.")
+        raise ValueError("No API token provided and SEATABLE_API_TOKEN is not set.")
+    return api_token
+
+def get_base(api_token: str = None):
+    """
+    Get a Base instance. 
+    If api_token is provided, uses it directly.
+    If not, falls back to SEATABLE_API_TOKEN environment variable.
+    """
+    api_token = resolve_token(api_token)
+
+    target_server_url = os.environ.get("SEATABLE_SERVER_URL", server_url)
+
+    def connect():
+        base = _lazy("Base")(api_token, target_server_url)
+        base.auth()
+        return base
+
+    return _check_base_cache.get(api_token, connect)
+
+def _is_auth_error(e: Exception) -> bool:
+    if isinstance(e, (_lazy("AuthExpiredError"), _lazy("BaseUnauthError"))):
+        return True
+    # seatable-api raises ConnectionError(status_code, text) for HTTP errors
+    return isinstance(e, ConnectionError) and bool(e.args) and e.args[0] == 401
+
+class RetryPolicy:
+    """
+    Decides which failed SeaTable calls are retried and how long to wait.
+
+    Rate limiting (429), transient server errors (5xx) and network errors are
+    retried with exponential backoff and full jitter, honouring the server's
+    Retry-After hint when there is one. Non-idempotent calls (e.g. appending
+    rows) are only retried when retry_writes is set. Assign a different
+    instance (or subclass) to `retry_policy` to change the behaviour.
+    """
+
+    RETRY_STATUS = frozenset((429, 500, 502, 503, 504))
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.5, max_delay: float = 30.0, retry_writes: bool = False):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_writes = retry_writes
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_attempts=int(os.environ.get("SEATABLE_RETRY_ATTEMPTS", "4")),
+            base_delay=float(os.environ.get("SEATABLE_RETRY_BASE_DELAY", "0.5")),
+            max_delay=float(os.environ.get("SEATABLE_RETRY_MAX_DELAY", "30")),
+            retry_writes=os.environ.get("SEATABLE_RETRY_WRITES", "").lower() in ("1", "true", "yes"),
+        )
+
+    def is_transient(self, e: Exception) -> bool:
+        requests = _lazy("requests")
+        if isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return True
+        # seatable-api raises ConnectionError(status_code, text) for HTTP errors
+        return isinstance(e, ConnectionError) and bool(e.args) and e.args[0] in self.RETRY_STATUS
+
+    def should_retry(self, e: Exception, attempt: int, idempotent: bool) -> bool:
+        if attempt >= self.max_attempts:
+            return False
+        return (idempotent or self.retry_writes) and self.is_transient(e)
+
+    def delay(self, e: Exception, attempt: int) -> float:
+        retry_after = _retry_after(e)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+def _retry_after(e: Exception) -> float:
+    """
+    Return the server's requested wait in seconds, from a Retry-After header
+    or from SeaTable's "Expected available in N seconds" throttle message.
+    """
+    response = getattr(e, "response", None)
+    header = response.headers.get("Retry-After") if response is not None else None
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            try:
+                return max(0.0, email.utils.parsedate_to_datetime(header).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    match = re.search(r"available in (\d+(?:\.\d+)?) second", str(e))
+    return float(match.group(1)) if match else None
+
+def _rejected(e: Exception) -> bool:
+    """
+    Return True if SeaTable answered with a 4xx status (429 included), so the
+    request was refused and not applied. After a timeout, a dropped connection
+    or a 5xx it is unknown whether a write went through.
+    """
+    if isinstance(e, ConnectionError) and e.args:
+        status = e.args[0]
+    else:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+    return isinstance(status, int) and 400 <= status < 500
+
+retry_policy = RetryPolicy.from_env()
+
+class _TokenBucket:
+    """
+    Token bucket allowing `rate` calls per second with bursts of `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take one token, sleeping until one is available.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+# Requests per second allowed against a single base (0 disables pacing)
+RATE_LIMIT = float(os.environ.get("SEATABLE_RATE_LIMIT", "0"))
+RATE_BURST = float(os.environ.get("SEATABLE_RATE_BURST", "0")) or max(1.0, RATE_LIMIT)
+# Map: api_token -> _TokenBucket
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+def _pace(api_token: str):
+    if RATE_LIMIT <= 0:
+        return
+    with _rate_limiters_lock:
+        bucket = _rate_limiters.get(api_token)
+        if bucket is None:
+            bucket = _rate_limiters[api_token] = _TokenBucket(RATE_LIMIT, RATE_BURST)
+    bucket.acquire()
+
+def call_base(api_token: str, operation, idempotent: bool = False):
+    """
+    Run operation(base) against the pooled Base for api_token.
+
+    Every attempt is paced by the per-base rate limiter. If the access token
+    was rejected as expired or unauthorized, the base is re-authenticated and
+    the operation retried once. Transient failures are retried according to
+    `retry_policy`; pass idempotent=True for calls that are safe to repeat.
+    """
+    api_token = resolve_token(api_token)
+    attempt, reauthed = 0, False
+    while True:
+        attempt += 1
+        with _phase("auth"):
+            b = get_base(api_token)
+        started = time.monotonic()
+        with _phase("rate_limit"):
+            _pace(api_token)
+        _failed_response.value = None
+        try:
+            with _phase("api"):
+                return operation(b)
+        except Exception as e:
+            response = _failed_response.value
+            if (response is not None and isinstance(e, ConnectionError) and e.args
+                    and e.args[0] == response.status_code and getattr(e, "response", None) is None):
+                # Keep the response, so its Retry-After header can be honoured
+                e.response = response
+            if _is_auth_error(e) and not reauthed:
+                reauthed = True
+                attempt -= 1
+                with _phase("auth"):
+                    _check_base_cache.reauth(api_token, b, started)
+                continue
+            if not retry_policy.should_retry(e, attempt, idempotent):
+                raise
+            with _phase("retry_wait"):
+                time.sleep(retry_policy.delay(e, attempt))
+
+def _encode_cursor(table_name: str, view_name: str, start: int, limit: int) -> str:
+    """
+    Build an opaque list_rows cursor pointing at the page starting at `start`.
+    """
+    payload = json.dumps({"t": table_name, "v": view_name, "s": start, "l": limit})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def _decode_cursor(cursor: str) -> dict:
+    """
+    Decode a cursor produced by _encode_cursor.
+    """
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except Exception:
+        raise ValueError("Invalid cursor.")
+
+def _project(rows: list, columns: list) -> list:
+    """
+    Keep only the requested columns (plus the row _id) of each row.
+    """
+    if not columns:
+        return rows
+    keep = set(columns) | {'_id'}
+    return [{k: v for k, v in row.items() if k in keep} for row in rows]
+
+# Comparison operators accepted in filters, e.g. {"Amount": {">=": 10}}
+_FILTER_OPS = {
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+}
+_AGGREGATE = re.compile(r"^\s*(COUNT|SUM|AVG|MIN|MAX)\s*\(\s*(\*|[^()`]+?)\s*\)\s*$", re.IGNORECASE)
+
+def _conditions(filters: dict) -> list:
+    """
+    Turn {column: value} filters into (column, op, value) conditions. A list
+    value matches any of its items, a dict maps operators to operands.
+    """
+    conditions = []
+    for column, expected in (filters or {}).items():
+        if isinstance(expected, dict):
+            for op, operand in expected.items():
+                if op not in _FILTER_OPS:
+                    raise ValueError(f"Unknown filter operator '{op}' for column '{column}'.")
+                conditions.append((column, op, operand))
+        elif isinstance(expected, list):
+            conditions.append((column, "in", expected))
+        else:
+            conditions.append((column, "=", expected))
+    return conditions
+
+def _row_matches(row: dict, conditions: list) -> bool:
+    for column, op, expected in conditions:
+        value = row.get(column)
+        if op == "in":
+            # As SQL IN: an empty cell matches nothing, a multiple-select cell
+            # matches when any of its options is listed
+            items = value if isinstance(value, list) else [value]
+            if not any(item is not None and item in expected for item in items):
+                return False
+            continue
+        if expected is not None and op != "=" and value in (None, ""):
+            # As in SQL, an empty cell is NULL: != and ordering against a value never hold
+            return False
+        try:
+            if not _FILTER_OPS[op](value, expected):
+                return False
+        except TypeError:
+            # Ordering against None or a value of another type
+            return False
+    return True
+
+def _parse_aggregates(aggregates: list) -> list:
+    """
+    Parse ["COUNT(*)", "SUM(Amount)", ...] into (function, column, label) triples.
+    """
+    parsed = []
+    for expression in aggregates or []:
+        match = _AGGREGATE.match(expression)
+        if not match:
+            raise ValueError(f"Unsupported aggregate '{expression}'. Use COUNT(*), COUNT, SUM, AVG, MIN or MAX of a column.")
+        function, column = match.group(1).upper(), match.group(2)
+        if column == "*" and function != "COUNT":
+            raise ValueError(f"{function} needs a column.")
+        parsed.append((function, column, f"{function}({column})"))
+    return parsed
+
+def _quote_column(name: str) -> str:
+    if "`" in name:
+        raise ValueError(f"Invalid column name '{name}'.")
+    return f"`{name}`"
+
+def _sql_literal(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'%s'" % str(value).replace("'", "''")
+
+def _compile_select(table_name: str, columns: list, conditions: list, group_by: list, aggregates: list, limit: int) -> str:
+    """
+    Build the SeaTable SQL equivalent of a filtered, projected or aggregated list_rows.
+    """
+    if aggregates or group_by:
+        selected = [_quote_column(c) for c in group_by or []]
+        selected += ["%s(%s) AS %s" % (f, "*" if c == "*" else _quote_column(c), _quote_column(label))
+                     for f, c, label in aggregates]
+    elif columns:
+        selected = [_quote_column(c) for c in ["_id"] + [c for c in columns if c != "_id"]]
+    else:
+        selected = ["*"]
+
+    where = []
+    for column, op, value in conditions:
+        if op == "in":
+            value = [v for v in value if v is not None]
+            if not value:
+                where.append("1 = 0")
+            else:
+                where.append("%s IN (%s)" % (_quote_column(column), ", ".join(_sql_literal(v) for v in value)))
+        elif value is None and op in ("=", "!="):
+            where.append("%s IS %sNULL" % (_quote_column(column), "NOT " if op == "!=" else ""))
+        else:
+            where.append("%s %s %s" % (_quote_column(column), op, _sql_literal(value)))
+
+    sql = "SELECT %s FROM %s" % (", ".join(selected), _quote_column(table_name))
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if group_by:
+        sql += " GROUP BY " + ", ".join(_quote_column(c) for c in group_by)
+    return sql + " LIMIT %d" % limit
+
+def _aggregate_rows(rows, group_by: list, aggregates: list, limit: int) -> list:
+    """
+    Group and aggregate an iterable of rows in one pass, keeping only running
+    totals per group in memory.
+    """
+    groups = OrderedDict()
+    for row in rows:
+        key = tuple(_to_json(row.get(c)) if isinstance(row.get(c), (list, dict)) else row.get(c) for c in group_by or [])
+        state = groups.get(key)
+        if state is None:
+            state = groups[key] = {"group": {c: row.get(c) for c in group_by or []},
+                                   "values": [{"count": 0, "sum": 0, "min": None, "max": None} for _ in aggregates]}
+        for (function, column, _), acc in zip(aggregates, state["values"]):
+            if column == "*":
+                acc["count"] += 1
+                continue
+            value = row.get(column)
+            if value is None or value == "":
+                continue
+            acc["count"] += 1
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                acc["sum"] += value
+            try:
+                if acc["min"] is None or value < acc["min"]:
+                    acc["min"] = value
+                if acc["max"] is None or value > acc["max"]:
+                    acc["max"] = value
+            except TypeError:
+                pass
+
+    results = []
+    for state in list(groups.values())[:limit]:
+        result = dict(state["group"])
+        for (function, _, label), acc in zip(aggregates, state["values"]):
+            if function == "COUNT":
+                result[label] = acc["count"]
+            elif function == "SUM":
+                result[label] = acc["sum"]
+            elif function == "AVG":
+                result[label] = acc["sum"] / acc["count"] if acc["count"] else None
+            else:
+                result[label] = acc[function.lower()]
+        results.append(result)
+    return results
+
+def _drop_system_fields(rows: list) -> list:
+    return [{k: v for k, v in row.items() if k not in SYSTEM_FIELDS} if isinstance(row, dict) else row
+            for row in rows]
+
+def _to_json(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+def _columnar(rows: list) -> dict:
+    """
+    Turn a list of dicts into {"columns": [...], "rows": [[...], ...]}, so keys
+    are sent once instead of once per row.
+    """
+    columns = {}
+    for row in rows:
+        for key in row:
+            columns.setdefault(key, None)
+    columns = list(columns)
+    return {"columns": columns, "rows": [[row.get(c) for c in columns] for row in rows]}
+
+def _is_row_list(value) -> bool:
+    return isinstance(value, list) and all(isinstance(item, dict) for item in value)
+
+def _check_format(output_format: str) -> str:
+    output_format = (output_format or DEFAULT_OUTPUT_FORMAT).lower()
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format '{output_format}'. Use one of: {', '.join(OUTPUT_FORMATS)}")
+    return output_format
+
+# Row results whose UTF-8 encoding exceeds this many bytes are kept on the
+# server and returned as a preview plus a fetch_result handle (0 disables)
+RESPONSE_BUDGET = int(os.environ.get("SEATABLE_RESPONSE_BUDGET", str(512 * 1024)))
+
+class _ResultStore:
+    """
+    Oversized row results, spilled to NDJSON files in a private temporary
+    directory with the byte offset of every row. Handles are evicted least
+    recently used first beyond `maxsize`, deleting their file.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self._dir = None
+
+    def put(self, rows: list, output_format: str) -> str:
+        with self._lock:
+            if self._dir is None:
+                self._dir = tempfile.mkdtemp(prefix="seatable-mcp-results-")
+        handle = uuid.uuid4().hex[:16]
+        path = os.path.join(self._dir, handle + ".ndjson")
+        offsets = array.array("q")
+        with open(path, "wb") as f:
+            for row in rows:
+                offsets.append(f.tell())
+                f.write((_to_json(row) + "\n").encode("utf-8"))
+        with self._lock:
+            self._results[handle] = {"path": path, "offsets": offsets, "format": output_format,
+                                     "bytes": os.path.getsize(path)}
+            while len(self._results) > max(1, self.maxsize):
+                _, evicted = self._results.popitem(last=False)
+                self._remove(evicted["path"])
+        return handle
+
+    def read(self, handle: str, offset: int, limit: int):
+        """
+        Return (rows, total rows, output format) of up to `limit` rows from `offset`.
+        """
+        with self._lock:
+            entry = self._results.get(handle)
+            if entry is None:
+                raise KeyError(handle)
+            self._results.move_to_end(handle)
+        offsets = entry["offsets"]
+        rows = []
+        if 0 <= offset < len(offsets):
+            try:
+                with open(entry["path"], "rb") as f:
+                    f.seek(offsets[offset])
+                    for _ in range(min(limit, len(offsets) - offset)):
+                        rows.append(json.loads(f.readline()))
+            except FileNotFoundError:
+                # Evicted by another call while this one was reading
+                raise KeyError(handle)
+        return rows, len(offsets), entry["format"]
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            if self._dir is not None:
+                shutil.rmtree(self._dir, ignore_errors=True)
+                self._dir = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"handles": len(self._results), "maxsize": self.maxsize,
+                    "bytes": sum(entry["bytes"] for entry in self._results.values())}
+
+_result_store = _ResultStore(maxsize=int(os.environ.get("SEATABLE_RESULT_HANDLES", "16")))
+atexit.register(_result_store.clear)
+
+def _utf8_len(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+def _encode_rows(rows: list, output_format: str, budget: int):
+    """
+    Encode a list of rows, or return None as soon as the encoding would be
+    longer than `budget` UTF-8 bytes, before the oversized string is built.
+    """
+    if output_format == "columnar":
+        columns = list(dict.fromkeys(key for row in rows for key in row))
+        encode = lambda row: _to_json([row.get(c) for c in columns])
+        separator, prefix, suffix = ",", '{"columns":%s,"rows":[' % _to_json(columns), "]}"
+    else:
+        encode = str if output_format == "repr" else _to_json
+        separator, prefix, suffix = {"repr": (", ", "[", "]"), "json": (",", "[", "]"), "ndjson": ("\n", "", "")}[output_format]
+    pieces, size = [], _utf8_len(prefix) + len(suffix)
+    for row in rows:
+        piece = encode(row)
+        size += _utf8_len(piece) + len(separator)
+        if budget and size > budget:
+            return None
+        pieces.append(piece)
+    return prefix + separator.join(pieces) + suffix
+
+def _page_rows(rows: list, budget: int) -> list:
+    """
+    The leading rows whose JSON encoding fits in `budget` UTF-8 bytes (at least one).
+    """
+    page, size = [], 0
+    for row in rows:
+        size += _utf8_len(_to_json(row)) + 1
+        if page and size > budget:
+            break
+        page.append(row)
+    return page
+
+def _spill(rows: list, output_format: str, extra: dict = None) -> str:
+    """
+    Keep an oversized row result on the server and return a summary with the
+    first rows and the handle to page through the rest with fetch_result.
+    The keys of `extra` are added to the summary.
+    """
+    handle = _result_store.put(rows, output_format)
+    preview = _page_rows(rows, RESPONSE_BUDGET // 4)
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    return _to_json({"truncated": True, "handle": handle, "total_rows": len(rows), "columns": columns,
+                     "rows": preview, "next_offset": len(preview),
+                     "hint": "The result exceeds SEATABLE_RESPONSE_BUDGET. Call fetch_result(handle, offset=next_offset) for more rows.",
+                     **(extra or {})})
+
+def _encode_rows_with(rows: list, output_format: str, extra: dict) -> str:
+    """
+    Encode rows together with the keys of `extra`: {"rows": [...], **extra},
+    merged into the columnar object, or as the last ndjson line. The rows are
+    spilled when the whole would exceed RESPONSE_BUDGET.
+    """
+    extra_text = str(extra) if output_format == "repr" else _to_json(extra)
+    budget = max(1, RESPONSE_BUDGET - _utf8_len(extra_text)) if RESPONSE_BUDGET else 0
+    encoded = _encode_rows(rows, output_format, budget)
+    if encoded is None:
+        return _spill(rows, output_format, extra)
+    if output_format == "ndjson":
+        return encoded + "\n" + extra_text if rows else extra_text
+    if output_format == "columnar":
+        return encoded[:-1] + "," + extra_text[1:]
+    if output_format == "repr":
+        return "{'rows': " + encoded + ", " + extra_text[1:]
+    return '{"rows":' + encoded + "," + extra_text[1:]
+
+def _encode(result, output_format: str = None, drop_system_fields: bool = False) -> str:
+    """
+    Encode a tool result.
+
+    repr: Python str() of the result (the historical output).
+    json: compact JSON.
+    columnar: for lists of rows, {"columns": [...], "rows": [[...]]}; other results as JSON.
+    ndjson: for lists, one JSON document per line; other results as JSON.
+
+    Row lists longer than RESPONSE_BUDGET are spilled (see _spill).
+    """
+    output_format = _check_format(output_format)
+    with _phase("serialize"):
+        if drop_system_fields and _is_row_list(result):
+            result = _drop_system_fields(result)
+
+        if _is_row_list(result):
+            encoded = _encode_rows(result, output_format, RESPONSE_BUDGET)
+            return encoded if encoded is not None else _spill(result, output_format)
+        if output_format == "repr":
+            return str(result)
+        if output_format == "ndjson" and isinstance(result, list):
+            return "\n".join(_to_json(item) for item in result)
+        return _to_json(result)
+
+def _encode_page(rows: list, next_cursor: str, output_format: str = None, drop_system_fields: bool = False) -> str:
+    """
+    Encode one page of a paginated row listing. Pages are always JSON based;
+    for ndjson the last line is {"next_cursor": ...}. A page over
+    RESPONSE_BUDGET is spilled, keeping next_cursor for the pages after it.
+    """
+    output_format = _check_format(output_format)
+    with _phase("serialize"):
+        if drop_system_fields:
+            rows = _drop_system_fields(rows)
+        if output_format == "repr":
+            output_format = "json"
+        return _encode_rows_with(rows, output_format, {"next_cursor": next_cursor})
+
+def _fetch_page(api_token: str, table_name: str, view_name: str, start: int, limit: int) -> list:
+    rows = call_base(api_token, lambda b: b.list_rows(table_name, view_name=view_name, start=start, limit=limit), idempotent=True) or []
+    if view_name is None:
+        _row_index.add(api_token, table_name, rows)
+    return rows
+
+def _get_page(api_token: str, table_name: str, view_name: str, start: int, limit: int) -> list:
+    """
+    Return one page of rows, using the prefetched copy if there is one, and
+    start fetching the following page in the background when this one is full.
+    """
+    key = (api_token, table_name, view_name, start, limit)
+    with _prefetch_lock:
+        entry = _prefetched_pages.pop(key, None)
+    future = None
+    if entry is not None:
+        expires_at, future = entry
+        if expires_at <= time.monotonic():
+            future.cancel()
+            future = None
+    rows = None
+    if future is not None:
+        try:
+            rows = future.result()
+        except Exception:
+            # Prefetch failures are retried in the foreground
+            rows = None
+    if rows is None:
+        rows = _fetch_page(api_token, table_name, view_name, start, limit)
+
+    if len(rows) >= limit:
+        next_key = (api_token, table_name, view_name, start + limit, limit)
+        with _prefetch_lock:
+            if next_key not in _prefetched_pages:
+                _prefetched_pages[next_key] = (time.monotonic() + PREFETCH_TTL, _prefetch_executor.submit(
+                    _fetch_page, api_token, table_name, view_name, start + limit, limit))
+            # Drop the oldest prefetched pages so memory stays bounded
+            while len(_prefetched_pages) > MAX_PREFETCHED_PAGES:
+                _, (_, stale) = _prefetched_pages.popitem(last=False)
+                stale.cancel()
+    return rows
+
+def _iter_rows(api_token: str, table_name: str, view_name: str):
+    """
+    Yield every row of a table or view, one page at a time.
+    """
+    start = 0
+    while True:
+        page = _fetch_page(api_token, table_name, view_name, start, MAX_PAGE_SIZE)
+        yield from page
+        if len(page) < MAX_PAGE_SIZE:
+            return
+        start += MAX_PAGE_SIZE
+
+def _reduce_rows(api_token: str, table_name: str, view_name: str, columns: list, conditions: list, group_by: list, aggregates: list, limit: int) -> list:
+    """
+    Filter, project and aggregate rows. Tables are reduced by SeaTable SQL;
+    views (which SQL cannot address) and snapshotted tables are reduced locally
+    in one streaming pass, so only the result is kept and returned.
+    """
+    snapshot = None if view_name else _get_snapshot(api_token, table_name)
+    if view_name is None and snapshot is None:
+        sql = _compile_select(table_name, columns, conditions, group_by, aggregates, limit)
+        return _execute_sql(api_token, sql, paginate=True)
+
+    rows = list(snapshot.fresh_rows().values()) if snapshot is not None else _iter_rows(api_token, table_name, view_name)
+    matching = (row for row in rows if _row_matches(row, conditions))
+    if aggregates or group_by:
+        return _aggregate_rows(matching, group_by, aggregates, limit)
+    result = []
+    for row in matching:
+        if len(result) >= limit:
+            break
+        result.append(row)
+    return _project(result, columns)
+
+@tool()
+def list_rows(table_name: str, view_name: str = None, limit: int = 100, columns: list = None, paginate: bool = False, cursor: str = None, output_format: str = None, drop_system_fields: bool = False, filters: dict = None, group_by: list = None, aggregates: list = None, resolve_links: bool = False, api_token: str = None) -> str:
+    """
+    List rows from a SeaTable table.
+    
+    Args:
+        table_name: The name of the table to list rows from.
+        view_name: Optional name of the view to filter rows.
+        limit: Maximum number of rows (or groups) to return (default 100). In paginated mode this is the page size (at most 1000).
+        columns: Optional list of column names to return (the row _id is always kept).
+        paginate: If True, return one page as JSON {"rows": [...], "next_cursor": ...}.
+        cursor: The next_cursor of a previous page; implies paginate=True.
+        output_format: 'repr' (default), 'json', 'columnar' (header + rows as arrays) or 'ndjson'.
+        drop_system_fields: If True, omit _ctime, _mtime, _creator and other system fields.
+        filters: Optional {column: value} equality filters; a list value matches any of its items
+            and {column: {">=": 10}} compares with =, !=, >, >=, < or <=.
+        group_by: Optional list of columns to group by; returns one row per group.
+        aggregates: Optional list such as ["COUNT(*)", "SUM(Amount)", "AVG(Amount)", "MIN(Date)", "MAX(Date)"],
+            computed over all matching rows (per group if group_by is given).
+        resolve_links: If True, replace the row references in link columns with the linked rows.
+        api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
+    """
+    try:
+        api_token = resolve_token(api_token)
+        _write_buffer.flush(api_token, table_name)
+        if filters or group_by or aggregates:
+            if paginate or cursor:
+                raise ValueError("filters, group_by and aggregates cannot be combined with paginate.")
+            rows = _reduce_rows(api_token, table_name, view_name, columns, _conditions(filters),
+                                group_by, _parse_aggregates(aggregates), limit)
+            if resolve_links and not (group_by or aggregates):
+                rows = _resolve_links(api_token, table_name, rows)
+            return _encode(rows, output_format, drop_system_fields)
+
+        if not paginate and not cursor:
+            snapshot = None if view_name else _get_snapshot(resolve_token(api_token), table_name)
+            if snapshot is not None:
+                # Served from the local snapshot of the table
+                rows = list(snapshot.fresh_rows().values())[:limit]
+            else:
+                # SeaTable API list_rows returns a list of dictionaries
+                rows = call_base(api_token, lambda b: b.list_rows(table_name, view_name=view_name, limit=limit), idempotent=True)
+                if view_name is None:
+                    _row_index.add(api_token, table_name, rows)
+            if resolve_links:
+                rows = _resolve_links(api_token, table_name, rows)
+            return _encode(_project(rows, columns), output_format, drop_system_fields)
+
+        start = 0
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        if cursor:
+            position = _decode_cursor(cursor)
+            if position.get("t") != table_name or position.get("v") != view_name:
+                raise ValueError("Cursor does not belong to this table/view.")
+            start, limit = position.get("s"), position.get("l")
+            # The cursor comes back from the client: re-check what was encoded
+            if not all(type(value) is int for value in (start, limit)) or start < 0 or limit < 1:
+                raise ValueError("Invalid cursor.")
+            limit = min(limit, MAX_PAGE_SIZE)
+
+        rows = _get_page(resolve_token(api_token), table_name, view_name, start, limit)
+        if resolve_links:
+            rows = _resolve_links(api_token, table_name, rows)
+        next_cursor = _encode_cursor(table_name, view_name, start + limit, limit) if len(rows) >= limit else None
+        return _encode_page(_project(rows, columns), next_cursor, output_format, drop_system_fields)
+    except Exception as e:
+        return f"Error listing rows: {str(e)}"
+
+def _rows_by_ids(api_token: str, table_name: str, row_ids: list) -> dict:
+    """
+    Return {row_id: row} for the given ids that exist, from the table's
+    snapshot or row index; ids not indexed yet cost one SQL query per 1000.
+    """
+    snapshot = _get_snapshot(api_token, table_name)
+    if snapshot is not None:
+        rows = snapshot.fresh_rows()
+        return {row_id: rows[row_id] for row_id in row_ids if row_id in rows}
+
+    found, missing = _row_index.lookup(api_token, table_name, list(dict.fromkeys(row_ids)))
+    for chunk in _chunked(missing, MAX_PAGE_SIZE):
+        sql = "SELECT * FROM %s WHERE _id IN (%s) LIMIT %d" % (
+            _quote_column(table_name), ", ".join(_sql_literal(row_id) for row_id in chunk), len(chunk))
+        rows = call_base(api_token, lambda b: b.query(sql), idempotent=True) or []
+        _row_index.add(api_token, table_name, rows)
+        found.update((row["_id"], row) for row in rows if isinstance(row, dict) and row.get("_id"))
+    return found
+
+def _link_targets(api_token: str, table_name: str) -> dict:
+    """
+    Return {link column name: name of the linked table} from the cached metadata.
+    """
+    metadata = _metadata_cache.get((api_token, "metadata"), lambda: call_base(api_token, lambda b: b.get_metadata(), idempotent=True))
+    tables = {table.get("_id"): table for table in metadata.get("tables", [])}
+    table = next((t for t in tables.values() if t.get("name") == table_name), None)
+    targets = {}
+    for column in (table or {}).get("columns", []):
+        data = column.get("data") or {}
+        if column.get("type") != "link":
+            continue
+        # Links are stored once per pair of tables; either end may be table_id
+        other_id = data.get("other_table_id") if data.get("table_id") == table["_id"] else data.get("table_id")
+        if other_id in tables:
+            targets[column["name"]] = tables[other_id]["name"]
+    return targets
+
+def _linked_id(value):
+    return value.get("row_id") if isinstance(value, dict) else value
+
+def _resolve_links(api_token: str, table_name: str, rows: list) -> list:
+    """
+    Replace the references in link columns ([row_id, ...] or [{"row_id": ...,
+    "display_value": ...}, ...]) with the linked rows, fetching the rows of
+    each linked table in one batched lookup. Unknown references are kept as is.
+    """
+    targets = _link_targets(api_token, table_name)
+    if not targets or not rows:
+        return rows
+    wanted = {}
+    for row in rows:
+        for column, other_table in targets.items():
+            if isinstance(row.get(column), list):
+                wanted.setdefault(other_table, []).extend(_linked_id(v) for v in row[column])
+    linked = {other_table: _rows_by_ids(api_token, other_table, [i for i in ids if isinstance(i, str)])
+              for other_table, ids in wanted.items()}
+    resolved = []
+    for row in rows:
+        row = dict(row)
+        for column, other_table in targets.items():
+            if isinstance(row.get(column), list):
+                row[column] = [linked[other_table].get(_linked_id(v), v) for v in row[column]]
+        resolved.append(row)
+    return resolved
+
+@tool()
+def get_rows_by_ids(table_name: str, row_ids: list, columns: list = None, resolve_links: bool = False, output_format: str = None, drop_system_fields: bool = False, api_token: str = None) -> str:
+    """
+    Get rows by their _id, in the order given. Rows already read through this
+    server are answered from a local index; the rest are fetched with one SQL
+    query per 1000 ids. Unknown ids are left out.
+    
+    Args:
+        table_name: The name of the table.
+        row_ids: List of row IDs to fetch.
+        columns: Optional list of column names to return (the row _id is always kept).
+        resolve_links: If True, replace the row references in link columns with the linked rows.
+        output_format: 'repr' (default), 'json', 'columnar' or 'ndjson'.
+        drop_system_fields: If True, omit _ctime, _mtime, _creator and other system fields.
+        api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
+    """
+    try:
+        api_token = resolve_token(api_token)
+        _write_buffer.flush(api_token, table_name)
+        found = _rows_by_ids(api_token, table_name, row_ids)
+        rows = [found[row_id] for row_id in row_ids if row_id in found]
+        if resolve_links:
+            rows = _resolve_links(api_token, table_name, rows)
+        return _encode(_project(rows, columns), output_format, drop_system_fields)
+    except Exception as e:
+        return f"Error getting rows: {str(e)}"
+
+@tool()
+def add_row(table_name: str, row_data: dict, buffered: bool = True, api_token: str = None) -> str:
+    """
+    Add a new row to a SeaTable table.
+    
+    Args:
+        table_name: The name of the table.
+        row_data: A dictionary containing the row data.
+        buffered: If the write buffer is enabled, queue the row for a batched
+            insert. Pass False to write immediately and get the new row back.
+        api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
+    """
+    try:
+        if WRITE_BUFFER_WINDOW > 0:
+            if buffered:
+                _write_buffer.add(resolve_token(api_token), table_name, row_data, WRITE_BUFFER_WINDOW)
+                return f"Row queued for insert (sent within {WRITE_BUFFER_WINDOW:g}s or on flush_writes)."
+            _write_buffer.flush(resolve_token(api_token), table_name)
+        row = call_base(api_token, lambda b: b.append_row(table_name, row_data))
+        _after_row_write(resolve_token(api_token), table_name, rows=[row], inserted=True)
+        return f"Row added successfully: {row}"
+    except Exception as e:
+        return f"Error adding row: {str(e)}"
+
+@tool()
+def update_row(table_name: str, row_id: str, row_data: dict, buffered: bool = True, api_token: str = None) -> str:
+    """
+    Update an existing row in a SeaTable table.
+    
+    Args:
+        table_name: The name of the table.
+        row_id: The ID of the row to update.
+        row_data: A dictionary containing the updated data.
+        buffered: If the write buffer is enabled, merge this update with other
+            pending updates of the row. Pass False to write immediately.
+        api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
+    """
+    try:
+        if WRITE_BUFFER_WINDOW > 0:
+            if buffered:
+                _write_buffer.update(resolve_token(api_token), table_name, row_id, row_data, WRITE_BUFFER_WINDOW)
+                return f"Row {row_id} update queued (sent within {WRITE_BUFFER_WINDOW:g}s or on flush_writes)."
+            _write_buffer.flush(resolve_token(api_token), table_name)
+        call_base(api_token, lambda b: b.update_row(table_name, row_id, row_data), idempotent=True)
+        _after_row_write(resolve_token(api_token), table_name, rows=[{**row_data, "_id": row_id}])
+        return f"Row {row_id} updated successfully."
+    except Exception as e:
+        return f"Error updating row: {str(e)}"
+
+@tool()
+def delete_row(table_name: str, row_id: str, api_token: str = None) -> str:
+    """
+    Delete a row from a SeaTable table.
+    
+    Args:
+        table_name: The name of the table.
+        row_id: The ID of the row to delete.
+        api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
+    """
+    try:
+        _write_buffer.discard(resolve_token(api_token), table_name, [row_id])
+        call_base(api_token, lambda b: b.delete_row(table_name, row_id), idempotent=True)
+        _after_row_write(resolve_token(api_token), table_name, deleted_ids=[row_id])
+        return f"Row {row_id} deleted successfully."
+    except Exception as e:
+        return f"Error deleting row: {str(e)}"
+
+def _chunked(items: list, size: int) -> list:
+    """
+    Split a list into consecutive chunks of at most `size` items.
+    """
+    size = max(1, min(int(size), MAX_BATCH_SIZE))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def _clamp_workers(max_workers) -> int:
+    """Bound a caller-supplied worker count to 1..PER_BASE_CONCURRENCY."""
+    return max(1, min(int(max_workers or 1), PER_BASE_CONCURRENCY))
+
+def _send_batches(api_token: str, operation, chunks: list, max_workers: int = 1) -> dict:
+    """
+    Send each chunk through `operation` and summarize the outcome per chunk.
+
+    Chunks are sent sequentially by default; with max_workers > 1 up to that
+    many chunks are in flight at once, each holding a slot of the base (see
+    _base_thread_slot), so concurrent calls together stay within
+    PER_BASE_CONCURRENCY. A failing chunk does not stop the others.
+    Returns overall and per-chunk success/failure counts.
+    """
+    def send(index_chunk):
+        index, chunk = index_chunk
+        try:
+            operation(chunk)
+            return {"chunk": index, "rows": len(chunk), "success": len(chunk), "failed": 0}
+        except Exception as e:
+            return {"chunk": index, "rows": len(chunk), "success": 0, "failed": len(chunk), "error": str(e)}
+
+    def send_in_slot(index_chunk):
+        with _base_thread_slot(api_token):
+            return send(index_chunk)
+
+    indexed = list(enumerate(chunks))
+    max_workers = _clamp_workers(max_workers)
+    if max_workers > 1 and len(indexed) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(indexed))) as pool:
+            results = list(pool.map(send_in_slot, indexed))
+    else:
+        results = [send(item) for item in indexed]
+
+    return {
+        "total": sum(r["rows"] for r in results),
+        "success": sum(r["success"] for r in results),
+        "failed": sum(r["failed"] for r in results),
+        "chunks": results,
+    }
+
+def _run_batches(api_token: str, operation, chunks: list, max_workers: int = 1) -> str:
+    return json.dumps(_send_batches(api_token, operation, chunks, max_workers))
+
+def _append_chunk(api_token: str, table_name: str, chunk: list):
+    call_base(api_token, lambda b: b.batch_append_rows(table_name, chunk))
+    _after_row_write(api_token, table_name)
+
+def _update_chunk(api_token: str, table_name: str, chunk: list):
+    call_base(api_token, lambda b: b.batch_update_rows(table_name, chunk), idempotent=True)
+    _after_row_write(api_token, table_name, rows=[{**u.get("row", {}), "_id": u.get("row_id")} for u in chunk])
+
+def _delete_chunk(api_token: str, table_name: str, chunk: list):
+    _write_buffer.discard(api_token, table_name, chunk)
+    call_base(api_token, lambda b: b.batch_delete_rows(table_name, chunk), idempotent=True)
+    _after_row_write(api_token, table_name, deleted_ids=chunk)
+
+@tool()
+def batch_add_rows(table_name: str, rows: list, chunk_size: int = MAX_BATCH_SIZE, max_workers: int = 1, api_token: str = None) -> str:
+    """
+    Add many rows to a SeaTable table, split into server-sized batch requests.
+    
+    Args:
+        table_name: The name of the table.
+        rows: A list of dictionaries, one per row.
+        chunk_size: Rows per request (at most 1000).
+        max_workers: Number of chunks to send in parallel (default 1, sequential; at most SEATABLE_PER_BASE_CONCURRENCY).
+        api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
+    """
+    try:
+        api_token = resolve_token(api_token)
+        _write_buffer.flush(api_token, table_name)
+        append = functools.partial(_append_chunk, api_token, table_name)
+        return _run_batches(api_token, append, _chunked(rows, chunk_size), max_workers)
+    except Exception as e:
+        return f"Error adding rows: {str(e)}"
+
+@tool()
+def batch_update_rows(table_name: str, updates: list, chunk_size: int = MAX_BATCH_SIZE, max_workers: int = 1, api_token: str = None) -> str:
+    """
+    Update many rows in a SeaTable table, split into server-sized batch requests.
+    
+    Args:
+        table_name: The name of the table.
+        updates: A list of {"row_id": ..., "row": {...}} dictionaries.
+        chunk_size: Rows per request (at most 1000).
+        max_workers: Number of chunks to send in parallel (default 1, sequential; at most SEATABLE_PER_BASE_CONCURRENCY).
+        api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
+    """
+    try:
+        api_token = resolve_token(api_token)
+        _write_buffer.flush(api_token, table_name)
+        update = functools.partial(_update_chunk, api_token, table_name)
+        return _run_batches(api_token, update, _chunked(updates, chunk_size), max_workers)
+    except Exception as e:
+        return f"Error updating rows: {str(e)}"
+
+@tool()
+def batch_delete_rows(table_name: str, row_ids: list, chunk_size: int = MAX_BATCH_SIZE, max_workers: int = 1, api_token: str = None) -> str:
+    """
+    Delete many rows from a SeaTable table, split into server-sized batch requests.
+    
+    Args:
+        table_name: The name of the table.
+        row_ids: A list of row IDs to delete.
+        chunk_size: Rows per request (at most 1000).
+        max_workers: Number of chunks to send in parallel (default 1, sequential; at most SEATABLE_PER_BASE_CONCURRENCY).
+        api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
     """
-    # 1. Try to find in JSON config
-    token = get_token_for_base(base_name)
-    if token:
-        return token
+    try:
+        api_token = resolve_token(api_token)
+        delete = functools.partial(_delete_chunk, api_token, table_name)
+        return _run_batches(api_token, delete, _chunked(row_ids, chunk_size), max_workers)
+    except Exception as e:
+        return f"Error deleting rows: {str(e)}"
 
-    # If not found, check if it matches the legacy env var fallback indirectly?
-    # Actually, user wants "query the base api token accoding to the name in the config file"
-    # So if not in config, we should error out with available bases.
-    
-    msg = f"Base '{base_name}' not found in configuration."
-    if available_bases:
-        msg += f" Available bases: {', '.join(available_bases)}"
-    else:
-        msg += " No bases configured."
-    raise ValueError(msg)
+# Seconds add_row / update_row writes are held to be merged and sent as one
+# batch request per table (0 sends every write immediately)
+WRITE_BUFFER_WINDOW = float(os.environ.get("SEATABLE_WRITE_BUFFER_WINDOW", "0"))
 
-def get_token_for_base(base_name: str) -> str:
+class _WriteBuffer:
     """
-    Find the API token for a given base name from config.
+    Write-behind buffer for single-row writes. Updates to the same row are
+    merged field by field and appends are collected, per (api_token, table);
+    each table is flushed as batch requests once its window has passed, before
+    anything reads it through this server, on flush_writes and at exit.
     """
-    # 1. Try to find in JSON config
-    config = load_config()
-    if config:
-        for entry in config:
-            if entry.get('base_name') == base_name:
-                return entry.get('api_token')
-    return None
 
-def get_base(api_token: str = None):
-    """
-    Get a Base instance. 
-    If api_token is provided, uses it directly.
-    If not, falls back to SEATABLE_API_TOKEN environment variable.
-    """
-    if not api_token:
-        # Fallback to single environment variable
-        api_token = os.environ.get("SEATABLE_API_TOKEN")
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Map: (api_token, table_name) -> RLock serializing the flushes of that
+        # table, so merged writes reach SeaTable in order
+        self._flush_locks = {}
+        # Map: (api_token, table_name) -> number of flushes of it in progress
+        self._flushing = {}
+        # Map: (api_token, table_name) -> {"updates": {row_id: fields}, "adds": [rows], "timer": Timer}
+        self._pending = {}
+        # Chunks that failed during a background flush, reported by flush_writes
+        self.errors = deque(maxlen=100)
 
-    if not api_token:
-        raise ValueError("No API token provided and SEATABLE_API_TOKEN is not set.")
+    def _entry(self, api_token: str, table_name: str, window: float) -> dict:
+        key = (api_token, table_name)
+        entry = self._pending.get(key)
+        if entry is None:
+            timer = threading.Timer(window, self._flush_in_background, args=(api_token, table_name))
+            timer.daemon = True
+            entry = self._pending[key] = {"updates": OrderedDict(), "adds": [], "timer": timer}
+            timer.start()
+        return entry
 
-    target_server_url = os.environ.get("SEATABLE_SERVER_URL", server_url)
-    
-    if api_token in _check_base_cache:
-        return _check_base_cache[api_token]
+    def add(self, api_token: str, table_name: str, row_data: dict, window: float):
+        with self._lock:
+            self._entry(api_token, table_name, window)["adds"].append(dict(row_data))
+
+    def update(self, api_token: str, table_name: str, row_id: str, row_data: dict, window: float):
+        with self._lock:
+            fields = self._entry(api_token, table_name, window)["updates"].setdefault(row_id, {})
+            fields.update(row_data)
+
+    def discard(self, api_token: str, table_name: str, row_ids: list):
+        """
+        Drop pending updates of rows that are being deleted.
+        """
+        with self._lock:
+            entry = self._pending.get((api_token, table_name))
+            if entry is not None:
+                for row_id in row_ids:
+                    entry["updates"].pop(row_id, None)
+
+    def flush(self, api_token: str = None, table_name: str = None) -> dict:
+        """
+        Send the pending writes of one table, of every table of a base
+        (table_name=None) or of everything (api_token=None).
+        """
+        report = {"inserted": 0, "updated": 0, "failed": 0, "errors": []}
+        with self._lock:
+            # Tables with pending writes, or with a flush in progress that a
+            # reader has to wait for; usually none, and then no lock is taken
+            keys = [key for key in list(self._pending) + list(self._flushing)
+                    if (api_token is None or key[0] == api_token) and (table_name is None or key[1] == table_name)]
+            locks = [(key, self._flush_locks.setdefault(key, threading.RLock())) for key in dict.fromkeys(keys)]
+        for (token, table), lock in locks:
+            with lock:
+                with self._lock:
+                    entry = self._pending.pop((token, table), None)
+                    self._flushing[(token, table)] = self._flushing.get((token, table), 0) + 1
+                try:
+                    if entry is not None:
+                        self._send(token, table, entry, report)
+                finally:
+                    with self._lock:
+                        self._flushing[(token, table)] -= 1
+                        if not self._flushing[(token, table)]:
+                            del self._flushing[(token, table)]
+        return report
 
-    base = Base(api_token, target_server_url)
-    base.auth()
-    _check_base_cache[api_token] = base
-    return base
+    @staticmethod
+    def _send(token: str, table: str, entry: dict, report: dict):
+        entry["timer"].cancel()
+        updates = [{"row_id": row_id, "row": fields} for row_id, fields in entry["updates"].items() if fields]
+        for name, operation, items in (("inserted", _append_chunk, entry["adds"]),
+                                       ("updated", _update_chunk, updates)):
+            if not items:
+                continue
+            result = _send_batches(token, functools.partial(operation, token, table), _chunked(items, MAX_BATCH_SIZE))
+            report[name] += result["success"]
+            report["failed"] += result["failed"]
+            report["errors"].extend({"table": table, "operation": name, **chunk}
+                                    for chunk in result["chunks"] if chunk["failed"])
 
-@mcp.tool()
-def list_rows(table_name: str, view_name: str = None, limit: int = 100, api_token: str = None) -> str:
+    def _flush_in_background(self, api_token: str, table_name: str):
+        report = self.flush(api_token, table_name)
+        for error in report["errors"]:
+            print(f"Buffered write failed: {error}", file=sys.stderr)
+            self.errors.append(error)
+
+    def pending(self) -> dict:
+        with self._lock:
+            return {"tables": len(self._pending),
+                    "updates": sum(len(e["updates"]) for e in self._pending.values()),
+                    "adds": sum(len(e["adds"]) for e in self._pending.values())}
+
+    def clear(self):
+        with self._lock:
+            for entry in self._pending.values():
+                entry["timer"].cancel()
+            self._pending.clear()
+            self.errors.clear()
+
+_write_buffer = _WriteBuffer()
+atexit.register(_write_buffer.flush)
+
+@tool(uses_base=False)
+def flush_writes(api_token: str = None) -> str:
     """
-    List rows from a SeaTable table.
+    Send all buffered add_row / update_row writes now and report the outcome,
+    including writes that failed in earlier background flushes.
     
     Args:
-        table_name: The name of the table to list rows from.
-        view_name: Optional name of the view to filter rows.
-        limit: Maximum number of rows to return (default 100).
-        api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
+        api_token: Only flush writes to this base. Defaults to all bases.
     """
     try:
-        b = get_base(api_token)
-        # SeaTable API list_rows returns a list of dictionaries
-        rows = b.list_rows(table_name, view_name=view_name, limit=limit)
-        return str(rows)
+        report = _write_buffer.flush(api_token)
+        earlier = list(_write_buffer.errors)
+        _write_buffer.errors.clear()
+        report["errors"] = earlier + report["errors"]
+        return json.dumps(report)
     except Exception as e:
-        return f"Error listing rows: {str(e)}"
+        return f"Error flushing writes: {str(e)}"
 
-@mcp.tool()
-def add_row(table_name: str, row_data: dict, api_token: str = None) -> str:
+def _upsert_key(value):
     """
-    Add a new row to a SeaTable table.
+    Normalize a key column value so 7, 7.0 and "7" from external data match
+    what SeaTable returns.
+    """
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+def _same_value(new, old) -> bool:
+    if new in (None, "") and old in (None, ""):
+        return True
+    if isinstance(new, (int, float)) and isinstance(old, (int, float)) and not isinstance(new, bool):
+        return float(new) == float(old)
+    return new == old
+
+def _existing_rows(api_token: str, table_name: str, columns: set) -> list:
+    """
+    Return the current rows of a table with _id and the given columns, from the
+    snapshot if one is enabled, else with one paginated SQL pass.
+    """
+    snapshot = _get_snapshot(api_token, table_name)
+    if snapshot is not None:
+        return list(snapshot.fresh_rows().values())
+    selected = ", ".join("`%s`" % c for c in ["_id"] + sorted(columns))
+    return _query_all(api_token, "SELECT %s FROM `%s`" % (selected, table_name), MAX_SQL_PAGE_SIZE)
+
+@tool()
+def upsert_rows(table_name: str, rows: list, key_column: str, delete_missing: bool = False, chunk_size: int = MAX_BATCH_SIZE, max_workers: int = 1, api_token: str = None) -> str:
+    """
+    Insert or update rows matched on a business key column, sending only the
+    rows that changed in batch requests.
     
     Args:
         table_name: The name of the table.
-        row_data: A dictionary containing the row data.
+        rows: A list of dictionaries, one per row. Each must contain key_column.
+        key_column: The column whose value identifies a row (e.g. an external ID).
+        delete_missing: If True, also delete table rows whose key is not in rows
+            (including extra rows sharing a key).
+        chunk_size: Rows per request (at most 1000).
+        max_workers: Number of chunks to send in parallel (default 1, sequential; at most SEATABLE_PER_BASE_CONCURRENCY).
         api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
     """
     try:
-        b = get_base(api_token)
-        row = b.append_row(table_name, row_data)
-        return f"Row added successfully: {row}"
+        api_token = resolve_token(api_token)
+        _write_buffer.flush(api_token, table_name)
+        incoming, skipped = {}, 0
+        for row in rows:
+            if row.get(key_column) in (None, ""):
+                skipped += 1
+                continue
+            # Later rows with the same key win
+            incoming[_upsert_key(row[key_column])] = row
+
+        columns = {c for row in incoming.values() for c in row} | {key_column}
+        current_rows = _existing_rows(api_token, table_name, columns)
+        existing = {}
+        for row in current_rows:
+            if row.get(key_column) not in (None, ""):
+                existing.setdefault(_upsert_key(row[key_column]), row)
+
+        inserts, updates, unchanged = [], [], 0
+        for key, row in incoming.items():
+            current = existing.get(key)
+            if current is None:
+                inserts.append(row)
+                continue
+            changed = {c: v for c, v in row.items() if c != key_column and not _same_value(v, current.get(c))}
+            if changed:
+                updates.append({"row_id": current["_id"], "row": changed})
+            else:
+                unchanged += 1
+        deletes = []
+        if delete_missing:
+            kept = {existing[key]["_id"] for key in incoming if key in existing}
+            deletes = [row["_id"] for row in current_rows if row["_id"] not in kept]
+
+        report = {"inserted": 0, "updated": 0, "unchanged": unchanged, "deleted": 0, "skipped": skipped, "failed": 0, "errors": []}
+        for name, operation, items in (("inserted", _append_chunk, inserts),
+                                       ("updated", _update_chunk, updates),
+                                       ("deleted", _delete_chunk, deletes)):
+            if not items:
+                continue
+            result = _send_batches(api_token, functools.partial(operation, api_token, table_name), _chunked(items, chunk_size), max_workers)
+            report[name] = result["success"]
+            report["failed"] += result["failed"]
+            report["errors"].extend({"operation": name, **chunk} for chunk in result["chunks"] if chunk["failed"])
+        return json.dumps(report)
     except Exception as e:
-        return f"Error adding row: {str(e)}"
+        return f"Error upserting rows: {str(e)}"
+
+_TRUE_VALUES = ("1", "true", "yes", "y", "x", "on", "checked")
+_FALSE_VALUES = ("0", "false", "no", "n", "off", "")
 
-@mcp.tool()
-def update_row(table_name: str, row_id: str, row_data: dict, api_token: str = None) -> str:
+def _coerce(value, column_type: str):
     """
-    Update an existing row in a SeaTable table.
+    Convert a value read from a CSV or NDJSON file to what a column of
+    column_type expects. Raises ValueError for values that do not fit.
+    """
+    if column_type == "number":
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return value
+        number = float(str(value).strip().replace(",", ""))
+        return int(number) if number.is_integer() else number
+    if column_type == "checkbox":
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower()
+        if text in _TRUE_VALUES:
+            return True
+        if text in _FALSE_VALUES:
+            return False
+        raise ValueError(f"not a checkbox value: {value!r}")
+    if column_type in ("multiple-select", "collaborator"):
+        if isinstance(value, list):
+            return value
+        return [item.strip() for item in re.split(r"[;,]", str(value)) if item.strip()]
+    if column_type in ("text", "long-text", "single-select", "email", "url", "date", "duration"):
+        return value if isinstance(value, str) else str(value)
+    return value
+
+def _read_records(path: str, file_format: str):
+    """
+    Yield one dict per CSV row or NDJSON line, reading the file incrementally.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if file_format == "csv":
+            yield from csv.DictReader(f)
+            return
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError(f"line {number} is not a JSON object")
+                yield record
+
+class _ImportJournal:
+    """
+    Progress of one import_file run, stored as JSON next to the source file
+    (or in the temporary directory if that is not writable). Chunks are numbered by position in the file; a chunk is recorded as
+    started before it is sent and as done once SeaTable accepted it.
+    """
+
+    def __init__(self, journal_path: str, signature: dict):
+        self.path = journal_path
+        self.lock = threading.Lock()
+        self.state = {**signature, "started": [], "done": []}
+        if os.path.exists(journal_path):
+            with open(journal_path) as f:
+                saved = json.load(f)
+            if all(saved.get(k) == v for k, v in signature.items()):
+                self.state = saved
+        self.done = set(self.state["done"])
+        # Chunks that were in flight when an earlier run stopped
+        self.interrupted = set(self.state["started"]) - self.done
+
+    @staticmethod
+    def path_for(source_path: str) -> str:
+        directory = os.path.dirname(os.path.abspath(source_path))
+        if os.access(directory, os.W_OK):
+            return source_path + ".import-journal.json"
+        digest = hashlib.sha256(os.path.abspath(source_path).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(tempfile.gettempdir(), f"seatable-import-{digest}.json")
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+
+    def start(self, index: int):
+        with self.lock:
+            self.state["started"] = sorted(set(self.state["started"]) | {index})
+            self._save()
+
+    def finish(self, index: int):
+        with self.lock:
+            self.done.add(index)
+            self.state["done"] = sorted(self.done)
+            self._save()
+
+    def fail(self, index: int):
+        """
+        Record that SeaTable rejected a chunk, so the next run retries it
+        rather than treat it as interrupted.
+        """
+        with self.lock:
+            self.state["started"] = [i for i in self.state["started"] if i != index]
+            self._save()
+
+@tool()
+def import_file(table_name: str, path: str, format: str = None, column_map: dict = None, key_column: str = None, chunk_size: int = MAX_BATCH_SIZE, max_workers: int = 4, api_token: str = None) -> str:
+    """
+    Import rows from a local CSV or NDJSON file into a table.
+    
+    The file is read incrementally and written in batches of chunk_size rows,
+    up to max_workers batches at a time. Values are converted to the column
+    types of the table. Progress is checkpointed to <path>.import-journal.json
+    (in the temporary directory if the file's directory is read-only): running
+    the same import again skips the chunks that were already written and
+    retries the ones SeaTable refused (4xx). Chunks that were in flight when an
+    earlier run stopped, or failed without a definite answer (timeout, dropped
+    connection, 5xx), may already be in the table; they are only resent with
+    key_column, and otherwise reported under interrupted_chunks.
     
     Args:
         table_name: The name of the table.
-        row_id: The ID of the row to update.
-        row_data: A dictionary containing the updated data.
+        path: Path of the CSV (with a header row) or NDJSON file.
+        format: 'csv' or 'ndjson'. Defaults to the file extension.
+        column_map: Optional {file field: column name} renames; fields that are not columns are ignored.
+        key_column: Optional column identifying a row. Chunks that were in flight when an
+            earlier run stopped are then upserted on it instead of appended, so they cannot be
+            duplicated. Without it such chunks are not resent.
+        chunk_size: Rows per request (at most 1000).
+        max_workers: Number of chunks to send in parallel (default 4, at most SEATABLE_PER_BASE_CONCURRENCY).
         api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
     """
     try:
-        b = get_base(api_token)
-        b.update_row(table_name, row_id, row_data)
-        return f"Row {row_id} updated successfully."
+        api_token = resolve_token(api_token)
+        file_format = (format or os.path.splitext(path)[1].lstrip(".")).lower()
+        file_format = "ndjson" if file_format == "jsonl" else file_format
+        if file_format not in ("csv", "ndjson"):
+            raise ValueError("format must be 'csv' or 'ndjson'.")
+        chunk_size = max(1, min(int(chunk_size), MAX_BATCH_SIZE))
+        column_map = column_map or {}
+
+        _write_buffer.flush(api_token, table_name)
+        types = {c["name"]: c.get("type") for c in _columns(api_token, table_name)}
+        st = os.stat(path)
+        journal = _ImportJournal(_ImportJournal.path_for(path), {
+            "table": table_name, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+            "chunk_size": chunk_size, "column_map": column_map, "key_column": key_column})
+
+        report = {"rows": 0, "written": 0, "skipped_chunks": 0, "failed": 0, "invalid_values": 0,
+                  "ignored_fields": [], "interrupted_chunks": [], "errors": []}
+        ignored = set()
+
+        def convert(record: dict) -> dict:
+            row = {}
+            for field, value in record.items():
+                column = column_map.get(field, field)
+                if column not in types:
+                    ignored.add(field)
+                    continue
+                if value is None or value == "":
+                    continue
+                try:
+                    row[column] = _coerce(value, types[column])
+                except (TypeError, ValueError):
+                    report["invalid_values"] += 1
+            return row
+
+        def send(index: int, rows: list):
+            with _base_thread_slot(api_token):
+                return send_chunk(index, rows)
+
+        def send_chunk(index: int, rows: list):
+            journal.start(index)
+            try:
+                if index in journal.interrupted and key_column:
+                    result = json.loads(upsert_rows(table_name, rows, key_column, api_token=api_token))
+                    if result["failed"]:
+                        raise RuntimeError(result["errors"])
+                else:
+                    _append_chunk(api_token, table_name, rows)
+            except Exception as e:
+                # Only a refused chunk is known not to be in the table; any other
+                # failure leaves it started, to be treated as interrupted next run
+                if _rejected(e):
+                    journal.fail(index)
+                raise
+            journal.finish(index)
+            return len(rows)
+
+        # Bounded number of chunks held in memory: those being sent plus one being read
+        max_workers = _clamp_workers(max_workers)
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        in_flight = {}
+
+        def collect(block: bool):
+            done = [f for f in in_flight if f.done()] if not block else [next(iter(in_flight))]
+            for future in done:
+                index = in_flight.pop(future)
+                try:
+                    report["written"] += future.result()
+                except Exception as e:
+                    report["failed"] += 1
+                    report["errors"].append({"chunk": index, "error": str(e)})
+
+        try:
+            chunk, index = [], 0
+            records = _read_records(path, file_format)
+            while True:
+                record = next(records, None)
+                if record is not None:
+                    report["rows"] += 1
+                    chunk.append(record)
+                if chunk and (len(chunk) >= chunk_size or record is None):
+                    if index in journal.done:
+                        report["skipped_chunks"] += 1
+                    elif index in journal.interrupted and not key_column:
+                        # Appending again could duplicate rows that arrived before the stop
+                        report["interrupted_chunks"].append({"chunk": index, "first_row": index * chunk_size,
+                                                             "rows": len(chunk)})
+                    else:
+                        while len(in_flight) >= max_workers:
+                            collect(block=True)
+                        in_flight[pool.submit(send, index, [convert(r) for r in chunk])] = index
+                    chunk, index = [], index + 1
+                    collect(block=False)
+                if record is None:
+                    break
+            while in_flight:
+                collect(block=True)
+        finally:
+            pool.shutdown(wait=True)
+
+        report["chunks"] = index
+        report["ignored_fields"] = sorted(ignored)
+        hints = []
+        if report["failed"]:
+            hints.append("Run the same import again to retry the failed chunks.")
+        if report["interrupted_chunks"]:
+            hints.append("The interrupted chunks may already be partly in the table. Check them, or "
+                         "run the import again with key_column to upsert them.")
+        if hints:
+            report["hint"] = " ".join(hints)
+        return json.dumps(report)
     except Exception as e:
-        return f"Error updating row: {str(e)}"
+        return f"Error importing file: {str(e)}"
 
-@mcp.tool()
-def delete_row(table_name: str, row_id: str, api_token: str = None) -> str:
+EXPORT_FORMATS = {"csv": "csv", "ndjson": "ndjson", "jsonl": "ndjson", "parquet": "parquet",
+                  "arrow": "arrow", "feather": "arrow"}
+
+def _export_value(value):
     """
-    Delete a row from a SeaTable table.
+    Flatten a cell for formats without nested values: lists and dicts
+    (select options, links, files) become JSON text.
+    """
+    return _to_json(value) if isinstance(value, (list, dict)) else value
+
+class _TextExport:
+    def __init__(self, path: str, file_format: str, fields: list):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.fields = fields
+        self.writer = None
+        if file_format == "csv":
+            self.writer = csv.DictWriter(self.file, fieldnames=fields, extrasaction="ignore")
+            self.writer.writeheader()
+
+    def write(self, rows: list):
+        if self.writer is not None:
+            self.writer.writerows({k: _export_value(row.get(k)) for k in self.fields} for row in rows)
+        else:
+            self.file.writelines(_to_json(row) + "\n" for row in rows)
+
+    def close(self):
+        self.file.close()
+
+class _ArrowExport:
+    """
+    Writes each page as one record batch, to a Parquet file or an Arrow IPC file.
+    """
+
+    def __init__(self, path: str, file_format: str, fields: list, types: dict):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError(f"{file_format} export needs pyarrow (pip install pyarrow).")
+        arrow_types = {"number": pa.float64(), "checkbox": pa.bool_(), "rate": pa.float64(), "auto-number": pa.string()}
+        self.pa = pa
+        self.fields = fields
+        self.numeric = {f for f in fields if types.get(f) in ("number", "rate")}
+        self.schema = pa.schema([(f, arrow_types.get(types.get(f), pa.string())) for f in fields])
+        if file_format == "parquet":
+            self.writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self.sink = pa.OSFile(path, "wb")
+            self.writer = pa.ipc.new_file(self.sink, self.schema)
+
+    def _cell(self, field: str, value):
+        if value is None or value == "":
+            return None
+        if field in self.numeric:
+            return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+        if self.schema.field(field).type == self.pa.bool_():
+            return bool(value)
+        value = _export_value(value)
+        return value if isinstance(value, str) else str(value)
+
+    def write(self, rows: list):
+        columns = {f: [self._cell(f, row.get(f)) for row in rows] for f in self.fields}
+        self.writer.write_batch(self.pa.RecordBatch.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+        if hasattr(self, "sink"):
+            self.sink.close()
+
+@tool()
+def export_table(table_name: str, path: str, view_name: str = None, format: str = None, columns: list = None, drop_system_fields: bool = False, api_token: str = None) -> str:
+    """
+    Export a whole table or view to a local CSV, NDJSON, Parquet or Arrow file.
+    
+    Rows are fetched page by page (the next page is fetched while the current
+    one is written) and appended to the file, so memory use does not grow with
+    the table. Only a summary is returned: {"path", "rows", "bytes", "sha256"}.
     
     Args:
         table_name: The name of the table.
-        row_id: The ID of the row to delete.
+        path: Local file to write. Replaced only once the export is complete.
+        view_name: Optional view to export instead of the whole table.
+        format: 'csv', 'ndjson', 'parquet' or 'arrow'. Defaults to the file extension.
+            Parquet and Arrow need pyarrow and write one columnar batch per page.
+        columns: Optional list of column names to export (the row _id is always kept).
+        drop_system_fields: If True, omit _ctime, _mtime, _creator and other system fields.
         api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
     """
     try:
-        b = get_base(api_token)
-        b.delete_row(table_name, row_id)
-        return f"Row {row_id} deleted successfully."
+        api_token = resolve_token(api_token)
+        file_format = EXPORT_FORMATS.get((format or os.path.splitext(path)[1].lstrip(".")).lower())
+        if file_format is None:
+            raise ValueError("format must be 'csv', 'ndjson', 'parquet' or 'arrow'.")
+
+        _write_buffer.flush(api_token, table_name)
+        table_columns = _columns(api_token, table_name, view_name)
+        types = {c["name"]: c.get("type") for c in table_columns}
+        fields = ["_id"] + [name for name in (columns or [c["name"] for c in table_columns]) if name != "_id"]
+        if not drop_system_fields and not columns:
+            fields += ["_ctime", "_mtime"]
+
+        partial_path = path + ".part"
+        exported = 0
+        try:
+            if file_format in ("csv", "ndjson"):
+                writer = _TextExport(partial_path, file_format, fields)
+            else:
+                writer = _ArrowExport(partial_path, file_format, fields, types)
+            try:
+                start = 0
+                while True:
+                    rows = _get_page(api_token, table_name, view_name, start, MAX_PAGE_SIZE)
+                    rows = _project(rows, columns)
+                    if drop_system_fields:
+                        rows = _drop_system_fields(rows)
+                    if rows:
+                        writer.write(rows)
+                        exported += len(rows)
+                    if len(rows) < MAX_PAGE_SIZE:
+                        break
+                    start += MAX_PAGE_SIZE
+            finally:
+                writer.close()
+
+            digest = hashlib.sha256()
+            with open(partial_path, "rb") as f:
+                for block in iter(lambda: f.read(FILE_CHUNK_SIZE), b""):
+                    digest.update(block)
+            os.replace(partial_path, path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        return json.dumps({"path": path, "format": file_format, "rows": exported,
+                           "bytes": os.path.getsize(path), "sha256": digest.hexdigest()})
     except Exception as e:
-        return f"Error deleting row: {str(e)}"
+        return f"Error exporting table: {str(e)}"
 
-@mcp.tool()
-def get_base_info(api_token: str = None) -> str:
+@tool()
+def get_base_info(output_format: str = None, api_token: str = None) -> str:
     """
     Get metadata about the current base (tables, columns, etc).
     
     Args:
+        output_format: 'repr' (default) or 'json'.
         api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
     """
     try:
-        b = get_base(api_token)
-        metadata = b.get_metadata()
-        return str(metadata)
+        api_token = resolve_token(api_token)
+        metadata = _metadata_cache.get((api_token, "metadata"), lambda: call_base(api_token, lambda b: b.get_metadata(), idempotent=True))
+        return _encode(metadata, output_format)
     except Exception as e:
         return f"Error getting base info: {str(e)}"
 
-@mcp.tool()
-def run_sql(query: str, api_token: str = None) -> str:
+# SeaTable SQL returns at most 10000 rows per query
+MAX_SQL_PAGE_SIZE = 10000
+
+_SQL_TOKENS = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`)")
+_SQL_TABLES = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(`[^`]+`|[^\s,;()]+)", re.IGNORECASE)
+_SQL_LIMIT = re.compile(r"\s+LIMIT\s+(\d+)(?:\s*,\s*(\d+))?(?:\s+OFFSET\s+(\d+))?\s*$", re.IGNORECASE)
+
+def _normalize_sql(query: str) -> str:
+    """
+    Collapse whitespace outside quoted literals and drop a trailing semicolon,
+    so equivalent spellings of a query share a cache entry.
+    """
+    parts = _SQL_TOKENS.split(query.strip().rstrip(";").strip())
+    return "".join(part if i % 2 else re.sub(r"\s+", " ", part) for i, part in enumerate(parts)).strip()
+
+def _sql_tables(query: str) -> set:
+    """
+    Return the names of the tables a query reads or writes.
+    """
+    unquoted = "".join(part if not i % 2 or part.startswith("`") else "''"
+                       for i, part in enumerate(_SQL_TOKENS.split(query)))
+    return {name.strip("`") for name in _SQL_TABLES.findall(unquoted)}
+
+def _query_all(api_token: str, query: str, page_size: int) -> list:
+    """
+    Run a SELECT in pages of page_size rows by rewriting its LIMIT/OFFSET, and
+    return the complete result. An explicit LIMIT/OFFSET in the query still
+    bounds the rows returned.
+    """
+    page_size = max(1, min(page_size, MAX_SQL_PAGE_SIZE))
+    total, offset = None, 0
+    match = _SQL_LIMIT.search(query)
+    if match:
+        query = query[:match.start()]
+        if match.group(2) is not None:
+            # MySQL style "LIMIT offset, count"
+            offset, total = int(match.group(1)), int(match.group(2))
+        else:
+            total, offset = int(match.group(1)), int(match.group(3) or 0)
+
+    results = []
+    while total is None or len(results) < total:
+        size = page_size if total is None else min(page_size, total - len(results))
+        sql = f"{query} LIMIT {size} OFFSET {offset}"
+        page = call_base(api_token, lambda b: b.query(sql), idempotent=True) or []
+        results.extend(page)
+        if len(page) < size:
+            break
+        offset += size
+    return results
+
+def _execute_sql(api_token: str, query: str, paginate: bool = False, page_size: int = MAX_SQL_PAGE_SIZE, use_cache: bool = True):
+    """
+    Run a query against one base and return the raw result. SELECTs go through
+    the result cache; other statements invalidate the tables they touch.
+    """
+    normalized = _normalize_sql(query)
+    tables = _sql_tables(normalized)
+    is_select = normalized.split(" ", 1)[0].upper() == "SELECT"
+    for table_name in tables:
+        _write_buffer.flush(api_token, table_name)
+
+    if not is_select:
+        results = call_base(api_token, lambda b: b.query(query))
+        for table_name in tables:
+            # UPDATE/DELETE statements change rows this server cannot see
+            _row_index.invalidate(api_token, table_name)
+            _after_row_write(api_token, table_name)
+        return results
+
+    if paginate:
+        load = lambda: _query_all(api_token, normalized, page_size)
+    else:
+        load = lambda: call_base(api_token, lambda b: b.query(query), idempotent=True)
+    if use_cache:
+        key = (api_token, "sql", frozenset(t.lower() for t in tables), normalized, page_size if paginate else None)
+        return _sql_cache.get(key, load)
+    return load()
+
+@tool()
+def run_sql(query: str, output_format: str = None, drop_system_fields: bool = False, paginate: bool = False, page_size: int = MAX_SQL_PAGE_SIZE, use_cache: bool = True, api_token: str = None) -> str:
     """
     Execute a SQL query against the SeaTable base.
     
     Args:
         query: The SQL query string.
+        output_format: 'repr' (default), 'json', 'columnar' (header + rows as arrays) or 'ndjson'.
+        drop_system_fields: If True, omit _ctime, _mtime, _creator and other system fields.
+        paginate: If True, fetch the complete result of a SELECT in pages of page_size rows
+            instead of stopping at the server row cap. Use with output_format='ndjson' for large results.
+        page_size: Rows per page when paginating (at most 10000).
+        use_cache: If False, bypass the result cache for this call.
         api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
     """
     try:
-        b = get_base(api_token)
-        results = b.query(query)
-        return str(results)
+        results = _execute_sql(resolve_token(api_token), query, paginate, page_size, use_cache)
+        return _encode(results, output_format, drop_system_fields)
     except Exception as e:
         return f"Error executing SQL: {str(e)}"
 
-@mcp.tool()
-def list_columns(table_name: str, view_name: str = None, api_token: str = None) -> str:
+# Default per-base timeout of query_all_bases, in seconds
+FANOUT_TIMEOUT = float(os.environ.get("SEATABLE_FANOUT_TIMEOUT", "30"))
+
+@tool(uses_base=False)
+def query_all_bases(query: str, base_names: list = None, output_format: str = "json", drop_system_fields: bool = False, paginate: bool = False, max_workers: int = 8, timeout: float = None) -> str:
+    """
+    Run the same SQL query against several configured bases concurrently and
+    return the rows merged, each tagged with its base in "_base".
+    
+    Args:
+        query: The SQL query string, e.g. "SELECT * FROM Table1 WHERE Status = 'open'".
+        base_names: Names of the bases to query (see get_all_bases). Defaults to all configured bases.
+        output_format: 'json' (default, {"rows": [...], "bases": {...}, "errors": {...}}), 'columnar' or 'ndjson'
+            (one row per line followed by a {"bases": ..., "errors": ...} line).
+        drop_system_fields: If True, omit _ctime, _mtime, _creator and other system fields.
+        paginate: If True, fetch each base's complete result instead of stopping at the server row cap.
+        max_workers: Number of bases queried at once (default 8, at most SEATABLE_MAX_WORKERS).
+        timeout: Seconds to wait for each base (default SEATABLE_FANOUT_TIMEOUT, 30).
+            Bases that fail or time out are listed in "errors"; the others are still returned.
+    """
+    try:
+        output_format = _check_format(output_format)
+        if _normalize_sql(query).split(" ", 1)[0].upper() != "SELECT":
+            raise ValueError("Only SELECT queries can be run against several bases.")
+        tokens = _config_cache.get()[1]
+        names = list(base_names) if base_names else [name for name in tokens if name]
+        timeout = FANOUT_TIMEOUT if timeout is None else timeout
+
+        errors = {name: "Base not found in configuration." for name in names if not tokens.get(name)}
+        targets = [name for name in names if tokens.get(name)]
+        results, stats = {}, {}
+        # Bases run concurrently, so every deadline counts from the fan-out start
+        deadline = time.monotonic() + timeout
+
+        def run(name: str):
+            slot = _base_thread_slot(tokens[name])
+            if not slot.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                raise TimeoutError(f"Timed out after {timeout:g}s")
+            try:
+                return _execute_sql(tokens[name], query, paginate)
+            finally:
+                slot.release()
+
+        pending, running = deque(targets), {}
+        limit = max(1, min(max_workers, MAX_WORKERS))
+        while pending or running:
+            while pending and len(running) < limit:
+                name = pending.popleft()
+                running[_fanout_executor.submit(run, name)] = name
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                    stats[name] = {"rows": len(results[name]) if isinstance(results[name], list) else 0}
+                except Exception as e:
+                    errors[name] = str(e)
+        # Left running in the shared pool; their results are discarded
+        for future, name in running.items():
+            future.cancel()
+            errors[name] = f"Timed out after {timeout:g}s"
+        for name in pending:
+            errors[name] = f"Timed out after {timeout:g}s"
+
+        rows = []
+        for name in targets:
+            result = results.get(name)
+            if isinstance(result, list):
+                rows.extend({"_base": name, **row} if isinstance(row, dict) else {"_base": name, "value": row} for row in result)
+        if drop_system_fields:
+            rows = _drop_system_fields(rows)
+        with _phase("serialize"):
+            return _encode_rows_with(rows, output_format, {"bases": stats, "errors": errors})
+    except Exception as e:
+        return f"Error querying bases: {str(e)}"
+
+def _columns(api_token: str, table_name: str, view_name: str = None) -> list:
+    return _metadata_cache.get((api_token, "columns", table_name, view_name),
+                               lambda: call_base(api_token, lambda b: b.list_columns(table_name, view_name=view_name), idempotent=True))
+
+@tool()
+def list_columns(table_name: str, view_name: str = None, output_format: str = None, api_token: str = None) -> str:
     """
     List all columns in a table.
     
     Args:
         table_name: The name of the table.
         view_name: Optional view name.
+        output_format: 'repr' (default), 'json', 'columnar' or 'ndjson'.
         api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
     """
     try:
-        b = get_base(api_token)
-        columns = b.list_columns(table_name, view_name=view_name)
-        return str(columns)
+        return _encode(_columns(resolve_token(api_token), table_name, view_name), output_format)
     except Exception as e:
         return f"Error listing columns: {str(e)}"
 
-@mcp.tool()
+@tool()
 def insert_column(table_name: str, column_name: str, column_type: str, data: dict = None, api_token: str = None) -> str:
     """
     Insert a new column into a table.
@@ -232,8 +3078,7 @@ def insert_column(table_name: str, column_name: str, column_type: str, data: dic
         api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
     """
     try:
-        b = get_base(api_token)
-        
+        ColumnTypes = _lazy("ColumnTypes")
         # Map string type to ColumnTypes enum
         type_map = {
             'text': ColumnTypes.TEXT,
@@ -261,12 +3106,13 @@ def insert_column(table_name: str, column_name: str, column_type: str, data: dic
                  return f"Error: Unsupported column type '{column_type}'"
 
         # The seatable-api insert_column does not accept a 'data' argument in this version
-        b.insert_column(table_name, column_name, c_type)
+        call_base(api_token, lambda b: b.insert_column(table_name, column_name, c_type))
+        _schema_changed(resolve_token(api_token), table_name)
         return f"Column '{column_name}' inserted successfully."
     except Exception as e:
         return f"Error inserting column: {str(e)}"
 
-@mcp.tool()
+@tool()
 def delete_column(table_name: str, column_name: str, api_token: str = None) -> str:
     """
     Delete a column from a table.
@@ -277,13 +3123,13 @@ def delete_column(table_name: str, column_name: str, api_token: str = None) -> s
         api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
     """
     try:
-        b = get_base(api_token)
-        b.delete_column(table_name, column_name)
+        call_base(api_token, lambda b: b.delete_column(table_name, column_name))
+        _schema_changed(resolve_token(api_token), table_name)
         return f"Column '{column_name}' deleted successfully."
     except Exception as e:
         return f"Error deleting column: {str(e)}"
 
-@mcp.tool()
+@tool()
 def add_select_options(table_name: str, column_name: str, options: list, api_token: str = None) -> str:
     """
     Add options to a single or multiple select column.
@@ -295,8 +3141,6 @@ def add_select_options(table_name: str, column_name: str, options: list, api_tok
         api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
     """
     try:
-        b = get_base(api_token)
-        
         # Convert simple string options to the dict format required by SeaTable API
         formatted_options = []
         for opt in options:
@@ -309,28 +3153,31 @@ def add_select_options(table_name: str, column_name: str, options: list, api_tok
             else:
                 formatted_options.append(opt)
                 
-        b.add_column_options(table_name, column_name, formatted_options)
+        call_base(api_token, lambda b: b.add_column_options(table_name, column_name, formatted_options))
+        _schema_changed(resolve_token(api_token), table_name)
         return f"Options added to column '{column_name}'."
     except Exception as e:
         return f"Error adding options: {str(e)}"
 
-@mcp.tool()
-def list_views(table_name: str, api_token: str = None) -> str:
+@tool()
+def list_views(table_name: str, output_format: str = None, api_token: str = None) -> str:
     """
     List all views in a table.
     
     Args:
         table_name: The name of the table.
+        output_format: 'repr' (default), 'json', 'columnar' or 'ndjson'.
         api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
     """
     try:
-        b = get_base(api_token)
-        views = b.list_views(table_name)
-        return str(views)
+        api_token = resolve_token(api_token)
+        views = _metadata_cache.get((api_token, "views", table_name),
+                                    lambda: call_base(api_token, lambda b: b.list_views(table_name), idempotent=True))
+        return _encode(views, output_format)
     except Exception as e:
         return f"Error listing views: {str(e)}"
 
-@mcp.tool()
+@tool()
 def create_view(table_name: str, view_name: str, view_type: str = 'table', api_token: str = None) -> str:
     """
     Create a new view in a table.
@@ -342,14 +3189,14 @@ def create_view(table_name: str, view_name: str, view_type: str = 'table', api_t
         api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
     """
     try:
-        b = get_base(api_token)
         # seatable-api v2.x add_view does not support view_type, defaults to 'table'
-        b.add_view(table_name, view_name)
+        call_base(api_token, lambda b: b.add_view(table_name, view_name))
+        _schema_changed(resolve_token(api_token), table_name)
         return f"View '{view_name}' created successfully."
     except Exception as e:
         return f"Error creating view: {str(e)}"
 
-@mcp.tool()
+@tool()
 def delete_view(table_name: str, view_name: str, api_token: str = None) -> str:
     """
     Delete a view from a table.
@@ -360,13 +3207,13 @@ def delete_view(table_name: str, view_name: str, api_token: str = None) -> str:
         api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
     """
     try:
-        b = get_base(api_token)
-        b.delete_view(table_name, view_name)
+        call_base(api_token, lambda b: b.delete_view(table_name, view_name))
+        _schema_changed(resolve_token(api_token), table_name)
         return f"View '{view_name}' deleted successfully."
     except Exception as e:
         return f"Error deleting view: {str(e)}"
 
-@mcp.tool()
+@tool()
 def create_table(table_name: str, api_token: str = None) -> str:
     """
     Create a new table.
@@ -376,13 +3223,13 @@ def create_table(table_name: str, api_token: str = None) -> str:
         api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
     """
     try:
-        b = get_base(api_token)
-        b.add_table(table_name)
+        call_base(api_token, lambda b: b.add_table(table_name))
+        _schema_changed(resolve_token(api_token))
         return f"Table '{table_name}' created successfully."
     except Exception as e:
         return f"Error creating table: {str(e)}"
 
-@mcp.tool()
+@tool()
 def rename_table(table_name: str, new_table_name: str, api_token: str = None) -> str:
     """
     Rename a table.
@@ -393,13 +3240,13 @@ def rename_table(table_name: str, new_table_name: str, api_token: str = None) ->
         api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
     """
     try:
-        b = get_base(api_token)
-        b.rename_table(table_name, new_table_name)
+        call_base(api_token, lambda b: b.rename_table(table_name, new_table_name))
+        _schema_changed(resolve_token(api_token))
         return f"Table '{table_name}' renamed to '{new_table_name}'."
     except Exception as e:
         return f"Error renaming table: {str(e)}"
 
-@mcp.tool()
+@tool()
 def delete_table(table_name: str, api_token: str = None) -> str:
     """
     Delete a table.
@@ -409,28 +3256,434 @@ def delete_table(table_name: str, api_token: str = None) -> str:
         api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
     """
     try:
-        b = get_base(api_token)
-        b.delete_table(table_name)
+        call_base(api_token, lambda b: b.delete_table(table_name))
+        _schema_changed(resolve_token(api_token))
         return f"Table '{table_name}' deleted successfully."
     except Exception as e:
         return f"Error deleting table: {str(e)}"
 
-@mcp.tool()
+# Bytes read from or written to disk per step when moving attachments
+FILE_CHUNK_SIZE = int(os.environ.get("SEATABLE_FILE_CHUNK_SIZE", str(1024 * 1024)))
+# Seconds to wait for the file server between chunks
+FILE_TIMEOUT = float(os.environ.get("SEATABLE_FILE_TIMEOUT", "300"))
+
+class _MultipartFile:
+    """
+    multipart/form-data body that streams one file from disk. It has a known
+    length, so requests sends it with a Content-Length instead of building
+    the whole body in memory.
+    """
+
+    def __init__(self, fields: dict, name: str, path: str):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        head = b"".join(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'.encode()
+            for key, value in fields.items())
+        filename = name.replace('"', "%22")
+        head += (f'--{self.boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                 f'Content-Type: application/octet-stream\r\n\r\n').encode()
+        tail = f"\r\n--{self.boundary}--\r\n".encode()
+        self._parts = [head, None, tail]
+        self._length = len(head) + os.path.getsize(path) + len(tail)
+        self._path = path
+        self._file = None
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = FILE_CHUNK_SIZE
+        while self._parts:
+            part = self._parts[0]
+            if part is None:
+                if self._file is None:
+                    self._file = open(self._path, "rb")
+                chunk = self._file.read(min(size, FILE_CHUNK_SIZE))
+                if chunk:
+                    return chunk
+                self._file.close()
+                self._parts.pop(0)
+                continue
+            if part:
+                self._parts[0] = part[size:]
+                return part[:size]
+            self._parts.pop(0)
+        return b""
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+def _upload_one(api_token: str, path: str, file_type: str, replace: bool) -> dict:
+    """
+    Stream one local file to the base's asset storage and return its cell
+    entry: {"name", "size", "type", "url"}.
+    """
+    name = os.path.basename(path)
+    link = call_base(api_token, lambda b: b.get_file_upload_link(), idempotent=True)
+    relative_path = link["img_relative_path"] if file_type == "image" else link["file_relative_path"]
+    body = _MultipartFile({"parent_dir": link["parent_path"], "relative_path": relative_path,
+                           "replace": 1 if replace else 0}, name, path)
+    try:
+        response = _http_session().post(link["upload_link"] + "?ret-json=1", data=body,
+                                 headers={"Content-Type": body.content_type}, timeout=FILE_TIMEOUT)
+    finally:
+        body.close()
+    if response.status_code != 200:
+        raise _HTTPStatusError(response)
+    uploaded = response.json()[0]
+    b = get_base(api_token)
+    url = "%s/workspace/%s/asset/%s/%s/%s" % (
+        b.server_url.strip("/"), b.workspace_id, str(uuid.UUID(b.dtable_uuid)),
+        quote(relative_path.strip("/")), quote(uploaded.get("name", name)))
+    return {"name": uploaded.get("name", name), "size": uploaded.get("size"), "type": file_type, "url": url}
+
+@tool()
+def upload_file(paths: list, table_name: str = None, row_id: str = None, column_name: str = None, file_type: str = "file", replace: bool = False, max_workers: int = 4, api_token: str = None) -> str:
+    """
+    Upload local files to the base, streamed from disk in chunks, and optionally
+    attach them to a file or image cell of a row.
+    
+    Args:
+        paths: Local file path, or a list of paths uploaded concurrently.
+        table_name: Table of the row to attach the files to.
+        row_id: ID of the row to attach the files to.
+        column_name: File or image column receiving the files; they are appended to the existing attachments.
+        file_type: 'file' (default) or 'image'.
+        replace: If True, overwrite assets with the same name instead of renaming the upload.
+        max_workers: Number of files uploaded in parallel (default 4, at most SEATABLE_PER_BASE_CONCURRENCY).
+        api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
+    """
+    try:
+        api_token = resolve_token(api_token)
+        if file_type not in ("file", "image"):
+            raise ValueError("file_type must be 'file' or 'image'.")
+        if isinstance(paths, str):
+            paths = [paths]
+        attach = table_name and row_id and column_name
+        if any((table_name, row_id, column_name)) and not attach:
+            raise ValueError("table_name, row_id and column_name are all needed to attach files to a row.")
+        missing = [path for path in paths if not os.path.isfile(path)]
+        if missing:
+            raise ValueError(f"Not a file: {', '.join(missing)}")
+
+        def upload(path: str) -> dict:
+            with _base_thread_slot(api_token):
+                return _upload_one(api_token, path, file_type=file_type, replace=replace)
+
+        files, errors = [], {}
+        with ThreadPoolExecutor(max_workers=min(_clamp_workers(max_workers), len(paths))) as pool:
+            futures = [(path, pool.submit(upload, path)) for path in paths]
+            for path, future in futures:
+                try:
+                    files.append(future.result())
+                except Exception as e:
+                    errors[path] = str(e)
+
+        if attach and files:
+            _write_buffer.flush(api_token, table_name)
+            row = call_base(api_token, lambda b: b.get_row(table_name, row_id), idempotent=True) or {}
+            cell = list(row.get(column_name) or [])
+            cell += [f["url"] for f in files] if file_type == "image" else files
+            call_base(api_token, lambda b: b.update_row(table_name, row_id, {column_name: cell}), idempotent=True)
+            _after_row_write(api_token, table_name, rows=[{"_id": row_id, column_name: cell}])
+        return json.dumps({"files": files, "errors": errors, "attached_to": row_id if attach and files else None})
+    except Exception as e:
+        return f"Error uploading files: {str(e)}"
+
+@tool()
+def download_file(url: str, save_path: str, api_token: str = None) -> str:
+    """
+    Download an attachment of the base to a local path, streamed to disk in chunks.
+    
+    Args:
+        url: The asset URL as stored in a file or image cell.
+        save_path: Local file path, or an existing directory to save the file under its own name.
+        api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
+    """
+    try:
+        api_token = resolve_token(api_token)
+        dtable_uuid = str(uuid.UUID(get_base(api_token).dtable_uuid))
+        if dtable_uuid not in url:
+            raise ValueError("The URL does not point to an asset of this base.")
+        asset_path = unquote(url.split(dtable_uuid)[-1].strip("/"))
+        link = call_base(api_token, lambda b: b.get_file_download_link(asset_path), idempotent=True)
+        if os.path.isdir(save_path):
+            save_path = os.path.join(save_path, os.path.basename(asset_path))
+
+        partial_path = save_path + ".part"
+        written = 0
+        try:
+            with _http_session().get(link, stream=True, timeout=FILE_TIMEOUT) as response:
+                if response.status_code != 200:
+                    raise _HTTPStatusError(response)
+                with open(partial_path, "wb") as f:
+                    for chunk in response.iter_content(FILE_CHUNK_SIZE):
+                        f.write(chunk)
+                        written += len(chunk)
+            # Only a complete download replaces the target
+            os.replace(partial_path, save_path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        return json.dumps({"path": save_path, "bytes": written})
+    except Exception as e:
+        return f"Error downloading file: {str(e)}"
+
+@tool()
 def get_server_info() -> str:
     """
     Get information about the SeaTable server.
     """
     try:
-        b = get_base()
+        api_token = resolve_token()
         # There isn't a direct 'get_server_info' in standard base operations usually, 
         # but get_metadata returns base info. We can alias or wrap it.
         # Or we can check if there's a specific call. for now using get_metadata basics.
-        return str(b.get_metadata())
+        return str(_metadata_cache.get((api_token, "metadata"), lambda: call_base(api_token, lambda b: b.get_metadata(), idempotent=True)))
     except Exception as e:
         return f"Error getting server info: {str(e)}"
 
-def main():
-    mcp.run()
+@tool()
+def enable_snapshot(table_name: str, api_token: str = None) -> str:
+    """
+    Keep a local read replica of a table. The snapshot is seeded with a full
+    paginated pull and afterwards refreshed incrementally (rows whose _mtime is
+    newer than the last sync, plus a scan of the row ids to drop deleted rows)
+    whenever it is older than SEATABLE_SNAPSHOT_MAX_STALENESS seconds. list_rows without a view and query_snapshot are then served locally.
+    
+    Args:
+        table_name: The name of the table.
+        api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
+    """
+    try:
+        api_token = resolve_token(api_token)
+        _write_buffer.flush(api_token, table_name)
+        key = (api_token, table_name)
+        with _snapshots_lock:
+            snapshot = _snapshots.get(key)
+            created = snapshot is None
+            if created:
+                snapshot = _snapshots[key] = _TableSnapshot(api_token, table_name)
+        try:
+            snapshot.fresh_rows()
+        except Exception:
+            if created:
+                with _snapshots_lock:
+                    _snapshots.pop(key, None)
+            raise
+        return json.dumps({"table_name": table_name, "rows": len(snapshot.rows), "watermark": snapshot.watermark})
+    except Exception as e:
+        return f"Error enabling snapshot: {str(e)}"
+
+@tool()
+def disable_snapshot(table_name: str, api_token: str = None) -> str:
+    """
+    Drop the local snapshot of a table.
+    
+    Args:
+        table_name: The name of the table.
+        api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
+    """
+    try:
+        with _snapshots_lock:
+            removed = _snapshots.pop((resolve_token(api_token), table_name), None)
+        if removed is None:
+            return f"No snapshot for table '{table_name}'."
+        return f"Snapshot of table '{table_name}' disabled."
+    except Exception as e:
+        return f"Error disabling snapshot: {str(e)}"
+
+@tool()
+def sync_snapshot(table_name: str, full: bool = False, api_token: str = None) -> str:
+    """
+    Refresh the local snapshot of a table now.
+    
+    Args:
+        table_name: The name of the table.
+        full: If True, re-pull the whole table instead of only the rows modified since the last sync.
+        api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
+    """
+    try:
+        _write_buffer.flush(resolve_token(api_token), table_name)
+        snapshot = _get_snapshot(resolve_token(api_token), table_name)
+        if snapshot is None:
+            return f"Error syncing snapshot: no snapshot for table '{table_name}'. Use enable_snapshot first."
+        snapshot.sync(full=full)
+        return json.dumps({"table_name": table_name, "rows": len(snapshot.rows), "watermark": snapshot.watermark})
+    except Exception as e:
+        return f"Error syncing snapshot: {str(e)}"
+
+@tool()
+def query_snapshot(table_name: str, row_id: str = None, filters: dict = None, columns: list = None, limit: int = 100, output_format: str = None, drop_system_fields: bool = False, api_token: str = None) -> str:
+    """
+    Read rows from the local snapshot of a table.
+    
+    Args:
+        table_name: The name of the table.
+        row_id: Optional row ID to look up.
+        filters: Optional {column: value} equality filters; a list value matches any of its items
+            and {column: {">=": 10}} compares with =, !=, >, >=, < or <=.
+        columns: Optional list of column names to return (the row _id is always kept).
+        limit: Maximum number of rows to return (default 100).
+        output_format: 'repr' (default), 'json', 'columnar' or 'ndjson'.
+        drop_system_fields: If True, omit _ctime, _mtime, _creator and other system fields.
+        api_token: The API token for the base. Use get_api_token(base_name) to retrieve it.
+    """
+    try:
+        _write_buffer.flush(resolve_token(api_token), table_name)
+        snapshot = _get_snapshot(resolve_token(api_token), table_name)
+        if snapshot is None:
+            return f"Error querying snapshot: no snapshot for table '{table_name}'. Use enable_snapshot first."
+        rows = snapshot.fresh_rows()
+        if row_id is not None:
+            candidates = [rows[row_id]] if row_id in rows else []
+        else:
+            candidates = rows.values()
+
+        conditions = _conditions(filters)
+        result = []
+        for row in candidates:
+            if len(result) >= limit:
+                break
+            if _row_matches(row, conditions):
+                result.append(row)
+        return _encode(_project(result, columns), output_format, drop_system_fields)
+    except Exception as e:
+        return f"Error querying snapshot: {str(e)}"
+
+@tool(uses_base=False)
+def fetch_result(handle: str, offset: int = 0, limit: int = 100, output_format: str = None) -> str:
+    """
+    Page through a result that was too large to return at once. Tools answer
+    with {"truncated": true, "handle": ...} instead of rows in that case.
+    Returns {"rows": [...], "offset": ..., "next_offset": ..., "total_rows": ...};
+    next_offset is null after the last row. A page is cut short rather than
+    exceed SEATABLE_RESPONSE_BUDGET.
+    
+    Args:
+        handle: The handle of the truncated result.
+        offset: Index of the first row to return.
+        limit: Maximum number of rows to return (default 100).
+        output_format: 'json' or 'columnar'. Defaults to the format of the original call.
+    """
+    try:
+        try:
+            rows, total, stored_format = _result_store.read(handle, max(0, offset), max(1, limit))
+        except KeyError:
+            return f"Error fetching result: handle '{handle}' is unknown or expired. Run the original query again."
+        output_format = _check_format(output_format or stored_format)
+        if RESPONSE_BUDGET:
+            rows = _page_rows(rows, RESPONSE_BUDGET)
+        end = max(0, offset) + len(rows)
+        page = {"rows": rows}
+        if output_format == "columnar":
+            page = _columnar(rows)
+        return _to_json({**page, "offset": max(0, offset), "next_offset": end if end < total else None, "total_rows": total})
+    except Exception as e:
+        return f"Error fetching result: {str(e)}"
+
+@tool(uses_base=False)
+def get_cache_stats() -> str:
+    """
+    Get hit/miss counters and sizes of the server-side caches.
+    """
+    listeners = _check_base_cache.listeners()
+    return json.dumps({"metadata": _metadata_cache.stats(), "sql": _sql_cache.stats(), "row_index": _row_index.stats(),
+                       "results": _result_store.stats(),
+                       "write_buffer": _write_buffer.pending(),
+                       "change_listeners": {"bases": len(listeners),
+                                            "connected": sum(1 for l in listeners if l.connected.is_set()),
+                                            "events": sum(l.events for l in listeners)}})
+
+@tool(uses_base=False)
+def get_server_stats(format: str = "json", reset: bool = False) -> str:
+    """
+    Get per-tool call counts, error rates, response bytes and latency histograms,
+    broken down by tool, base and phase (queue, auth, rate_limit, api, retry_wait,
+    serialize, total).
+    
+    Args:
+        format: 'json' (default) or 'prometheus' (text exposition format).
+        reset: If True, clear the counters after reading them.
+    """
+    if format == "prometheus":
+        result = _tool_metrics.prometheus()
+    else:
+        result = json.dumps({"tools": _tool_metrics.snapshot(),
+                             "caches": {"metadata": _metadata_cache.stats(), "sql": _sql_cache.stats()}})
+    if reset:
+        _tool_metrics.clear()
+    return result
+
+def _serve_metrics(port: int):
+    """
+    Serve the Prometheus metrics on http://127.0.0.1:<port>/metrics in a daemon thread.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = _tool_metrics.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer((os.environ.get("SEATABLE_METRICS_HOST", "127.0.0.1"), port), MetricsHandler)
+    threading.Thread(target=httpd.serve_forever, name="seatable-metrics", daemon=True).start()
+    return httpd
+
+# Tools that hand out the configured API tokens; never served over HTTP
+TOKEN_TOOLS = ("get_all_bases", "get_api_token")
+
+# Tools that read or write local paths of the server process; never served over HTTP
+FILE_TOOLS = ("import_file", "export_table", "upload_file", "download_file")
+
+_LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+def main(argv: list = None):
+    global ENV_TOKEN_FALLBACK
+    parser = argparse.ArgumentParser(description="SeaTable MCP server")
+    parser.add_argument("--transport", choices=("stdio", "sse", "streamable-http"),
+                        default=os.environ.get("SEATABLE_MCP_TRANSPORT", "stdio"),
+                        help="stdio serves one client; sse and streamable-http serve many from one process")
+    parser.add_argument("--host", default=os.environ.get("SEATABLE_MCP_HOST", "127.0.0.1"), help="HTTP bind address")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("SEATABLE_MCP_PORT", "8000")), help="HTTP port")
+    parser.add_argument("--allow-remote", action="store_true",
+                        default=os.environ.get("SEATABLE_MCP_ALLOW_REMOTE", "").lower() in ("1", "true", "yes"),
+                        help="allow binding HTTP to a non-loopback address; the server has no authentication")
+    args = parser.parse_args(argv)
+    remote = args.transport != "stdio" and args.host not in _LOOPBACK_HOSTS
+    if remote and not args.allow_remote:
+        parser.error(f"refusing to serve {args.host} without authentication; pass --allow-remote "
+                     "(or set SEATABLE_MCP_ALLOW_REMOTE) to accept clients from other hosts")
+
+    metrics_port = int(os.environ.get("SEATABLE_METRICS_PORT", "0"))
+    if metrics_port:
+        _serve_metrics(metrics_port)
+    if args.transport != "stdio":
+        mcp.settings.host = args.host
+        mcp.settings.port = args.port
+        # Every client of the port could otherwise read the configured tokens
+        # and any file the process can reach, or overwrite it
+        mcp.withheld.update(TOKEN_TOOLS + FILE_TOOLS)
+        if remote:
+            # The DNS rebinding protection FastMCP sets up only admits localhost Host headers
+            mcp.settings.transport_security = None
+            # Remote clients must present a token: no acting with the server's own credentials
+            ENV_TOKEN_FALLBACK = False
+            mcp.withheld.add("query_all_bases")
+    mcp.run(args.transport)
 
 if __name__ == "__main__":
     main()
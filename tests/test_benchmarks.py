@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import tempfile
+import subprocess
+import time
+import asyncio
+import unittest
+from unittest.mock import call, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+import bench_tools
+import bench_startup
+from mock_seatable import MockSeaTable
+import seatable_mcp.server as server
+from mcp.server.fastmcp.exceptions import ToolError
+
+class TestBenchmarks(unittest.TestCase):
+
+    def setUp(self):
+        server._check_base_cache.clear()
+        server._metadata_cache.clear()
+        server._sql_cache.clear()
+        server._snapshots.clear()
+        server._row_index.clear()
+
+    @patch.dict('os.environ', {})
+    def test_run_benchmarks(self):
+        results = bench_tools.run_benchmarks(rows=50, iterations=3, limit=10, stdio=False, http=False)
+        self.assertEqual([r['scenario'] for r in results][:3], ['list_rows', 'list_rows_json', 'add_row'])
+        for r in results:
+            self.assertEqual(r['calls'], 3)
+            self.assertGreaterEqual(r['p99_ms'], r['p50_ms'])
+        self.assertIn('p95_ms', bench_tools.format_table(results))
+
+    def test_tools_against_mock_server(self):
+        with MockSeaTable(rows=30) as mock:
+            with patch.dict('os.environ', {'SEATABLE_SERVER_URL': mock.url, 'SEATABLE_API_TOKEN': 'mock_token'}):
+                self.assertIn("Row 29", server.list_rows("Table1"))
+                self.assertIn("Row added successfully", server.add_row("Table1", {'Name': 'New'}))
+                self.assertIn("'Name': 'New'", server.run_sql("SELECT Name FROM Table1 WHERE Name = 'New'"))
+                self.assertIn("'name': 'Table1'", server.get_base_info())
+                self.assertIn("Default View", server.list_views("Table1"))
+                self.assertIn("Amount", server.list_columns("Table1"))
+
+    def test_file_round_trip(self):
+        content = os.urandom(300 * 1024)
+        with MockSeaTable(rows=1) as mock, tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for name in ("a.bin", "b.bin"):
+                paths.append(os.path.join(tmp, name))
+                with open(paths[-1], 'wb') as f:
+                    f.write(content)
+            with patch.dict('os.environ', {'SEATABLE_SERVER_URL': mock.url, 'SEATABLE_API_TOKEN': 'mock_token'}), \
+                    patch.object(server, 'FILE_CHUNK_SIZE', 64 * 1024):
+                result = json.loads(server.upload_file(paths))
+                self.assertEqual(result['errors'], {})
+                self.assertEqual(sorted(f['name'] for f in result['files']), ["a.bin", "b.bin"])
+                self.assertEqual(mock.assets["files/2024-01/a.bin"], content)
+                # Streamed with a known length, not chunked transfer encoding
+                self.assertNotIn('Transfer-Encoding', mock.upload_headers)
+
+                os.mkdir(os.path.join(tmp, "out"))
+                result = json.loads(server.download_file(result['files'][0]['url'], os.path.join(tmp, "out")))
+                self.assertEqual(result['bytes'], len(content))
+                with open(result['path'], 'rb') as f:
+                    self.assertEqual(f.read(), content)
+                self.assertEqual(os.listdir(os.path.join(tmp, "out")), [os.path.basename(result['path'])])
+
+    def test_startup(self):
+        result = bench_startup.time_startup()
+        self.assertLessEqual(result['initialize'], result['tools_list'])
+        self.assertGreater(result['tools'], 30)
+
+        # seatable_api is only imported by the first tool call that needs it
+        code = "import sys, seatable_mcp.server; print('seatable_api' in sys.modules, 'requests' in sys.modules)"
+        output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True).stdout
+        self.assertEqual(output.decode().split(), ['False', 'False'])
+
+    def test_http_transport(self):
+        with MockSeaTable(rows=20) as mock:
+            result = bench_tools.bench_http(mock.url, iterations=6, limit=5, clients=3)
+            self.assertEqual(result['calls'], 6)
+            # One process serves every client: one auth handshake, connections reused
+            self.assertEqual(mock.auth_count, 1)
+            self.assertLess(mock.connection_count, mock.request_count)
+
+        with patch.object(server.mcp, 'run') as run, \
+                patch.object(server.mcp, 'settings', server.mcp.settings.model_copy()), \
+                patch.object(server.mcp, 'withheld', set()), \
+                patch.object(server, 'ENV_TOKEN_FALLBACK', True), \
+                patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token'}):
+            # A loopback server hides the tools that return tokens
+            server.main(["--transport", "streamable-http"])
+            tools = [t.name for t in asyncio.run(server.mcp.list_tools())]
+            self.assertNotIn("get_all_bases", tools)
+            self.assertIn("query_all_bases", tools)
+            with self.assertRaises(ToolError):
+                asyncio.run(server.mcp.call_tool("get_api_token", {"base_name": "x"}))
+            self.assertEqual(server.resolve_token(), 'fake_token')
+
+            # Other hosts need an explicit opt-in, and then every call brings its own token
+            with self.assertRaises(SystemExit), patch('sys.stderr'):
+                server.main(["--transport", "sse", "--host", "0.0.0.0", "--port", "9001"])
+            server.main(["--transport", "sse", "--host", "0.0.0.0", "--port", "9001", "--allow-remote"])
+            self.assertEqual((server.mcp.settings.host, server.mcp.settings.port), ("0.0.0.0", 9001))
+            self.assertIsNone(server.mcp.settings.transport_security)
+            self.assertIn("query_all_bases", server.mcp.withheld)
+            self.assertIn("No API token provided", server.list_rows("Table1"))
+        self.assertEqual(run.call_args_list, [call("streamable-http"), call("sse")])
+
+    def test_http_withholds_file_tools(self):
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch.object(server.mcp, 'run'), \
+                patch.object(server.mcp, 'settings', server.mcp.settings.model_copy()), \
+                patch.object(server.mcp, 'withheld', set()), \
+                patch.object(server, 'ENV_TOKEN_FALLBACK', True):
+            secret, target = os.path.join(tmp, 'id_rsa'), os.path.join(tmp, 'authorized_keys')
+            with open(secret, 'w') as f:
+                f.write('secret')
+            server.main(["--transport", "streamable-http"])
+            tools = [t.name for t in asyncio.run(server.mcp.list_tools())]
+            for name, arguments in (("upload_file", {"paths": [secret], "api_token": "t"}),
+                                    ("import_file", {"table_name": "Table1", "path": secret, "api_token": "t"}),
+                                    ("export_table", {"table_name": "Table1", "path": target, "api_token": "t"}),
+                                    ("download_file", {"url": "https://fake.url/a", "save_path": target, "api_token": "t"})):
+                self.assertNotIn(name, tools)
+                with self.assertRaises(ToolError):
+                    asyncio.run(server.mcp.call_tool(name, arguments))
+            self.assertFalse(os.path.exists(target))
+
+    def test_change_listener(self):
+        def wait_for(condition):
+            deadline = time.time() + 10
+            while not condition() and time.time() < deadline:
+                time.sleep(0.02)
+            self.assertTrue(condition())
+
+        with MockSeaTable(rows=5, socket=True) as mock, \
+                patch.object(server._check_base_cache, 'listener_factory', server._ChangeListener), \
+                patch.dict('os.environ', {'SEATABLE_SERVER_URL': mock.url, 'SEATABLE_API_TOKEN': 'mock_token'}):
+            try:
+                server.enable_snapshot("Table1")
+                listener = server._check_base_cache.listener('mock_token')
+                wait_for(listener.connected.is_set)
+                server.query_snapshot("Table1")
+                self.assertIn("Row 1", server.run_sql("SELECT Name FROM Table1"))
+
+                # A change made by another client reaches the snapshot and the SQL cache without polling
+                mock.emit_change({"op_type": "modify_row", "table_id": "t000", "row_id": "row0000001",
+                                  "updated": {"Name": "Edited elsewhere"}})
+                wait_for(lambda: listener.events >= 1)
+                requests_before = mock.request_count
+                with patch.object(server, 'SNAPSHOT_MAX_STALENESS', -1):
+                    rows = json.loads(server.query_snapshot("Table1", row_id="row0000001", output_format="json"))
+                self.assertEqual(rows[0]['Name'], "Edited elsewhere")
+                self.assertEqual(mock.request_count, requests_before)
+                # The cached query result was dropped, so this goes to the server again
+                server.run_sql("SELECT Name FROM Table1")
+                self.assertEqual(mock.request_count, requests_before + 1)
+
+                mock.emit_change({"op_type": "delete_rows", "table_id": "t000", "row_ids": ["row0000002"]})
+                wait_for(lambda: listener.events >= 2)
+                self.assertNotIn("row0000002", server.query_snapshot("Table1"))
+                self.assertEqual(json.loads(server.get_cache_stats())['change_listeners']['connected'], 1)
+            finally:
+                server._check_base_cache.clear()
+            wait_for(lambda: not listener._thread.is_alive())
+
+    def test_percentile(self):
+        samples = [i / 100 for i in range(1, 101)]
+        self.assertEqual(bench_tools.percentile(samples, 50), 0.5)
+        self.assertEqual(bench_tools.percentile(samples, 99), 0.99)
+
+if __name__ == '__main__':
+    unittest.main()
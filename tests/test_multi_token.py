@@ -1,13 +1,19 @@
 import unittest
 from unittest.mock import MagicMock, patch, mock_open
 import seatable_mcp.server as server
+import os
 import json
+import tempfile
+import time
+import threading
+from datetime import datetime, timedelta
 
 class TestSeaTableMultiToken(unittest.TestCase):
     
     def setUp(self):
         # Reset cache
-        server._check_base_cache = {}
+        server._check_base_cache.clear()
+        server._sql_cache.clear()
 
     @patch('seatable_mcp.server.Base')
     @patch.dict('os.environ', {'SEATABLE_SERVER_URL': 'https://fake.url'})
@@ -44,5 +50,199 @@ class TestSeaTableMultiToken(unittest.TestCase):
             with self.assertRaises(ValueError):
                 server.get_base()
 
+    def test_config_reloaded_only_on_change(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'config.json')
+            with open(path, 'w') as f:
+                json.dump([{"base_name": "BaseA", "api_token": "token_a"}], f)
+
+            with patch.dict('os.environ', {'SEATABLE_CONFIG_PATH': path}):
+                self.assertEqual(server.get_token_for_base("BaseA"), "token_a")
+                with patch('builtins.open', side_effect=AssertionError("config re-read")):
+                    self.assertEqual(server.get_token_for_base("BaseA"), "token_a")
+                    self.assertEqual(len(server.load_config()), 1)
+
+                # A replaced file is picked up
+                with open(path + '.tmp', 'w') as f:
+                    json.dump([{"base_name": "BaseB", "api_token": "token_b"}], f)
+                os.replace(path + '.tmp', path)
+                self.assertEqual(server.get_token_for_base("BaseB"), "token_b")
+                self.assertIsNone(server.get_token_for_base("BaseA"))
+
+                # A half-written file keeps the last good mapping
+                with open(path, 'w') as f:
+                    f.write('[{"base_name": "Base')
+                self.assertEqual(server.get_token_for_base("BaseB"), "token_b")
+
+                with self.assertRaisesRegex(ValueError, "Available bases: BaseB"):
+                    server.get_api_token("Missing")
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_base_pool_single_flight_auth(self, MockBase):
+        barrier = threading.Barrier(5)
+
+        def get():
+            barrier.wait()
+            server.get_base(api_token="token_a")
+
+        threads = [threading.Thread(target=get) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(MockBase.call_count, 1)
+        MockBase.return_value.auth.assert_called_once()
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_base_pool_lru_eviction(self, MockBase):
+        with patch.object(server._check_base_cache, 'maxsize', 2):
+            server.get_base(api_token="token_a")
+            server.get_base(api_token="token_b")
+            server.get_base(api_token="token_a")
+            server.get_base(api_token="token_c")
+            self.assertIn("token_a", server._check_base_cache)
+            self.assertNotIn("token_b", server._check_base_cache)
+            self.assertEqual(len(server._check_base_cache), 2)
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_base_pool_refreshes_expiring_token(self, MockBase):
+        base = MockBase.return_value
+        base.jwt_token = None
+        base.jwt_exp = datetime.now() + timedelta(seconds=10)
+        server.get_base(api_token="token_a")
+        self.assertEqual(base.auth.call_count, 1)
+        # Within the refresh margin the pooled base is re-authenticated before use
+        server.get_base(api_token="token_a")
+        self.assertEqual(base.auth.call_count, 2)
+        base.jwt_exp = datetime.now() + timedelta(days=3)
+        server.get_base(api_token="token_a")
+        self.assertEqual(base.auth.call_count, 2)
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_call_base_reauths_on_401(self, MockBase):
+        base = MockBase.return_value
+        base.list_rows.side_effect = [ConnectionError(401, 'unauthorized'), [{'_id': '1'}]]
+        result = server.list_rows("Table1", api_token="token_a")
+        self.assertIn("'_id': '1'", result)
+        self.assertEqual(base.auth.call_count, 2)
+
+        # Other errors do not trigger re-authentication
+        base.list_rows.side_effect = ConnectionError(400, 'bad request')
+        self.assertIn("Error listing rows", server.list_rows("Table1", api_token="token_a"))
+        self.assertEqual(base.auth.call_count, 2)
+
+    @patch('seatable_mcp.server.time.sleep')
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_call_base_retries_transient_errors(self, MockBase, mock_sleep):
+        base = MockBase.return_value
+        throttled = ConnectionError(429, '{"detail": "Request was throttled. Expected available in 7 seconds."}')
+        base.list_rows.side_effect = [throttled, ConnectionError(503, 'unavailable'), [{'_id': '1'}]]
+
+        self.assertIn("'_id': '1'", server.list_rows("Table1", api_token="token_a"))
+        self.assertEqual(base.list_rows.call_count, 3)
+        # The throttle hint is honoured, the 503 backs off with jitter
+        self.assertEqual(mock_sleep.call_args_list[0][0][0], 7.0)
+        self.assertLessEqual(mock_sleep.call_args_list[1][0][0], server.retry_policy.base_delay * 2)
+
+        # Appends are not idempotent and are not retried by default
+        base.append_row.side_effect = ConnectionError(503, 'unavailable')
+        self.assertIn("Error adding row", server.add_row("Table1", {'Name': 'A'}, api_token="token_a"))
+        self.assertEqual(base.append_row.call_count, 1)
+
+        # Retries stop after max_attempts
+        base.list_rows.side_effect = ConnectionError(502, 'bad gateway')
+        base.list_rows.reset_mock()
+        self.assertIn("Error listing rows", server.list_rows("Table1", api_token="token_a"))
+        self.assertEqual(base.list_rows.call_count, server.retry_policy.max_attempts)
+
+        # The Retry-After header of the response seatable-api saw is honoured
+        response = MagicMock(status_code=429, text='throttled', headers={'Retry-After': '3'})
+        def throttled_list_rows(*args, **kwargs):
+            got = server._PooledRequests().get('https://fake.url/rows')
+            if base.list_rows.call_count == 1:
+                # As seatable_api.utils.parse_response does
+                raise ConnectionError(got.status_code, got.text)
+            return [{'_id': '1'}]
+        base.list_rows.side_effect = throttled_list_rows
+        base.list_rows.reset_mock()
+        mock_sleep.reset_mock()
+        with patch.object(server, '_http_session') as session:
+            session.return_value.get.side_effect = [response, MagicMock(status_code=200)]
+            self.assertIn("'_id': '1'", server.list_rows("Table1", api_token="token_a"))
+        self.assertEqual(mock_sleep.call_args_list[0][0][0], 3.0)
+
+        # Direct upload/download requests keep their response too
+        response.headers = {'Retry-After': 'Wed, 21 Oct 2099 07:28:00 GMT'}
+        self.assertGreater(server._retry_after(server._HTTPStatusError(response)), 3600)
+        self.assertEqual(server._HTTPStatusError(response).args, (429, 'throttled'))
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_query_all_bases(self, MockBase):
+        bases = {token: MagicMock() for token in ("token_a", "token_b", "token_c")}
+        MockBase.side_effect = lambda token, url: bases[token]
+        bases["token_a"].query.return_value = [{'Name': 'A1'}, {'Name': 'A2'}]
+        bases["token_b"].query.side_effect = ConnectionError(400, 'no such table')
+        release = threading.Event()
+        bases["token_c"].query.side_effect = lambda sql: release.wait(5) and [{'Name': 'C1'}]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'config.json')
+            with open(path, 'w') as f:
+                json.dump([{"base_name": name, "api_token": "token_" + name[-1].lower()} for name in ("BaseA", "BaseB", "BaseC")], f)
+            with patch.dict('os.environ', {'SEATABLE_CONFIG_PATH': path}):
+                started = time.monotonic()
+                result = json.loads(server.query_all_bases("SELECT Name FROM Table1", timeout=0.2))
+                release.set()
+                self.assertLess(time.monotonic() - started, 2)
+                self.assertEqual(result['rows'], [{'_base': 'BaseA', 'Name': 'A1'}, {'_base': 'BaseA', 'Name': 'A2'}])
+                self.assertEqual(result['bases'], {'BaseA': {'rows': 2}})
+                self.assertIn('no such table', result['errors']['BaseB'])
+                self.assertIn('Timed out', result['errors']['BaseC'])
+
+                result = json.loads(server.query_all_bases("SELECT Name FROM Table1", base_names=["BaseA", "Missing"]))
+                self.assertEqual(len(result['rows']), 2)
+                self.assertIn('Missing', result['errors'])
+
+                # Writes are not fanned out
+                self.assertIn("Only SELECT", server.query_all_bases("DELETE FROM Table1"))
+                bases["token_a"].query.assert_called_with("SELECT Name FROM Table1")
+
+                # Workers come from one shared pool, so timed-out calls do not add threads
+                release.clear()
+                for _ in range(3):
+                    server.query_all_bases("SELECT Name FROM Table1", base_names=["BaseC"], timeout=0.05)
+                release.set()
+                fanout = [t for t in threading.enumerate() if t.name.startswith("seatable-fanout")]
+                self.assertLessEqual(len(fanout), server.MAX_WORKERS)
+
+                # The merged rows are held to the response budget in every format
+                result = json.loads(server.query_all_bases("SELECT Name FROM Table1", base_names=["BaseA"], output_format="columnar"))
+                self.assertEqual((result['columns'], result['rows'], result['bases']), (['_base', 'Name'], [['BaseA', 'A1'], ['BaseA', 'A2']], {'BaseA': {'rows': 2}}))
+                lines = server.query_all_bases("SELECT Name FROM Table1", base_names=["BaseA"], output_format="ndjson").split("\n")
+                self.assertEqual([json.loads(line) for line in lines][-1], {'bases': {'BaseA': {'rows': 2}}, 'errors': {}})
+                bases["token_a"].query.return_value = [{'Name': 'x' * 100} for _ in range(100)]
+                server._sql_cache.clear()
+                with patch.object(server, 'RESPONSE_BUDGET', 1000):
+                    for output_format in ("json", "columnar", "ndjson"):
+                        encoded = server.query_all_bases("SELECT Name FROM Table1", base_names=["BaseA"], output_format=output_format)
+                        self.assertLess(len(encoded.encode()), 1000)
+                        result = json.loads(encoded)
+                        self.assertTrue(result['truncated'])
+                        self.assertEqual((result['total_rows'], result['bases']), (100, {'BaseA': {'rows': 100}}))
+
+    def test_token_bucket_paces_calls(self):
+        bucket = server._TokenBucket(rate=50, capacity=1)
+        started = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        # One call from the burst, five paced at 50 per second
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,5 +1,13 @@
 import unittest
 from unittest.mock import MagicMock, patch
+import json
+import time
+import asyncio
+import os
+import tempfile
+import threading
+import hashlib
+import importlib.util
 import seatable_mcp.server as server
 from seatable_api.constants import ColumnTypes
 
@@ -7,7 +15,15 @@ class TestSeaTableMCP(unittest.TestCase):
     
     def setUp(self):
         # Reset the global base variable before each test
-        server._check_base_cache = {}
+        server._check_base_cache.clear()
+        server._prefetched_pages.clear()
+        server._metadata_cache.clear()
+        server._snapshots.clear()
+        server._sql_cache.clear()
+        server._row_index.clear()
+        server._result_store.clear()
+        server._tool_metrics.clear()
+        server._write_buffer.clear()
 
     @patch('seatable_mcp.server.Base')
     @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
@@ -119,5 +135,809 @@ class TestSeaTableMCP(unittest.TestCase):
         server.delete_table("RenamedTable")
         mock_instance.delete_table.assert_called_with("RenamedTable")
 
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_batch_row_operations(self, MockBase):
+        mock_instance = MockBase.return_value
+        rows = [{'Name': f'Row {i}'} for i in range(2500)]
+
+        result = json.loads(server.batch_add_rows("Table1", rows))
+        self.assertEqual(mock_instance.batch_append_rows.call_count, 3)
+        self.assertEqual([c['rows'] for c in result['chunks']], [1000, 1000, 500])
+        self.assertEqual(result['success'], 2500)
+
+        # A failing chunk is reported without aborting the others
+        mock_instance.batch_delete_rows.side_effect = [None, Exception("boom"), None]
+        result = json.loads(server.batch_delete_rows("Table1", [str(i) for i in range(5)], chunk_size=2, max_workers=3))
+        self.assertEqual(result['success'], 3)
+        self.assertEqual(result['failed'], 2)
+
+        # PER_BASE_CONCURRENCY bounds the chunks in flight on a base, across concurrent calls
+        lock, active, peak = threading.Lock(), [0], [0]
+        def slow_append(table, chunk):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+        mock_instance.batch_append_rows.side_effect = slow_append
+        with patch.object(server, 'PER_BASE_CONCURRENCY', 2), patch.dict(server._base_thread_slots, clear=True):
+            results = []
+            callers = [threading.Thread(target=lambda: results.append(json.loads(
+                server.batch_add_rows("Table1", rows[:20], chunk_size=1, max_workers=200)))) for _ in range(3)]
+            for caller in callers:
+                caller.start()
+            for caller in callers:
+                caller.join()
+        self.assertEqual([r['success'] for r in results], [20, 20, 20])
+        self.assertLessEqual(peak[0], 2)
+
+        updates = [{'row_id': '1', 'row': {'Name': 'A'}}]
+        result = json.loads(server.batch_update_rows("Table1", updates))
+        mock_instance.batch_update_rows.assert_called_with("Table1", updates)
+        self.assertEqual(result['total'], 1)
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_upsert_rows(self, MockBase):
+        mock_instance = MockBase.return_value
+        mock_instance.query.return_value = [
+            {'_id': 'a', 'Code': 'X1', 'Name': 'Alpha', 'Amount': 1},
+            {'_id': 'b', 'Code': 'X2', 'Name': 'Beta', 'Amount': 2},
+            {'_id': 'c', 'Code': 'X3', 'Name': 'Gamma', 'Amount': 3},
+        ]
+        rows = [
+            {'Code': 'X1', 'Name': 'Alpha', 'Amount': 1.0},
+            {'Code': 'X2', 'Name': 'Beta', 'Amount': 20},
+            {'Code': 'X4', 'Name': 'Delta', 'Amount': 4},
+            {'Name': 'No key'},
+        ]
+
+        result = json.loads(server.upsert_rows("Table1", rows, "Code", delete_missing=True))
+        self.assertEqual((result['inserted'], result['updated'], result['unchanged'], result['deleted'], result['skipped']),
+                         (1, 1, 1, 1, 1))
+        # One index query, then only the minimal writes
+        self.assertEqual(mock_instance.query.call_count, 1)
+        self.assertIn("SELECT `_id`, `Amount`, `Code`, `Name` FROM `Table1`", mock_instance.query.call_args[0][0])
+        mock_instance.batch_append_rows.assert_called_once_with("Table1", [rows[2]])
+        mock_instance.batch_update_rows.assert_called_once_with("Table1", [{'row_id': 'b', 'row': {'Amount': 20}}])
+        mock_instance.batch_delete_rows.assert_called_once_with("Table1", ['c'])
+
+        # Without delete_missing nothing is deleted
+        mock_instance.batch_delete_rows.reset_mock()
+        result = json.loads(server.upsert_rows("Table1", rows[:1], "Code"))
+        self.assertEqual(result['unchanged'], 1)
+        mock_instance.batch_delete_rows.assert_not_called()
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    @patch.object(server, 'WRITE_BUFFER_WINDOW', 60)
+    def test_write_buffer(self, MockBase):
+        mock_instance = MockBase.return_value
+        mock_instance.list_rows.return_value = []
+
+        self.assertIn("queued", server.update_row("Table1", "r1", {'Name': 'A'}))
+        server.update_row("Table1", "r1", {'Age': 3})
+        server.update_row("Table1", "r1", {'Name': 'B'})
+        server.update_row("Table1", "r2", {'Name': 'C'})
+        server.update_row("Table1", "r3", {'Name': 'D'})
+        server.add_row("Table1", {'Name': 'E'})
+        server.delete_row("Table1", "r3")
+        mock_instance.update_row.assert_not_called()
+        mock_instance.batch_update_rows.assert_not_called()
+
+        # Reading the table sends the merged writes first
+        server.list_rows("Table1")
+        mock_instance.batch_update_rows.assert_called_once_with("Table1", [
+            {'row_id': 'r1', 'row': {'Name': 'B', 'Age': 3}},
+            {'row_id': 'r2', 'row': {'Name': 'C'}},
+        ])
+        mock_instance.batch_append_rows.assert_called_once_with("Table1", [{'Name': 'E'}])
+
+        # Unbuffered writes go out immediately
+        server.update_row("Table1", "r1", {'Name': 'F'}, buffered=False)
+        mock_instance.update_row.assert_called_once_with("Table1", "r1", {'Name': 'F'})
+
+        mock_instance.batch_update_rows.side_effect = Exception("boom")
+        server.update_row("Table2", "r9", {'Name': 'G'})
+        self.assertEqual(json.loads(server.get_cache_stats())['write_buffer']['updates'], 1)
+        report = json.loads(server.flush_writes())
+        self.assertEqual(report['failed'], 1)
+        self.assertEqual(report['errors'][0]['table'], "Table2")
+        self.assertEqual(json.loads(server.get_cache_stats())['write_buffer']['updates'], 0)
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    @patch.object(server, 'WRITE_BUFFER_WINDOW', 60)
+    def test_write_buffer_flushes_per_table(self, MockBase):
+        mock_instance = MockBase.return_value
+        mock_instance.list_rows.return_value = []
+        started, release = threading.Event(), threading.Event()
+        mock_instance.batch_update_rows.side_effect = lambda table, updates: (started.set(), release.wait(5))
+
+        server.update_row("Table1", "r1", {'Name': 'A'}, api_token="baseA")
+        flusher = threading.Thread(target=server.flush_writes, args=("baseA",))
+        flusher.start()
+        self.assertTrue(started.wait(5))
+        # A slow flush on one base does not hold up reads of another
+        server.list_rows("Table1", api_token="baseB")
+        # Readers of the table being flushed wait for it
+        reader = threading.Thread(target=server.list_rows, args=("Table1",), kwargs={'api_token': "baseA"})
+        reader.start()
+        reader.join(0.2)
+        self.assertTrue(reader.is_alive())
+        self.assertFalse(release.is_set())
+        release.set()
+        reader.join(5)
+        flusher.join(5)
+        self.assertFalse(reader.is_alive())
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_write_buffer_window(self, MockBase):
+        mock_instance = MockBase.return_value
+        with patch.object(server, 'WRITE_BUFFER_WINDOW', 0.05):
+            server.update_row("Table1", "r1", {'Name': 'A'})
+            server.update_row("Table1", "r1", {'Age': 1})
+        deadline = time.time() + 5
+        while not mock_instance.batch_update_rows.called and time.time() < deadline:
+            time.sleep(0.01)
+        mock_instance.batch_update_rows.assert_called_once_with("Table1", [{'row_id': 'r1', 'row': {'Name': 'A', 'Age': 1}}])
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_list_rows_reduced(self, MockBase):
+        mock_instance = MockBase.return_value
+        mock_instance.query.return_value = [{'Team': 'A', 'SUM(Amount)': 3}]
+
+        # Without a view the reduction is compiled to SQL
+        result = json.loads(server.list_rows("Table1", filters={'Team': ['A', "B'C"], 'Amount': {'>=': 1}, 'Note': None},
+                                             group_by=['Team'], aggregates=['sum(Amount)'], output_format='json'))
+        self.assertEqual(result, [{'Team': 'A', 'SUM(Amount)': 3}])
+        mock_instance.query.assert_called_once_with(
+            "SELECT `Team`, SUM(`Amount`) AS `SUM(Amount)` FROM `Table1` "
+            "WHERE `Team` IN ('A', 'B''C') AND `Amount` >= 1 AND `Note` IS NULL GROUP BY `Team` LIMIT 100 OFFSET 0")
+        mock_instance.list_rows.assert_not_called()
+
+        server.list_rows("Table1", columns=['Name'], filters={'Team': 'A'}, limit=5)
+        mock_instance.query.assert_called_with("SELECT `_id`, `Name` FROM `Table1` WHERE `Team` = 'A' LIMIT 5 OFFSET 0")
+
+        # Views are reduced locally over the fetched pages
+        table = [{'_id': str(i), 'Team': 'AB'[i % 2], 'Amount': i} for i in range(1500)]
+        mock_instance.list_rows.side_effect = lambda name, view_name=None, start=None, limit=None: table[start:start + limit]
+        result = json.loads(server.list_rows("Table1", view_name="Default", filters={'Amount': {'<': 10}},
+                                             group_by=['Team'], aggregates=['COUNT(*)', 'AVG(Amount)', 'MAX(Amount)'],
+                                             output_format='json'))
+        self.assertEqual(result, [{'Team': 'A', 'COUNT(*)': 5, 'AVG(Amount)': 4.0, 'MAX(Amount)': 8},
+                                  {'Team': 'B', 'COUNT(*)': 5, 'AVG(Amount)': 5.0, 'MAX(Amount)': 9}])
+        self.assertEqual(mock_instance.list_rows.call_count, 2)
+
+        result = json.loads(server.list_rows("Table1", view_name="Default", columns=['Amount'],
+                                             filters={'Team': 'B'}, limit=2, output_format='json'))
+        self.assertEqual(result, [{'_id': '1', 'Amount': 1}, {'_id': '3', 'Amount': 3}])
+
+        # A list filter means SQL IN locally too: any listed option of a multiple-select
+        # cell matches, and an empty cell matches nothing
+        table[:] = [{'_id': 'a', 'Tags': ['x', 'y'], 'Team': 'A'}, {'_id': 'b', 'Tags': ['y'], 'Team': None},
+                    {'_id': 'c', 'Tags': None, 'Team': 'B'}]
+        result = json.loads(server.list_rows("Table1", view_name="Default", filters={'Tags': ['x']}, output_format='json'))
+        self.assertEqual([r['_id'] for r in result], ['a'])
+        result = json.loads(server.list_rows("Table1", view_name="Default", filters={'Team': ['B', None]}, output_format='json'))
+        self.assertEqual([r['_id'] for r in result], ['c'])
+        server.list_rows("Table1", filters={'Team': ['B', None]})
+        mock_instance.query.assert_called_with("SELECT * FROM `Table1` WHERE `Team` IN ('B') LIMIT 100 OFFSET 0")
+
+        # != leaves out empty cells on both paths, as SQL does
+        table.append({'_id': 'd', 'Tags': None, 'Team': ''})
+        result = json.loads(server.list_rows("Table1", view_name="Default", filters={'Team': {'!=': 'A'}}, output_format='json'))
+        self.assertEqual([r['_id'] for r in result], ['c'])
+        result = json.loads(server.list_rows("Table1", view_name="Default", filters={'Team': {'>=': 'A'}}, output_format='json'))
+        self.assertEqual([r['_id'] for r in result], ['a', 'c'])
+        server.list_rows("Table1", filters={'Team': {'!=': 'A'}})
+        mock_instance.query.assert_called_with("SELECT * FROM `Table1` WHERE `Team` != 'A' LIMIT 100 OFFSET 0")
+
+        self.assertIn("Unsupported aggregate", server.list_rows("Table1", aggregates=['MEDIAN(Amount)']))
+        self.assertIn("cannot be combined", server.list_rows("Table1", filters={'Team': 'A'}, paginate=True))
+
+    @patch('seatable_mcp.server._http_session')
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_upload_file_attaches_to_row(self, MockBase, mock_session):
+        mock_instance = MockBase.return_value
+        mock_instance.server_url = 'https://fake.url'
+        mock_instance.workspace_id = 7
+        mock_instance.dtable_uuid = '0a1b2c3d4e5f6789abcdef0123456789'
+        mock_instance.get_file_upload_link.return_value = {
+            'upload_link': 'https://fake.url/seafhttp/upload-api/x', 'parent_path': '/asset/x',
+            'img_relative_path': 'images/2024-01', 'file_relative_path': 'files/2024-01'}
+        mock_instance.get_row.return_value = {'_id': 'r1', 'Photos': ['https://fake.url/old.png']}
+        bodies = []
+
+        def post(url, data=None, headers=None, timeout=None):
+            bodies.append((len(data), b"".join(iter(lambda: data.read(4096), b""))))
+            return MagicMock(status_code=200, json=lambda: [{'name': 'pic.png', 'size': 3}])
+        mock_session.return_value.post.side_effect = post
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'pic.png')
+            with open(path, 'wb') as f:
+                f.write(b'PNG')
+            result = json.loads(server.upload_file(path, table_name="Table1", row_id="r1", column_name="Photos", file_type="image"))
+
+        self.assertEqual(result['attached_to'], 'r1')
+        length, body = bodies[0]
+        self.assertEqual(length, len(body))
+        self.assertIn(b'filename="pic.png"', body)
+        self.assertIn(b'\r\n\r\nPNG\r\n', body)
+        url = 'https://fake.url/workspace/7/asset/0a1b2c3d-4e5f-6789-abcd-ef0123456789/images/2024-01/pic.png'
+        mock_instance.update_row.assert_called_once_with("Table1", "r1", {'Photos': ['https://fake.url/old.png', url]})
+
+        self.assertIn("all needed", server.upload_file(path, table_name="Table1"))
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_import_file_resumes(self, MockBase):
+        mock_instance = MockBase.return_value
+        mock_instance.list_columns.return_value = [
+            {'name': 'Name', 'type': 'text'}, {'name': 'Amount', 'type': 'number'}, {'name': 'Done', 'type': 'checkbox'}]
+        sent = []
+        failures = [None, ConnectionError(429, "rate limited")]
+
+        def append(table_name, rows):
+            failure = failures.pop(0) if failures else None
+            if failure:
+                raise failure
+            sent.append(rows)
+        mock_instance.batch_append_rows.side_effect = append
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'data.csv')
+            with open(path, 'w') as f:
+                f.write("Title,Amount,Done,Extra\n")
+                for i in range(25):
+                    f.write(f'Row {i},"1,00{i % 10}",{"yes" if i % 2 else "no"},x\n')
+
+            result = json.loads(server.import_file("Table1", path, column_map={'Title': 'Name'}, chunk_size=10, max_workers=1))
+            self.assertEqual((result['rows'], result['chunks'], result['written'], result['failed']), (25, 3, 15, 1))
+            self.assertEqual(result['ignored_fields'], ['Extra'])
+            self.assertEqual(sent[0][1], {'Name': 'Row 1', 'Amount': 1001, 'Done': True})
+
+            # Re-running sends only the failed chunk
+            result = json.loads(server.import_file("Table1", path, column_map={'Title': 'Name'}, chunk_size=10))
+            self.assertEqual((result['written'], result['skipped_chunks'], result['failed']), (10, 2, 0))
+            self.assertEqual([r['Name'] for r in sent[-1]][:2], ['Row 10', 'Row 11'])
+
+            result = json.loads(server.import_file("Table1", path, column_map={'Title': 'Name'}, chunk_size=10))
+            self.assertEqual((result['written'], result['skipped_chunks']), (0, 3))
+            self.assertEqual(mock_instance.batch_append_rows.call_count, 4)
+
+            # A chunk left in flight by a crash is upserted on key_column instead of appended
+            path = os.path.join(tmp, 'data.ndjson')
+            with open(path, 'w') as f:
+                f.write('{"Name": "A", "Amount": 1}\n{"Name": "B", "Amount": 2}\n')
+            st = os.stat(path)
+            with open(path + '.import-journal.json', 'w') as f:
+                json.dump({"table": "Table1", "size": st.st_size, "mtime_ns": st.st_mtime_ns, "chunk_size": 1000,
+                           "column_map": {}, "key_column": "Name", "started": [0], "done": []}, f)
+            mock_instance.query.return_value = [{'_id': 'a', 'Name': 'A', 'Amount': 1}]
+            result = json.loads(server.import_file("Table1", path, key_column="Name"))
+            self.assertEqual(result['written'], 2)
+            mock_instance.batch_append_rows.assert_called_with("Table1", [{'Name': 'B', 'Amount': 2}])
+
+            # Without key_column it is reported rather than appended a second time
+            calls = mock_instance.batch_append_rows.call_count
+            with open(path + '.import-journal.json', 'w') as f:
+                json.dump({"table": "Table1", "size": st.st_size, "mtime_ns": st.st_mtime_ns, "chunk_size": 1000,
+                           "column_map": {}, "key_column": None, "started": [0], "done": []}, f)
+            result = json.loads(server.import_file("Table1", path))
+            self.assertEqual((result['written'], result['interrupted_chunks']), (0, [{'chunk': 0, 'first_row': 0, 'rows': 2}]))
+            self.assertIn("key_column", result['hint'])
+            self.assertEqual(mock_instance.batch_append_rows.call_count, calls)
+
+            # A timed out append may have been applied: it is not retried as a refused chunk
+            os.remove(path + '.import-journal.json')
+            failures[:] = [server._lazy("requests").exceptions.ReadTimeout("read timed out")]
+            with patch.object(server.retry_policy, 'max_attempts', 1):
+                result = json.loads(server.import_file("Table1", path))
+            self.assertEqual(result['failed'], 1)
+            result = json.loads(server.import_file("Table1", path))
+            self.assertEqual((result['written'], result['interrupted_chunks']), (0, [{'chunk': 0, 'first_row': 0, 'rows': 2}]))
+            self.assertEqual(mock_instance.batch_append_rows.call_count, calls + 1)
+
+            # The journal moves to the temporary directory when the source directory is read-only
+            with patch('seatable_mcp.server.os.access', return_value=False):
+                journal_path = server._ImportJournal.path_for(path)
+            self.assertEqual(os.path.dirname(journal_path), tempfile.gettempdir())
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_get_rows_by_ids(self, MockBase):
+        mock_instance = MockBase.return_value
+        mock_instance.list_rows.return_value = [{'_id': 'a', 'Name': 'A'}, {'_id': 'b', 'Name': 'B'}]
+        mock_instance.query.return_value = [{'_id': 'c', 'Name': 'C'}]
+
+        server.list_rows("Table1", limit=2)
+        rows = json.loads(server.get_rows_by_ids("Table1", ['c', 'a', 'x', 'b'], output_format='json'))
+        self.assertEqual([r['_id'] for r in rows], ['c', 'a', 'b'])
+        # Only the ids not seen in list_rows are fetched, in one query
+        mock_instance.query.assert_called_once_with("SELECT * FROM `Table1` WHERE _id IN ('c', 'x') LIMIT 2")
+
+        # Writes through this server update the index in place
+        server.update_row("Table1", 'a', {'Name': 'A2'})
+        server.delete_row("Table1", 'b')
+        mock_instance.append_row.return_value = {'_id': 'd', 'Name': 'D'}
+        server.add_row("Table1", {'Name': 'D'})
+        mock_instance.query.return_value = []
+        rows = json.loads(server.get_rows_by_ids("Table1", ['a', 'b', 'd'], output_format='json'))
+        self.assertEqual(rows, [{'_id': 'a', 'Name': 'A2'}, {'_id': 'd', 'Name': 'D'}])
+        mock_instance.query.assert_called_with("SELECT * FROM `Table1` WHERE _id IN ('b') LIMIT 1")
+        self.assertEqual(mock_instance.query.call_count, 2)
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_resolve_links(self, MockBase):
+        mock_instance = MockBase.return_value
+        link = {'name': 'Customer', 'type': 'link', 'data': {'table_id': 't2', 'other_table_id': 't1', 'link_id': 'l1'}}
+        mock_instance.get_metadata.return_value = {'tables': [
+            {'_id': 't1', 'name': 'Orders', 'columns': [{'name': 'Title', 'type': 'text'}, link]},
+            {'_id': 't2', 'name': 'Customers', 'columns': [{'name': 'Name', 'type': 'text'}]}]}
+        mock_instance.list_rows.return_value = [
+            {'_id': 'o1', 'Title': 'First', 'Customer': [{'row_id': 'c1', 'display_value': 'Ann'}]},
+            {'_id': 'o2', 'Title': 'Second', 'Customer': ['c2', 'c1']}]
+        mock_instance.query.return_value = [{'_id': 'c1', 'Name': 'Ann'}, {'_id': 'c2', 'Name': 'Bob'}]
+
+        rows = json.loads(server.list_rows("Orders", output_format='json', resolve_links=True))
+        self.assertEqual(rows[0]['Customer'], [{'_id': 'c1', 'Name': 'Ann'}])
+        self.assertEqual([c['Name'] for c in rows[1]['Customer']], ['Bob', 'Ann'])
+        mock_instance.query.assert_called_once_with("SELECT * FROM `Customers` WHERE _id IN ('c1', 'c2') LIMIT 2")
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_oversized_result_is_spilled(self, MockBase):
+        mock_instance = MockBase.return_value
+        table = [{'_id': str(i), 'Name': f'Row {i}', 'Notes': 'x' * 40} for i in range(60)]
+        mock_instance.list_rows.side_effect = lambda name, view_name=None, start=None, limit=None: table[:limit]
+
+        with patch.object(server, 'RESPONSE_BUDGET', 1000), patch.object(server._result_store, 'maxsize', 1):
+            self.assertIn("'Row 4'", server.list_rows("Table1", limit=5))
+            result = json.loads(server.list_rows("Table1", limit=60))
+            self.assertTrue(result['truncated'])
+            self.assertEqual((result['total_rows'], result['columns']), (60, ['_id', 'Name', 'Notes']))
+            self.assertEqual(result['rows'], table[:result['next_offset']])
+
+            collected, offset = list(result['rows']), result['next_offset']
+            while offset is not None:
+                page = json.loads(server.fetch_result(result['handle'], offset=offset, limit=50))
+                self.assertLessEqual(len(json.dumps(page['rows'])), 1100)
+                collected.extend(page['rows'])
+                offset = page['next_offset']
+            self.assertEqual(collected, table)
+            page = json.loads(server.fetch_result(result['handle'], limit=2, output_format='columnar'))
+            self.assertEqual(page['rows'][1], ['1', 'Row 1', 'x' * 40])
+
+            # The budget counts UTF-8 bytes, so CJK text spills sooner than its length suggests
+            cjk = [{'_id': str(i), 'Name': '数据' * 10} for i in range(20)]
+            self.assertIsNotNone(server._encode_rows(cjk[:10], 'json', 1000))
+            self.assertIsNone(server._encode_rows(cjk, 'json', 1000))
+            self.assertLess(len(server._to_json(cjk)), 1000)
+            for output_format in ('json', 'columnar', 'ndjson', 'repr'):
+                self.assertEqual(server._encode_rows(table[:3], output_format, 0), server._encode(table[:3], output_format))
+            self.assertEqual(server._encode_rows(table, 'columnar', 0), server._to_json(server._columnar(table)))
+
+            # The least recently used handle is evicted along with its file
+            server.list_rows("Table1", limit=60)
+            self.assertIn("unknown or expired", server.fetch_result(result['handle']))
+            self.assertEqual(json.loads(server.get_cache_stats())['results']['handles'], 1)
+
+            # So is a page of a paginated listing, which keeps its cursor
+            for output_format in ('json', 'columnar'):
+                page = json.loads(server.list_rows("Table1", limit=60, paginate=True, output_format=output_format))
+                self.assertTrue(page['truncated'])
+                self.assertEqual(page['total_rows'], 60)
+                self.assertEqual(server._decode_cursor(page['next_cursor'])['s'], 60)
+            page = json.loads(server.list_rows("Table1", limit=5, paginate=True, output_format='columnar'))
+            self.assertEqual((len(page['rows']), page['columns']), (5, ['_id', 'Name', 'Notes']))
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_export_table(self, MockBase):
+        mock_instance = MockBase.return_value
+        mock_instance.list_columns.return_value = [
+            {'name': 'Name', 'type': 'text'}, {'name': 'Amount', 'type': 'number'}, {'name': 'Tags', 'type': 'multiple-select'}]
+        table = [{'_id': str(i), 'Name': f'Row {i}', 'Amount': i, 'Tags': ['a', 'b'], '_mtime': 't'} for i in range(2500)]
+        mock_instance.list_rows.side_effect = lambda name, view_name=None, start=None, limit=None: table[start:start + limit]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'out.csv')
+            result = json.loads(server.export_table("Table1", path))
+            self.assertEqual((result['rows'], result['format']), (2500, 'csv'))
+            with open(path, 'rb') as f:
+                data = f.read()
+            self.assertEqual(result['sha256'], hashlib.sha256(data).hexdigest())
+            lines = data.decode().splitlines()
+            self.assertEqual(lines[0], '_id,Name,Amount,Tags,_ctime,_mtime')
+            self.assertEqual(lines[1], '0,Row 0,0,"[""a"",""b""]",,t')
+            self.assertEqual(mock_instance.list_rows.call_count, 3)
+            self.assertEqual(sorted(os.listdir(tmp)), ['out.csv'])
+
+            path = os.path.join(tmp, 'out.jsonl')
+            result = json.loads(server.export_table("Table1", path, columns=['Name'], drop_system_fields=True))
+            with open(path) as f:
+                self.assertEqual(json.loads(f.readline()), {'_id': '0', 'Name': 'Row 0'})
+            self.assertEqual(result['format'], 'ndjson')
+
+            self.assertIn("format must be", server.export_table("Table1", os.path.join(tmp, 'out.xlsx')))
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), "pyarrow not installed")
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_export_table_parquet(self, MockBase):
+        import pyarrow.parquet as pq
+        mock_instance = MockBase.return_value
+        mock_instance.list_columns.return_value = [
+            {'name': 'Name', 'type': 'text'}, {'name': 'Amount', 'type': 'number'}, {'name': 'Done', 'type': 'checkbox'}]
+        mock_instance.list_rows.return_value = [
+            {'_id': 'a', 'Name': 'A', 'Amount': 1, 'Done': True}, {'_id': 'b', 'Name': 'B', 'Amount': '', 'Done': False}]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'out.parquet')
+            result = json.loads(server.export_table("Table1", path, drop_system_fields=True))
+            self.assertEqual(result['rows'], 2)
+            table = pq.read_table(path)
+            self.assertEqual(table.column_names, ['_id', 'Name', 'Amount', 'Done'])
+            self.assertEqual(table.column('Amount').to_pylist(), [1.0, None])
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_list_rows_paginated(self, MockBase):
+        mock_instance = MockBase.return_value
+        table = [{'_id': str(i), 'Name': f'Row {i}', 'Age': i} for i in range(250)]
+        mock_instance.list_rows.side_effect = lambda name, view_name=None, start=None, limit=None: table[start:start + limit]
+
+        collected = []
+        page = json.loads(server.list_rows("Table1", limit=100, columns=['Name'], paginate=True))
+        collected.extend(page['rows'])
+        while page['next_cursor']:
+            page = json.loads(server.list_rows("Table1", cursor=page['next_cursor']))
+            collected.extend(page['rows'])
+
+        self.assertEqual(len(collected), 250)
+        self.assertEqual(collected[0], {'_id': '0', 'Name': 'Row 0'})
+        self.assertEqual(collected[-1]['_id'], '249')
+        # Pages after the first are served from the background prefetch
+        self.assertEqual(mock_instance.list_rows.call_count, 3)
+
+        # A hand-crafted cursor is held to the same page size limit
+        page = json.loads(server.list_rows("Table1", cursor=server._encode_cursor("Table1", None, 0, 10**6)))
+        self.assertEqual(mock_instance.list_rows.call_args.kwargs['limit'], server.MAX_PAGE_SIZE)
+        for start, limit in ((-5, 100), (0, 0), ("0", 100), (0, None)):
+            result = server.list_rows("Table1", cursor=server._encode_cursor("Table1", None, start, limit))
+            self.assertIn("Invalid cursor", result)
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_prefetched_pages_expire(self, MockBase):
+        mock_instance = MockBase.return_value
+        table = [{'_id': str(i), 'Name': f'Row {i}'} for i in range(250)]
+        mock_instance.list_rows.side_effect = lambda name, view_name=None, start=None, limit=None: [dict(r) for r in table[start:start + limit]]
+
+        # A write drops the prefetched pages of the table
+        page = json.loads(server.list_rows("Table1", limit=100, paginate=True))
+        table[150]['Name'] = 'Edited'
+        server.update_row("Table1", '150', {'Name': 'Edited'})
+        with patch.object(server, 'PREFETCH_TTL', 0):
+            page = json.loads(server.list_rows("Table1", cursor=page['next_cursor']))
+        self.assertEqual(page['rows'][50]['Name'], 'Edited')
+
+        # Prefetches older than the TTL are fetched again
+        server._prefetched_pages[next(iter(server._prefetched_pages))][1].result()
+        table[-1]['Name'] = 'Later'
+        page = json.loads(server.list_rows("Table1", cursor=page['next_cursor']))
+        self.assertEqual(page['rows'][-1]['Name'], 'Later')
+
+        # A cursor cannot be replayed against another table
+        self.assertIn("Error listing rows", server.list_rows("Table2", cursor=server._encode_cursor("Table1", None, 100, 100)))
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_metadata_cache(self, MockBase):
+        mock_instance = MockBase.return_value
+        mock_instance.list_columns.return_value = [{'key': '0000', 'name': 'Name', 'type': 'text'}]
+        mock_instance.list_views.return_value = [{'name': 'Default View'}]
+        mock_instance.get_metadata.return_value = {'tables': []}
+
+        server.list_columns("Table1")
+        server.list_columns("Table1")
+        server.get_base_info()
+        server.get_server_info()
+        self.assertEqual(mock_instance.list_columns.call_count, 1)
+        self.assertEqual(mock_instance.get_metadata.call_count, 1)
+
+        # Schema changes invalidate the affected entries only
+        server.list_views("Table1")
+        server.list_views("Table2")
+        server.insert_column("Table1", "NewCol", "text")
+        server.list_columns("Table1")
+        server.list_views("Table2")
+        self.assertEqual(mock_instance.list_columns.call_count, 2)
+        self.assertEqual(mock_instance.list_views.call_count, 2)
+
+        # Table changes drop everything cached for the base
+        server.delete_table("Table2")
+        server.list_views("Table2")
+        self.assertEqual(mock_instance.list_views.call_count, 3)
+
+        stats = json.loads(server.get_cache_stats())['metadata']
+        self.assertEqual(stats['hits'], 3)
+        self.assertEqual(stats['misses'], 6)
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_async_tools_overlap(self, MockBase):
+        def slow_list_rows(*args, **kwargs):
+            time.sleep(0.2)
+            return [{'_id': '1'}]
+        MockBase.return_value.list_rows.side_effect = slow_list_rows
+
+        async def call_many(tokens):
+            calls = [server.mcp.call_tool("list_rows", {"table_name": "Table1", "api_token": t}) for t in tokens]
+            started = time.monotonic()
+            results = await asyncio.gather(*calls)
+            return time.monotonic() - started, results
+
+        # Calls against different bases run concurrently on the thread pool
+        elapsed, results = asyncio.run(call_many(["token_a", "token_b", "token_c"]))
+        self.assertLess(elapsed, 0.5)
+        self.assertIn("'_id': '1'", str(results[0]))
+
+        # The per-base limit serializes calls against the same base
+        with patch.object(server, 'PER_BASE_CONCURRENCY', 1):
+            elapsed, _ = asyncio.run(call_many(["token_d", "token_d"]))
+        self.assertGreaterEqual(elapsed, 0.4)
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_output_formats(self, MockBase):
+        mock_instance = MockBase.return_value
+        rows = [
+            {'_id': '1', 'Name': 'A', '_ctime': '2024-01-01', '_mtime': '2024-01-02', '_creator': 'x'},
+            {'_id': '2', 'Name': 'B', 'Age': 3, '_ctime': '2024-01-01', '_mtime': '2024-01-02', '_creator': 'x'},
+        ]
+        mock_instance.list_rows.return_value = rows
+        mock_instance.query.return_value = rows
+
+        self.assertEqual(json.loads(server.list_rows("Table1", output_format="json")), rows)
+
+        columnar = json.loads(server.list_rows("Table1", output_format="columnar", drop_system_fields=True))
+        self.assertEqual(columnar, {'columns': ['_id', 'Name', 'Age'], 'rows': [['1', 'A', None], ['2', 'B', 3]]})
+
+        lines = server.run_sql("SELECT * FROM Table1", output_format="ndjson", drop_system_fields=True).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [{'_id': '1', 'Name': 'A'}, {'_id': '2', 'Name': 'B', 'Age': 3}])
+
+        page = server.list_rows("Table1", limit=2, paginate=True, output_format="ndjson").splitlines()
+        self.assertEqual(len(page), 3)
+        self.assertIn('next_cursor', json.loads(page[-1]))
+
+        mock_instance.get_metadata.return_value = {'tables': []}
+        self.assertEqual(json.loads(server.get_base_info(output_format="json")), {'tables': []})
+        self.assertIn("Unsupported output format", server.list_views("Table1", output_format="xml"))
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_table_snapshot(self, MockBase):
+        mock_instance = MockBase.return_value
+        table = [{'_id': str(i), 'Name': f'Row {i}', 'Team': 'A' if i % 2 else 'B',
+                  '_mtime': f'2024-01-01T00:00:{i:02d}'} for i in range(10)]
+        mock_instance.list_rows.return_value = table
+
+        result = json.loads(server.enable_snapshot("Table1"))
+        self.assertEqual(result['rows'], 10)
+        self.assertEqual(result['watermark'], '2024-01-01T00:00:09')
+
+        # Reads within the staleness bound are served locally
+        found = json.loads(server.query_snapshot("Table1", filters={'Team': 'A'}, output_format="json"))
+        self.assertEqual([r['_id'] for r in found], ['1', '3', '5', '7', '9'])
+        self.assertIn("Row 3", server.query_snapshot("Table1", row_id='3'))
+        self.assertIn("Row 0", server.list_rows("Table1"))
+        self.assertEqual(mock_instance.list_rows.call_count, 1)
+        mock_instance.query.assert_not_called()
+
+        # Writes are applied locally and trigger an incremental sync on the next read
+        server.delete_row("Table1", '0')
+        table.append({'_id': '10', 'Name': 'Row 10', 'Team': 'A', '_mtime': '2024-01-01T00:00:10'})
+        del table[0]
+        def query(sql):
+            if sql.startswith("SELECT _id "):
+                return [{'_id': row['_id']} for row in table]
+            return table[-1:]
+        mock_instance.query.side_effect = query
+        found = json.loads(server.query_snapshot("Table1", filters={'Team': ['A', 'B']}, limit=100, output_format="json"))
+        self.assertEqual(len(found), 10)
+        self.assertNotIn('0', [r['_id'] for r in found])
+        sql = mock_instance.query.call_args_list[0][0][0]
+        self.assertIn("_mtime >= '2024-01-01T00:00:09'", sql)
+        self.assertEqual(mock_instance.list_rows.call_count, 1)
+
+        # Stale snapshots sync again before serving, and drop rows deleted by other clients
+        del table[2]
+        with patch.object(server, 'SNAPSHOT_MAX_STALENESS', -1):
+            self.assertEqual(server.query_snapshot("Table1", row_id='3'), '[]')
+            self.assertNotIn("Row 3", server.list_rows("Table1", limit=100))
+        self.assertEqual(mock_instance.query.call_count, 6)
+
+        self.assertIn("disabled", server.disable_snapshot("Table1"))
+        self.assertIn("enable_snapshot first", server.query_snapshot("Table1"))
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_snapshot_reads_during_writes(self, MockBase):
+        mock_instance = MockBase.return_value
+        table = [{'_id': str(i), 'Team': 'A'} for i in range(20000)]
+        mock_instance.list_rows.side_effect = lambda name, view_name=None, start=None, limit=None: table[start:start + limit]
+        server.enable_snapshot("Table1")
+        stop = threading.Event()
+
+        def write():
+            i = 0
+            while not stop.is_set():
+                server._patch_snapshot('fake_token', 'Table1', rows=[{'_id': f'new{i}', 'Team': 'A'}])
+                i += 1
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            results = [server.query_snapshot("Table1", filters={'Team': 'B'}) for _ in range(10)]
+            results.append(server.list_rows("Table1", filters={'Team': 'B'}))
+        finally:
+            stop.set()
+            writer.join()
+        self.assertEqual(results, ['[]'] * 11)
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_failed_full_sync_keeps_snapshot(self, MockBase):
+        mock_instance = MockBase.return_value
+        table = [{'_id': str(i), '_mtime': f'2024-01-01T00:{i // 60:02d}:{i % 60:02d}'} for i in range(2500)]
+        pages = []
+
+        def list_rows(name, view_name=None, start=None, limit=None):
+            pages.append(start)
+            if len(pages) == 5:
+                raise Exception("500 Internal Server Error")
+            return table[start:start + limit]
+        mock_instance.list_rows.side_effect = list_rows
+
+        server.enable_snapshot("Table1")
+        with patch.object(server.retry_policy, 'max_attempts', 1):
+            self.assertIn("Error syncing snapshot", server.sync_snapshot("Table1", full=True))
+        snapshot = server._get_snapshot('fake_token', 'Table1')
+        self.assertEqual((len(snapshot.rows), snapshot.watermark), (2500, table[-1]['_mtime']))
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_apply_change_events(self, MockBase):
+        mock_instance = MockBase.return_value
+        mock_instance.get_metadata.return_value = {'tables': [
+            {'_id': '0000', 'name': 'Table1', 'columns': [{'key': '0Nme', 'name': 'Name'}]}]}
+        mock_instance.list_rows.return_value = [{'_id': '1', 'Name': 'A', '_mtime': '2024-01-01T00:00:00'}]
+        server.enable_snapshot("Table1")
+        snapshot = server._get_snapshot('fake_token', 'Table1')
+
+        # Column keys in events are mapped to the names used by list_rows
+        server._apply_change('fake_token', {'op_type': 'modify_row', 'table_id': '0000', 'row_id': '1', 'updated': {'0Nme': 'B'}})
+        server._apply_change('fake_token', {'op_type': 'insert_row', 'table_id': '0000', 'row_id': '2', 'row_data': {'0Nme': 'C'}})
+        self.assertEqual(snapshot.rows['1']['Name'], 'B')
+        self.assertEqual(snapshot.rows['2'], {'_id': '2', 'Name': 'C'})
+        self.assertFalse(snapshot.dirty)
+
+        # Schema changes invalidate instead
+        server._apply_change('fake_token', {'op_type': 'insert_column', 'table_id': '0000', 'column_data': {}})
+        self.assertTrue(snapshot.dirty)
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_run_sql_cache(self, MockBase):
+        mock_instance = MockBase.return_value
+        mock_instance.query.return_value = [{'Name': 'A'}]
+
+        server.run_sql("SELECT Name FROM Table1 WHERE Name = 'a  b'")
+        server.run_sql("  SELECT  Name\nFROM Table1   WHERE Name = 'a  b';")
+        self.assertEqual(mock_instance.query.call_count, 1)
+        # Whitespace inside literals is significant
+        server.run_sql("SELECT Name FROM Table1 WHERE Name = 'a b'")
+        self.assertEqual(mock_instance.query.call_count, 2)
+
+        # Writes to a referenced table invalidate, writes elsewhere do not
+        server.add_row("Table2", {'Name': 'B'})
+        server.run_sql("SELECT Name FROM Table1 WHERE Name = 'a  b'")
+        self.assertEqual(mock_instance.query.call_count, 2)
+        server.update_row("table1", "1", {'Name': 'B'})
+        server.run_sql("SELECT Name FROM Table1 WHERE Name = 'a  b'")
+        self.assertEqual(mock_instance.query.call_count, 3)
+
+        server.run_sql("SELECT Name FROM Table1 WHERE Name = 'a  b'", use_cache=False)
+        self.assertEqual(mock_instance.query.call_count, 4)
+
+        # A result loaded while a write invalidates the table is not cached
+        loading, release = threading.Event(), threading.Event()
+        def slow_query(sql):
+            loading.set()
+            release.wait(5)
+            return [{'Name': 'before write'}]
+        mock_instance.query.side_effect = slow_query
+        reader = threading.Thread(target=server.run_sql, args=("SELECT Name FROM Table1",))
+        reader.start()
+        loading.wait(5)
+        server.update_row("Table1", "1", {'Name': 'after write'})
+        release.set()
+        reader.join()
+        mock_instance.query.side_effect = None
+        mock_instance.query.return_value = [{'Name': 'after write'}]
+        self.assertIn("after write", server.run_sql("SELECT Name FROM Table1"))
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_run_sql_paginate(self, MockBase):
+        mock_instance = MockBase.return_value
+        table = [{'_id': str(i)} for i in range(25)]
+
+        def query(sql):
+            limit, offset = [int(x) for x in sql.split("LIMIT ")[1].split(" OFFSET ")]
+            return table[offset:offset + limit]
+        mock_instance.query.side_effect = query
+
+        lines = server.run_sql("SELECT _id FROM Table1", paginate=True, page_size=10, output_format="ndjson").splitlines()
+        self.assertEqual(len(lines), 25)
+        self.assertEqual(mock_instance.query.call_count, 3)
+        mock_instance.query.assert_called_with("SELECT _id FROM Table1 LIMIT 10 OFFSET 20")
+
+        # An explicit LIMIT/OFFSET bounds the paginated result
+        result = json.loads(server.run_sql("SELECT _id FROM Table1 LIMIT 12 OFFSET 5", paginate=True, page_size=10, output_format="json"))
+        self.assertEqual([r['_id'] for r in result], [str(i) for i in range(5, 17)])
+        mock_instance.query.assert_called_with("SELECT _id FROM Table1 LIMIT 2 OFFSET 15")
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_server_stats(self, MockBase):
+        mock_instance = MockBase.return_value
+        mock_instance.list_rows.return_value = [{'_id': '1', 'Name': 'A'}]
+        mock_instance.query.side_effect = Exception("bad query")
+        records = []
+        server.add_trace_hook(records.append)
+        try:
+            server.list_rows("Table1", output_format="json")
+            server.list_rows("Table1")
+            server.run_sql("SELECT broken")
+        finally:
+            server._trace_hooks.remove(records.append)
+
+        self.assertEqual([r['tool'] for r in records], ['list_rows', 'list_rows', 'run_sql'])
+        self.assertEqual(set(records[0]['phases']), {'auth', 'rate_limit', 'api', 'serialize', 'total'})
+        self.assertTrue(records[2]['error'])
+        # Tokens are never exposed, only a short hash
+        self.assertTrue(records[0]['base'].startswith('token:'))
+        self.assertNotIn('fake_token', records[0]['base'])
+
+        stats = {s['tool']: s for s in json.loads(server.get_server_stats())['tools']}
+        self.assertEqual(stats['list_rows']['calls'], 2)
+        self.assertEqual(stats['list_rows']['errors'], 0)
+        self.assertEqual(stats['list_rows']['phases']['api']['count'], 2)
+        self.assertGreater(stats['list_rows']['bytes'], 0)
+        self.assertEqual(stats['run_sql']['error_rate'], 1.0)
+
+        text = server.get_server_stats(format="prometheus", reset=True)
+        self.assertIn('seatable_mcp_tool_calls_total{tool="list_rows"', text)
+        self.assertIn('phase="api",le="+Inf"} 2', text)
+        # Only the resetting call itself is left
+        self.assertEqual([s['tool'] for s in json.loads(server.get_server_stats())['tools']], ['get_server_stats'])
+
+    @patch('seatable_mcp.server.Base')
+    @patch.dict('os.environ', {'SEATABLE_API_TOKEN': 'fake_token', 'SEATABLE_SERVER_URL': 'https://fake.url'})
+    def test_server_stats_async_queue(self, MockBase):
+        MockBase.return_value.list_rows.return_value = []
+        asyncio.run(server.mcp.call_tool("list_rows", {"table_name": "Table1"}))
+        stats = json.loads(server.get_server_stats())['tools']
+        self.assertIn('queue', stats[0]['phases'])
+
 if __name__ == '__main__':
     unittest.main()